@@ -0,0 +1,62 @@
+import asyncio
+import os
+import statistics
+import time
+import tty
+
+from loguru import logger
+
+from Benchmark.Loopback import makeLoopbackConfig
+from Communication.AsyncInterface import AsyncDataInterface
+from Communication.DataPacket import DataPacket, DecodeEvent
+from Communication.DataProcessingLayer import packShort, parseMessage
+
+
+async def main(count=500):
+    """
+    使用 pty 对测试 AsyncDataInterface: 异步接口连接 pty 的从端, 主端模拟对端电台回显 SHORT 消息
+    """
+    logger.remove()
+    master, slave = os.openpty()
+    tty.setraw(master)
+    os.set_blocking(master, False)
+    interface = AsyncDataInterface("drone", configPath=makeLoopbackConfig(serialName=os.ttyname(slave)))
+    await interface.connect()
+    loop = asyncio.get_running_loop()
+    peer = DataPacket(framing=interface.radioConnector.framing, fragmented=interface.radioConnector.fragmented,
+                      compressed=interface.radioConnector.compressed, presetDictionary=interface.radioConnector.presetDictionary)
+
+    def onPeerReadable():
+        for result in peer.decode(os.read(master, 4096)):
+            if result.event == DecodeEvent.Frame:
+                header, data = parseMessage(result.data)
+                if header == "SHORT":
+                    os.write(master, peer.encodeMany([packShort(data.encode("utf-8"))]))
+
+    loop.add_reader(master, onPeerReadable)
+    latencies = []
+    iterator = interface.__aiter__()
+    for i in range(count):
+        start = time.perf_counter()
+        await interface.sendShort(f"{i}".encode("utf-8"))
+        message = await iterator.__anext__()
+        assert message["data"] == f"{i}"
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i in range(count):
+        await interface.sendNormal({"index": i, "payload": "x" * 200})
+    await interface.radioConnector.drain()
+    sendTime = time.perf_counter() - start
+
+    loop.remove_reader(master)
+    await interface.disconnect()
+    os.close(master)
+    os.close(slave)
+    latencies.sort()
+    print(f"round trip over pty: p50 {statistics.median(latencies) * 1000:.3f} ms, p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.3f} ms")
+    print(f"sendNormal with backpressure: {count / sendTime:.0f} messages/s, write buffer high-water {interface.radioConnector.writeHighWater} B")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,136 @@
+import math
+import time
+
+import numpy as np
+
+from Drone.AttitudeEstimator import AttitudeEstimator, wrapAngle
+from Drone.IMU import ahrsDtype, imuDtype
+
+sampleRate = 1000
+duration = 60
+gravity = 9.80665
+
+
+def trajectory(t: np.ndarray):
+    """
+    合成的姿态轨迹(弧度)及其欧拉角速率, 航向持续转动并多次跨越 ±pi
+    """
+    roll = 0.3 * np.sin(2 * np.pi * 0.2 * t)
+    pitch = 0.2 * np.sin(2 * np.pi * 0.13 * t + 1)
+    heading = wrapAngle(0.5 * t + 0.4 * np.sin(2 * np.pi * 0.05 * t))
+    rollRate = 0.3 * 2 * np.pi * 0.2 * np.cos(2 * np.pi * 0.2 * t)
+    pitchRate = 0.2 * 2 * np.pi * 0.13 * np.cos(2 * np.pi * 0.13 * t + 1)
+    headingRate = 0.5 + 0.4 * 2 * np.pi * 0.05 * np.cos(2 * np.pi * 0.05 * t)
+    return roll, pitch, heading, rollRate, pitchRate, headingRate
+
+
+def makeData(seed=0):
+    """
+    :return: (IMU 数据, AHRS 数据, 真实姿态), IMU 与 AHRS 帧交替, 各 sampleRate Hz
+    """
+    generator = np.random.default_rng(seed)
+    t = np.arange(duration * sampleRate) / sampleRate
+    roll, pitch, heading, rollRate, pitchRate, headingRate = trajectory(t)
+    sinRoll, cosRoll, sinPitch, cosPitch = np.sin(roll), np.cos(roll), np.sin(pitch), np.cos(pitch)
+    n = len(t)
+    imu = np.zeros(n, dtype=imuDtype)
+    imu['timeStamp'] = np.round(t * 1e6).astype(np.uint64)
+    bias = np.array([0.002, -0.003, 0.001])
+    imu['angularVelocityX'] = rollRate - headingRate * sinPitch + bias[0] + generator.normal(0, 0.01, n)
+    imu['angularVelocityY'] = pitchRate * cosRoll + headingRate * sinRoll * cosPitch + bias[1] + generator.normal(0, 0.01, n)
+    imu['angularVelocityZ'] = -pitchRate * sinRoll + headingRate * cosRoll * cosPitch + bias[2] + generator.normal(0, 0.01, n)
+    imu['accelerationX'] = gravity * sinPitch + generator.normal(0, 0.3, n)
+    imu['accelerationY'] = -gravity * sinRoll * cosPitch + generator.normal(0, 0.3, n)
+    imu['accelerationZ'] = -gravity * cosRoll * cosPitch + generator.normal(0, 0.3, n)
+    # 地磁场(NED, 磁倾角 60 度)转换到机体坐标系: m_b = Rx(roll)^T Ry(pitch)^T Rz(heading)^T m
+    dip = math.radians(60)
+    north, down = math.cos(dip), math.sin(dip)
+    hx, hy = north * np.cos(heading), -north * np.sin(heading)
+    vx, vz = hx * cosPitch - down * sinPitch, hx * sinPitch + down * cosPitch
+    imu['magneticInductionX'] = vx + generator.normal(0, 0.02, n)
+    imu['magneticInductionY'] = hy * cosRoll + vz * sinRoll + generator.normal(0, 0.02, n)
+    imu['magneticInductionZ'] = -hy * sinRoll + vz * cosRoll + generator.normal(0, 0.02, n)
+
+    ahrsTime = t + 0.5 / sampleRate
+    ahrsRoll, ahrsPitch, ahrsHeading, *_ = trajectory(ahrsTime)
+    ahrs = np.zeros(n, dtype=ahrsDtype)
+    ahrs['timeStamp'] = np.round(ahrsTime * 1e6).astype(np.uint64)
+    ahrs['roll'] = ahrsRoll + generator.normal(0, 0.005, n)
+    ahrs['pitch'] = ahrsPitch + generator.normal(0, 0.005, n)
+    ahrs['heading'] = wrapAngle(ahrsHeading + generator.normal(0, 0.005, n))
+    return imu, ahrs, np.stack([roll, pitch, heading], axis=1)
+
+
+def scalarFilter(imu: np.ndarray, timeConstant=0.5, headingTimeConstant=2.0, maxStep=0.05) -> np.ndarray:
+    """
+    逐采样计算的参考实现, 欧拉角速率使用上一采样的估计值
+    """
+    result = np.empty((len(imu), 3))
+    state = None
+    lastTime = None
+    for i, record in enumerate(imu.tolist()):
+        gx, gy, gz, ax, ay, az, mx, my, mz = record[:9]
+        timeStamp = record[-1]
+        accRoll = math.atan2(-ay, -az)
+        accPitch = math.atan2(ax, math.hypot(ay, az))
+        if state is None:
+            state = [accRoll, accPitch, 0.0]
+            state[2] = magneticHeading(mx, my, mz, accRoll, accPitch)
+            lastTime = timeStamp
+        dt = min(max((timeStamp - lastTime) * 1e-6, 0.0), maxStep)
+        lastTime = timeStamp
+        roll, pitch, heading = state
+        turn = gy * math.sin(roll) + gz * math.cos(roll)
+        rates = [gx + turn * math.tan(pitch), gy * math.cos(roll) - gz * math.sin(roll), turn / max(math.cos(pitch), 1e-6)]
+        a = timeConstant / (timeConstant + dt)
+        roll = a * (roll + rates[0] * dt) + (1 - a) * accRoll
+        pitch = a * (pitch + rates[1] * dt) + (1 - a) * accPitch
+        measured = magneticHeading(mx, my, mz, roll, pitch)
+        measured += 2 * math.pi * round((heading - measured) / (2 * math.pi))
+        a = headingTimeConstant / (headingTimeConstant + dt)
+        heading = a * (heading + rates[2] * dt) + (1 - a) * measured
+        heading = (heading + math.pi) % (2 * math.pi) - math.pi
+        state = [roll, pitch, heading]
+        result[i] = state
+    return result
+
+
+def magneticHeading(mx, my, mz, roll, pitch):
+    horizontalX = mx * math.cos(pitch) + (my * math.sin(roll) + mz * math.cos(roll)) * math.sin(pitch)
+    horizontalY = my * math.cos(roll) - mz * math.sin(roll)
+    return math.atan2(-horizontalY, horizontalX)
+
+
+def run(imu: np.ndarray, ahrs: np.ndarray, batch: int, publishRate, vectorThreshold=64):
+    estimator = AttitudeEstimator(publishRate=publishRate, historyCapacity=len(imu), vectorThreshold=vectorThreshold)
+    start = time.process_time()
+    for i in range(0, len(imu), batch):
+        estimator.update(imu[i:i + batch])
+        estimator.compare(ahrs[i:i + batch])
+    return estimator, (time.process_time() - start) / len(imu)
+
+
+def main():
+    imu, ahrs, truth = makeData()
+    start = time.process_time()
+    reference = scalarFilter(imu)
+    scalarCost = (time.process_time() - start) / len(imu)
+    imuRate = 1440 / 2
+    print(f"{duration}s synthetic flight, IMU {sampleRate}Hz; at 921600 baud IMU/AHRS alternate, about {imuRate:.0f} IMU samples/s")
+    print(f"scalar python loop: {scalarCost * 1e6:.1f} us/sample ({scalarCost * imuRate:.1%} of one core)")
+    print(f"{'batch':>6}{'publish':>9}{'vector':>8}{'us/sample':>11}{'core share':>12}{'published':>11}{'vs scalar(deg)':>16}{'rms error roll/pitch/heading (deg)':>38}{'vs AHRS rms (deg)':>24}")
+    # vector: 一次计算的采样数不少于该值时使用向量化计算, 0 为总是向量化; IMU 实际的输入方式为 batch 1、50Hz 发布
+    for batch, publishRate, vectorThreshold in [(1, None, 64), (1, 50.0, 64), (1, 50.0, 0), (1, 200.0, 64), (8, 50.0, 64), (64, 50.0, 64), (64, 50.0, 0)]:
+        estimator, cost = run(imu, ahrs, batch, publishRate, vectorThreshold)
+        history = estimator.history.view()
+        estimate = np.stack([history['roll'], history['pitch'], history['heading']], axis=1).astype(np.float64)
+        processed = len(history)
+        error = np.degrees(np.sqrt(np.mean(wrapAngle(estimate - truth[:processed]) ** 2, axis=0)))
+        scalarDifference = np.degrees(np.abs(wrapAngle(estimate - reference[:processed])).max())
+        divergence = np.degrees(estimator.statistics()["divergence"]["rms"])
+        print(f"{batch:>6}{str(publishRate):>9}{vectorThreshold:>8}{cost * 1e6:>11.1f}{cost * imuRate:>12.1%}{estimator.published:>11}{scalarDifference:>16.4f}"
+              f"{' / '.join(f'{value:.2f}' for value in error):>38}{' / '.join(f'{value:.2f}' for value in divergence):>24}")
+
+
+if __name__ == "__main__":
+    main()
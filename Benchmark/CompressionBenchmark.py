@@ -0,0 +1,53 @@
+import json
+import random
+
+from Communication.DataPacket import DataPacket, DecodeEvent
+from DataStructure.InformationData import EngineInfo, GPSInfo, InertiaInfo, PowerInfo, presetDictionary
+from DataStructure.JsonModel import to_dict
+
+
+def makeMessages(count=2000):
+    """
+    模拟 DataInterface.sendNormal 发送的遥测消息
+    """
+    rand = random.Random(0)
+    messages = []
+    for i in range(count):
+        info = [InertiaInfo, PowerInfo, EngineInfo, GPSInfo][i % 4]()
+        for name in info.__dict__:
+            setattr(info, name, round(rand.uniform(-100, 100), rand.choice([2, 4, 6])))
+        messages.append(("JSON-" + json.dumps(to_dict(info))).encode("utf-8"))
+    return messages
+
+
+def run(messages, compressed, dictionary, lossEvery=0):
+    sender = DataPacket(compressed=compressed, presetDictionary=dictionary)
+    receiver = DataPacket(compressed=compressed, presetDictionary=dictionary)
+    wireBytes = received = 0
+    for i, message in enumerate(messages):
+        stream = sender.encodeMany([message])
+        wireBytes += len(stream)
+        if lossEvery and i % lossEvery == lossEvery - 1:
+            continue
+        for result in receiver.decode(stream):
+            if result.event == DecodeEvent.Frame:
+                assert result.data == message
+                received += 1
+    return wireBytes, received, sender.compressionStatistics.summary(), receiver.compressionStatistics.summary()
+
+
+def main():
+    messages = makeMessages()
+    rawBytes = sum(len(message) for message in messages)
+    print(f"{'mode':<24}{'wire(B/msg)':>12}{'ratio':>8}{'fallback':>10}{'comp(us)':>10}{'decomp(us)':>12}{'received':>10}")
+    for name, compressed, dictionary, lossEvery in [("uncompressed", False, None, 0),
+                                                    ("zlib", True, None, 0),
+                                                    ("zlib+dictionary", True, presetDictionary(), 0),
+                                                    ("zlib+dictionary 1% loss", True, presetDictionary(), 100)]:
+        wireBytes, received, sender, receiver = run(messages, compressed, dictionary, lossEvery)
+        print(f"{name:<24}{wireBytes / len(messages):>12.1f}{wireBytes / rawBytes:>8.3f}{sender['rawFallbacks']:>10}"
+              f"{sender['compressMicrosecondsPerMessage']:>10.1f}{receiver['decompressMicrosecondsPerMessage']:>12.1f}{received:>10}")
+
+
+if __name__ == "__main__":
+    main()
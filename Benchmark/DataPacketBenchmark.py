@@ -0,0 +1,77 @@
+import random
+import timeit
+
+from Benchmark.LegacyDataPacket import DataPacket as LegacyDataPacket
+from Communication.DataPacket import DataPacket, DecodeEvent, FramingMode
+
+
+def makePayloads():
+    random.seed(0)
+    return {
+        "json-telemetry": b'JSON-{"xAxisAcceleration": 0.125, "yAxisAcceleration": -0.5, "zAxisAcceleration": 9.81}',
+        "random-3k": bytes(random.getrandbits(8) for _ in range(3072)),
+        "escape-3k": b'\\' * 3072,
+        "mixed-10k": bytes(random.choice(b'\\abc') for _ in range(10000)),
+        "empty": b'',
+    }
+
+
+def checkIdentical(payloads):
+    legacy = LegacyDataPacket()
+    current = DataPacket()
+    for name, payload in payloads.items():
+        expected = legacy.encode(payload)
+        assert current.encode(payload) == expected, name
+        assert bytes(current.encodeMany([payload, payload])) == b''.join(expected[2] * 2), name
+
+
+def main():
+    payloads = makePayloads()
+    checkIdentical(payloads)
+    legacy = LegacyDataPacket()
+    current = DataPacket()
+    print(f"{'payload':<16}{'legacy(ms)':>12}{'encode(ms)':>12}{'encodeMany(ms)':>16}{'speedup':>10}")
+    for name, payload in payloads.items():
+        number = 3 if name != "json-telemetry" else 200
+        timeLegacy = timeit.timeit(lambda: legacy.encode(payload), number=number) / number * 1000
+        timeCurrent = timeit.timeit(lambda: current.encode(payload), number=number * 10) / (number * 10) * 1000
+        timeMany = timeit.timeit(lambda: current.encodeMany([payload]), number=number * 10) / (number * 10) * 1000
+        print(f"{name:<16}{timeLegacy:>12.4f}{timeCurrent:>12.4f}{timeMany:>16.4f}{timeLegacy / timeCurrent:>9.1f}x")
+
+    benchmarkDecode()
+    benchmarkFraming()
+
+
+def benchmarkDecode():
+    encoder = DataPacket()
+    payload = makePayloads()["json-telemetry"]
+    print(f"{'burst(frames)':<16}{'legacy(ms)':>12}{'decode(ms)':>12}{'speedup':>10}")
+    for count in [10, 100, 400]:
+        stream = bytes(encoder.encodeMany([payload] * count))
+
+        def runLegacy():
+            assert len(LegacyDataPacket().decode(stream)) == count
+
+        def runCurrent():
+            assert sum(result.event == DecodeEvent.Frame for result in DataPacket().decode(stream)) == count
+
+        timeLegacy = timeit.timeit(runLegacy, number=5) / 5 * 1000
+        timeCurrent = timeit.timeit(runCurrent, number=20) / 20 * 1000
+        print(f"{count:<16}{timeLegacy:>12.4f}{timeCurrent:>12.4f}{timeLegacy / timeCurrent:>9.1f}x")
+
+
+def benchmarkFraming():
+    payload = makePayloads()["json-telemetry"]
+    print(f"{'framing':<16}{'overhead(B)':>12}{'decode(ms/400)':>16}")
+    for framing in FramingMode:
+        stream = bytes(DataPacket(framing=framing).encodeMany([payload] * 400))
+
+        def run():
+            assert sum(result.event == DecodeEvent.Frame for result in DataPacket(framing=framing).decode(stream)) == 400
+
+        timeDecode = timeit.timeit(run, number=20) / 20 * 1000
+        print(f"{framing.value:<16}{len(stream) / 400 - len(payload):>12.1f}{timeDecode:>16.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import random
+import sys
+
+from Benchmark.LegacyDataPacket import DataPacket as LegacyDataPacket
+from Communication.DataPacket import DataPacket, DecodeEvent
+
+# 固定的回归语料, 覆盖转义符出现在包头、包尾、分块边界等位置的情况
+corpus = [
+    b'',
+    b'\\',
+    b'\\\\',
+    b'\\0012',
+    b'JSON-{"a": "\\\\"}',
+    b'SHORT\\',
+    b'a\\b\\\\c\\\\\\',
+    b'0123456789',
+    bytes(range(256)),
+    b'\\' * 3072,
+    b'x' * 3073,
+]
+
+# 哨兵包: 旧解码器会把以转义符对结尾的数据包保留到下一个包头到达才返回, 在流末尾追加一个哨兵包使两者可比较
+sentinel = b'END'
+
+
+def randomPayload(rand: random.Random):
+    size = rand.choice([0, 1, 2, 5, 16, 64, 300, 1000, 4000])
+    return bytes(rand.choice(b'\\\\\\0123456789abc') if rand.random() < 0.5 else rand.getrandbits(8) for _ in range(size))
+
+
+def randomChunks(stream: bytes, rand: random.Random):
+    index = 0
+    while index < len(stream):
+        size = rand.choice([1, 2, 3, 5, 7, 64, 200])
+        yield stream[index:index + size]
+        index += size
+
+
+def decodeLegacy(chunks):
+    decoder = LegacyDataPacket()
+    frames = []
+    for chunk in chunks:
+        decoded = decoder.decode(chunk)
+        if type(decoded) != bool:
+            frames += decoded
+    return frames
+
+
+def decodeCurrent(chunks):
+    decoder = DataPacket()
+    frames = []
+    discarded = 0
+    for chunk in chunks:
+        for result in decoder.decode(chunk):
+            if result.event == DecodeEvent.Frame:
+                frames.append(result.data)
+            else:
+                discarded += result.discarded
+    return frames, discarded, len(decoder.buffer)
+
+
+def wireSize(frame: bytes):
+    return DataPacket.headSize + len(frame) + frame.count(DataPacket.escapeChar)
+
+
+def corrupt(stream: bytes, rand: random.Random):
+    stream = bytearray(stream)
+    for _ in range(rand.randint(1, 5)):
+        index = rand.randrange(len(stream))
+        action = rand.random()
+        if action < 0.4:
+            stream[index] ^= 1 << rand.randrange(8)
+        elif action < 0.8:
+            del stream[index]
+        else:
+            stream.insert(index, rand.choice(b'\\0a'))
+    return bytes(stream)
+
+
+def main(iterations=300):
+    encoder = DataPacket()
+    rand = random.Random(0)
+    cases = [[payload] for payload in corpus] + [corpus]
+    cases += [[randomPayload(rand) for _ in range(rand.randint(1, 20))] for _ in range(iterations)]
+
+    for payloads in cases:
+        stream = bytes(encoder.encodeMany(payloads + [sentinel]))
+        expected = [payload[i:i + DataPacket.maxPackageSize] for payload in payloads for i in range(0, max(len(payload), 1), DataPacket.maxPackageSize)]
+        expected.append(sentinel)
+        chunks = list(randomChunks(stream, rand))
+        legacyFrames = decodeLegacy(chunks)
+        frames, discarded, remain = decodeCurrent(chunks)
+        assert legacyFrames == expected, "legacy decoder mismatch"
+        assert frames == expected, "decoder mismatch"
+        assert discarded == 0 and remain == 0
+
+    # 损坏的数据流: 不要求与旧解码器一致(旧解码器在部分损坏情况下会抛出异常), 只检查字节守恒与恢复能力
+    recovered = legacyRecovered = legacyFailed = 0
+    for _ in range(iterations):
+        payloads = [randomPayload(rand) for _ in range(rand.randint(2, 20))]
+        stream = corrupt(bytes(encoder.encodeMany(payloads + [sentinel])), rand)
+        chunks = list(randomChunks(stream, rand))
+        frames, discarded, remain = decodeCurrent(chunks)
+        assert sum(wireSize(frame) for frame in frames) + discarded + remain == len(stream)
+        recovered += frames.count(sentinel)
+        try:
+            legacyRecovered += decodeLegacy(chunks).count(sentinel)
+        except Exception:
+            legacyFailed += 1
+    print(f"valid streams: {len(cases)} cases identical to legacy decoder")
+    print(f"corrupted streams: sentinel recovered {recovered}/{iterations} (legacy {legacyRecovered}/{iterations}, legacy raised {legacyFailed})")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 300)
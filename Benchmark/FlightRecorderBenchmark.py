@@ -0,0 +1,66 @@
+import os
+import random
+import shutil
+import struct
+import tempfile
+import time
+
+import numpy as np
+
+from DataStructure.FlightRecorder import FlightLog, FlightRecorder
+from Drone.IMU import AHRSData, IMU, IMUData, ahrsDtype, imuDtype
+
+imuBaudRate = 921600
+count = 1000000
+
+
+def main():
+    # IMU 以满速率输出时每秒的数据帧数: 帧长 = 消息体 + 8 字节帧头帧尾, 全部为 IMU 帧时最多
+    frameRate = imuBaudRate / 10 / (IMU.len_imu + 8)
+    rand = random.Random(0)
+    imuBodies = [struct.pack("<ffffffffffffQ", *[rand.uniform(-10, 10) for _ in range(12)], i) for i in range(1000)]
+    ahrsBodies = [struct.pack("<ffffffffffQ", *[rand.uniform(-3, 3) for _ in range(10)], i) for i in range(1000)]
+    frames = [bytes(rand.randrange(256) for _ in range(rand.randrange(20, 200))) for _ in range(1000)]
+    directory = tempfile.mkdtemp()
+    try:
+        recorder = FlightRecorder(directory)
+        imuRecord = recorder.recordChannel("imu", imuDtype, count)
+        ahrsRecord = recorder.recordChannel("ahrs", ahrsDtype, count)
+        radioRecord = recorder.blobChannel("radio", count, 256 * 1024 * 1024)
+        results = []
+        for name, channel, samples in [("imu", imuRecord, imuBodies), ("ahrs", ahrsRecord, ahrsBodies), ("radio", radioRecord, frames)]:
+            start = time.perf_counter()
+            for i in range(count):
+                channel.append(i * 0.001, samples[i % 1000])
+            results.append((name, (time.perf_counter() - start) / count))
+        recorder.close()
+
+        print(f"IMU at {imuBaudRate} baud: up to {frameRate:.0f} frames/s ({1e6 / frameRate:.0f} us per frame)")
+        print(f"{'channel':<8}{'records':>10}{'append(us)':>12}{'share of frame time':>21}")
+        for name, cost in results:
+            print(f"{name:<8}{count:>10}{cost * 1e6:>12.2f}{cost * frameRate:>20.1%}")
+
+        flightLog = FlightLog(directory)
+        start = time.perf_counter()
+        for _ in range(1000):
+            window = flightLog.read("imu", 500.0, 500.1)
+        seekCost = (time.perf_counter() - start) / 1000
+        assert len(window) == 101 and window["time"][0] == 500.0
+        assert not window.flags.owndata
+        sample = IMUData(*struct.unpack("<ffffffffffffQ", imuBodies[500000 % 1000]))
+        assert window[0]["angularVelocityX"] == np.float32(sample.angularVelocityX) and window[0]["timeStamp"] == sample.timeStamp
+        ahrs = flightLog.read("ahrs", 10.0, 10.0)[0]
+        assert ahrs["Q4"] == np.float32(AHRSData(*struct.unpack("<ffffffffffQ", ahrsBodies[10000 % 1000])).Q4)
+        blobs = list(flightLog.blobs("radio", 0.5, 0.502))
+        assert [bytes(data) for _, data in blobs] == frames[500:503]
+        sizes = {name: os.path.getsize(os.path.join(directory, name)) for name in sorted(os.listdir(directory))}
+        print(f"seek + 100 ms window over {count} records: {seekCost * 1e6:.1f} us (no copy)")
+        print("files (preallocated sparse, apparent size): " + ", ".join(f"{name} {size / 1e6:.1f}MB" for name, size in sizes.items() if size > 1e5))
+        del window, ahrs, blobs
+        flightLog.close()
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
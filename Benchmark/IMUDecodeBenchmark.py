@@ -0,0 +1,68 @@
+import struct
+import time
+
+import crcmod
+
+from Benchmark.IMUFrameParserBenchmark import makeStream
+from Drone.IMU import IMU, IMUFrameDecoder, IMUFrameParser
+
+baudRate = 921600
+
+
+def legacyDecode(frames):
+    """
+    基线版本 IMU.threadDecode 的逐帧处理: 每帧重新构造两次 CRC 函数, 计算结果不参与判断
+    """
+    imuBodies = []
+    ahrsBodies = []
+    for frame in frames:
+        header = bytes(frame[:5])
+        headerChar, dataType, dataLength, number, CRC8 = struct.unpack('BBBBB', header)
+        resultCRC8 = crcmod.mkCrcFun(0x107, rev=False)(header[:-1])
+        if dataLength + 8 == len(frame):
+            CRC16 = struct.unpack("<H", bytes(frame[5:7]))
+            dataBody = bytes(frame[7:-1])
+            resultCRC16 = crcmod.mkCrcFun(0x18005)(dataBody)
+            if dataType == IMU.type_imu:
+                if dataLength == IMU.len_imu:
+                    imuBodies.append(dataBody)
+            if dataType == IMU.type_ahrs:
+                if dataLength == IMU.len_ahrs:
+                    ahrsBodies.append(dataBody)
+    return imuBodies, ahrsBodies
+
+
+def timed(function, *args):
+    start = time.process_time()
+    result = function(*args)
+    return result, time.process_time() - start
+
+
+def main():
+    stream = makeStream()
+    frames = IMUFrameParser().feed(b"".join(stream.frames))
+    # 全部为 IMU 帧时的最大帧率
+    frameRate = baudRate / 10 / (IMU.len_imu + IMUFrameParser.frameOverhead)
+    print(f"{len(frames)} frames; at {baudRate} baud up to {frameRate:.0f} frames/s, {1e6 / frameRate:.0f} us per frame")
+    print(f"{'decoder':<22}{'us/frame':>10}{'share of frame time':>21}")
+    decoder = IMUFrameDecoder()
+    for name, function in [("legacy (no check)", legacyDecode), ("batch, verifyCRC", decoder.decode), ("batch, no CRC", IMUFrameDecoder(False).decode)]:
+        _, cost = timed(function, frames)
+        cost /= len(frames)
+        print(f"{name:<22}{cost * 1e6:>10.2f}{cost * frameRate:>20.2%}")
+
+    originals = {frame[7:-1] for frame in stream.frames}
+    impaired = stream.impair(0, bitErrorRate=1e-4, dropRate=1e-4)
+    frames = IMUFrameParser().feed(b"".join(impaired.frames))
+    print(f"impaired stream (ber 1e-4, drop 1e-4): {len(frames)} frames cut")
+    for name, function in [("legacy", legacyDecode), ("batch, verifyCRC", IMUFrameDecoder().decode)]:
+        imuBodies, ahrsBodies = function(frames)
+        corrupt = sum(1 for body in imuBodies + ahrsBodies if body not in originals)
+        print(f"  {name:<20}{len(imuBodies) + len(ahrsBodies):>7} accepted, {corrupt} corrupt samples passed through")
+        if function.__name__ == "decode":
+            assert corrupt == 0
+            print(f"  counters: {function.__self__.statistics()}")
+
+
+if __name__ == "__main__":
+    main()
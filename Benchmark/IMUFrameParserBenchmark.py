@@ -0,0 +1,99 @@
+import random
+import struct
+import time
+
+from Benchmark.ReplayHarness import ReplayStream, imuFrame
+from Drone.IMU import IMU, IMUFrameParser
+
+baudRate = 921600
+count = 20000
+
+
+class LegacyFrameParser:
+    """
+    基线版本 IMU.threadReceive 中的切帧逻辑: 整数列表缓冲区, 逐字节查找帧尾, pop(0) 修剪
+    """
+
+    def __init__(self):
+        self.serialBuffer = []
+
+    def removeInvalidData(self):
+        for i in range(len(self.serialBuffer)):
+            if self.serialBuffer[i] == IMU.frame_header:
+                self.serialBuffer = self.serialBuffer[i:]
+                break
+
+    def feed(self, data) -> list:
+        frames = []
+        self.serialBuffer += list(data)
+        if len(self.serialBuffer) > 0:
+            if self.serialBuffer[0] == IMU.frame_header:
+                for i in range(0, len(self.serialBuffer)):
+                    if IMU.frame_end == self.serialBuffer[i]:
+                        frame = self.serialBuffer[:i + 1]
+                        if len(frame) >= 9:
+                            frames.append(frame)
+                        self.serialBuffer = []
+                        break
+                if len(self.serialBuffer) > 263:
+                    self.serialBuffer.pop(0)
+                    self.removeInvalidData()
+            else:
+                self.removeInvalidData()
+        return frames
+
+
+def makeStream() -> ReplayStream:
+    """
+    随机数据的 IMU / AHRS 帧交替, 消息体与 CRC 中会自然出现 0xFC / 0xFD
+    """
+    rand = random.Random(0)
+    frames = []
+    for i in range(count):
+        if i % 2 == 0:
+            body = struct.pack("<ffffffffffffQ", *[rand.uniform(-10, 10) for _ in range(12)], i)
+            frames.append(imuFrame(IMU.type_imu, i, body))
+        else:
+            body = struct.pack("<ffffffffffQ", *[rand.uniform(-3, 3) for _ in range(10)], i)
+            frames.append(imuFrame(IMU.type_ahrs, i, body))
+    return ReplayStream(frames, baudRate)
+
+
+def run(parserClass, chunks: list):
+    parser = parserClass()
+    frames = []
+    start = time.perf_counter()
+    for chunk in chunks:
+        frames += parser.feed(chunk)
+    return frames, time.perf_counter() - start
+
+
+def main():
+    stream = makeStream()
+    endInBody = sum(1 for frame in stream.frames if IMU.frame_end in frame[1:-1])
+    lineRate = baudRate / 10
+    print(f"{count} frames, {sum(map(len, stream.frames))} bytes, {endInBody} frames contain 0xFD before the frame end")
+    print(f"line rate at {baudRate} baud: {lineRate / 1e3:.1f} kB/s")
+    print(f"{'parser':<10}{'chunk':>10}{'frames':>8}{'exact':>8}{'MB/s':>9}{'x line rate':>13}{'us/frame':>10}")
+    # 串口读取的块大小: 单字节, 0.5ms 轮询间隔在 921600 波特率下约 46 字节, 一次读取多帧
+    for name, minChunk, maxChunk in [("1", 1, 1), ("1-64", 1, 64), ("256-1024", 256, 1024)]:
+        data, _, _, chunks = stream.chunks(0, minChunk, maxChunk)
+        for parserName, parserClass in [("legacy", LegacyFrameParser), ("length", IMUFrameParser)]:
+            frames, elapsed = run(parserClass, chunks)
+            expected = set(stream.frames)
+            exact = sum(1 for frame in frames if bytes(frame) in expected)
+            throughput = len(data) / elapsed
+            print(f"{parserName:<10}{name:>10}{len(frames):>8}{exact:>8}{throughput / 1e6:>9.2f}{throughput / lineRate:>13.1f}"
+                  f"{elapsed / max(1, len(frames)) * 1e6:>10.2f}")
+
+    impaired = stream.impair(0, bitErrorRate=1e-5, dropRate=1e-4)
+    _, _, _, chunks = impaired.chunks(0, 1, 64)
+    parser = IMUFrameParser()
+    frames, _ = run(lambda: parser, chunks)
+    expected = set(stream.frames)
+    intact = sum(1 for frame in impaired.frames if frame in expected)
+    print(f"impaired stream (ber 1e-5, drop 1e-4): {len(frames)} frames cut, {intact} frames intact on the line, parser {parser.statistics()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import argparse
+import threading
+import time
+from queue import Queue
+
+from Benchmark.ReplayHarness import imuStream, printResult, runIMU
+from Drone.IMU import IMU, PipelineMode
+
+
+class LegacyIMU(IMU):
+    """
+    基线版本的四线程结构: 线程之间通过 qsize() 轮询队列, 接收与校验线程每次循环休眠, 解析线程空闲时忙等;
+    切帧与 CRC 校验使用当前版本, 只比较线程结构
+    """
+
+    def startIMU(self):
+        self.connect()
+        self.isRunning = True
+        self.framesBuffer = Queue()
+        targets = [self.threadReceiveLegacy, self.threadDecodeLegacy, self.threadIMUParseLegacy, self.threadAHRSParseLegacy]
+        self.threads = [threading.Thread(target=target) for target in targets]
+        for thread in self.threads:
+            thread.start()
+
+    def threadReceiveLegacy(self):
+        while self.isRunning:
+            data = self.serial.read_all()
+            readTime = time.perf_counter()
+            if data:
+                for frame in self.frameParser.feed(data):
+                    self.framesBuffer.put((readTime, frame))
+            time.sleep(0.0005)
+
+    def threadDecodeLegacy(self):
+        while self.isRunning:
+            if self.framesBuffer.qsize() > 0:
+                readTime, frame = self.framesBuffer.get()
+                imuBodies, ahrsBodies = self.frameDecoder.decode([frame])
+                for dataBody in imuBodies:
+                    self.queueIMU.put((readTime, dataBody))
+                for dataBody in ahrsBodies:
+                    self.queueAHRS.put((readTime, dataBody))
+            time.sleep(0.001)
+
+    def threadIMUParseLegacy(self):
+        while self.isRunning:
+            if self.queueIMU.qsize() > 0:
+                readTime, data = self.queueIMU.get()
+                self.publishIMU([data], readTime)
+
+    def threadAHRSParseLegacy(self):
+        while self.isRunning:
+            if self.queueAHRS.qsize() > 0:
+                readTime, data = self.queueAHRS.get()
+                self.publishAHRS([data], readTime)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare IMU pipeline designs on a replayed 921600-baud stream")
+    parser.add_argument("--count", type=int, default=4000)
+    parser.add_argument("--case", choices=["legacy", "threaded", "single"], action="append")
+    args = parser.parse_args()
+    cases = {"legacy": (LegacyIMU, {}), "threaded": (IMU, {"pipeline": PipelineMode.Threaded}), "single": (IMU, {"pipeline": PipelineMode.Single})}
+    stream = imuStream(args.count)
+    print("wall clock replay at 921600 baud, latency = feeder write of the last frame byte -> sample appended")
+    print(f"{'case':<34}{'received':>15}{'frames/s':>10}{'kB/s':>10}{'p50(ms)':>9}{'p99(ms)':>9}{'cpu(us)':>10}")
+    for name in args.case or list(cases):
+        imuClass, options = cases[name]
+        result = runIMU(stream, wallClock=True, timeout=1.0, imuClass=imuClass, **options)
+        printResult(name, result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import random
+import struct
+import time
+import tracemalloc
+
+from Drone.IMU import AHRSData, IMUData
+
+rate = 200
+duration = 10 * 60
+
+
+class LegacyIMUData:
+    """
+    基线版本的 IMUData: 关键字参数构造, 每个实例带 __dict__
+    """
+
+    def __init__(self, **kwargs):
+        self.angularVelocityX = kwargs.get('angularVelocityX', 0)
+        self.angularVelocityY = kwargs.get('angularVelocityY', 0)
+        self.angularVelocityZ = kwargs.get('angularVelocityZ', 0)
+        self.accelerationX = kwargs.get('accelerationX', 0)
+        self.accelerationY = kwargs.get('accelerationY', 0)
+        self.accelerationZ = kwargs.get('accelerationZ', 0)
+        self.magneticInductionX = kwargs.get('magneticInductionX', 0)
+        self.magneticInductionY = kwargs.get('magneticInductionY', 0)
+        self.magneticInductionZ = kwargs.get('magneticInductionZ', 0)
+        self.IMUTemp = kwargs.get('IMUTemp', 0)
+        self.timeStamp = kwargs.get('timeStamp', 0)
+
+
+class LegacyAHRSData:
+    def __init__(self, **kwargs):
+        self.rollSpeed = kwargs.get('rollSpeed', 0)
+        self.pitchSpeed = kwargs.get('pitchSpeed', 0)
+        self.headingSpeed = kwargs.get('headingSpeed', 0)
+        self.roll = kwargs.get('roll', 0)
+        self.pitch = kwargs.get('pitch', 0)
+        self.heading = kwargs.get('heading', 0)
+        self.Q1 = kwargs.get('Q1', 0)
+        self.Q2 = kwargs.get('Q2', 0)
+        self.Q3 = kwargs.get('Q3', 0)
+        self.Q4 = kwargs.get('Q4', 0)
+        self.timeStamp = kwargs.get('timeStamp', 0)
+
+
+def legacyIMU(data):
+    information = struct.unpack("<ffffffffffffQ", data)
+    angularVelocityX, angularVelocityY, angularVelocityZ = information[0:3]
+    accelerationX, accelerationY, accelerationZ = information[3:6]
+    magneticInductionX, magneticInductionY, magneticInductionZ = information[6:9]
+    IMUTemp, Pressure, PressureTemp = information[9:12]
+    timeStamp = information[12]
+    return LegacyIMUData(angularVelocityX=angularVelocityX, angularVelocityY=angularVelocityY, angularVelocityZ=angularVelocityZ, accelerationX=accelerationX, accelerationY=accelerationY,
+                         accelerationZ=accelerationZ, magneticInductionX=magneticInductionX, magneticInductionY=magneticInductionY, magneticInductionZ=magneticInductionZ, IMUTemp=IMUTemp,
+                         Pressure=Pressure, PressureTemp=PressureTemp, timeStamp=timeStamp)
+
+
+def legacyAHRS(data):
+    information = struct.unpack("<ffffffffffQ", data)
+    rollSpeed, pitchSpeed, headingSpeed = information[0:3]
+    roll, pitch, heading = information[3:6]
+    Q1, Q2, Q3, Q4 = information[6:10]
+    timeStamp = information[10]
+    return LegacyAHRSData(rollSpeed=rollSpeed, pitchSpeed=pitchSpeed, headingSpeed=headingSpeed, roll=roll, pitch=pitch, heading=heading, Q1=Q1, Q2=Q2, Q3=Q3, Q4=Q4, timeStamp=timeStamp)
+
+
+def currentIMU(data):
+    return IMUData(*struct.unpack("<ffffffffffffQ", data))
+
+
+def currentAHRS(data):
+    return AHRSData(*struct.unpack("<ffffffffffQ", data))
+
+
+def makeBodies(count: int):
+    rand = random.Random(0)
+    imuBodies = [struct.pack("<ffffffffffffQ", *[rand.uniform(-10, 10) for _ in range(12)], i * 5000) for i in range(count)]
+    ahrsBodies = [struct.pack("<ffffffffffQ", *[rand.uniform(-3, 3) for _ in range(10)], i * 5000) for i in range(count)]
+    return imuBodies, ahrsBodies
+
+
+def record(parseIMU, parseAHRS, imuBodies, ahrsBodies):
+    """
+    模拟一次飞行的记录过程, 返回 (每个采样的内存占用, 每个采样的构造时间)
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    imuData = [parseIMU(data) for data in imuBodies]
+    ahrsData = [parseAHRS(data) for data in ahrsBodies]
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    count = len(imuData) + len(ahrsData)
+    return size / count, elapsed / count * 1e6
+
+
+def main():
+    count = rate * duration
+    imuBodies, ahrsBodies = makeBodies(count)
+    sample = imuBodies[0]
+    assert all(getattr(currentIMU(sample), name) == getattr(legacyIMU(sample), name) for name in LegacyIMUData().__dict__)
+    print(f"{duration // 60} min flight, IMU + AHRS at {rate}Hz each, {count * 2} samples")
+    print(f"{'version':<10}{'bytes/sample':>14}{'total(MB)':>11}{'us/sample':>11}")
+    for name, parseIMU, parseAHRS in [("legacy", legacyIMU, legacyAHRS), ("slots", currentIMU, currentAHRS)]:
+        perSample, cost = record(parseIMU, parseAHRS, imuBodies, ahrsBodies)
+        print(f"{name:<10}{perSample:>14.0f}{perSample * count * 2 / 1e6:>11.1f}{cost:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
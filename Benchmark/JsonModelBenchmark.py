@@ -0,0 +1,98 @@
+import json
+import random
+import timeit
+from enum import Enum
+
+import Benchmark.LegacyJsonModel as legacy
+from DataStructure.InformationData import EngineInfo, GPSInfo, InertiaInfo, PowerInfo
+from DataStructure.JsonModel import Example, JObject, to_dict, to_object, update_object
+
+
+class Mode(Enum):
+    Idle = "idle"
+    Armed = "armed"
+
+
+class Nested(JObject):
+    def __init__(self, **kwargs):
+        self.mode: Mode = Mode.Idle
+        self.modeClass = Mode
+        self.inertia: InertiaInfo = InertiaInfo()
+        self.tags: list = []
+        self.name: str = ""
+
+        super().__init__(**kwargs)
+
+
+def legacyFromJson(_class, text):
+    """
+    基线 JObject(json=...) 的构造过程: 先构造自身, 再由 to_object 构造临时对象并逐个拷贝字段
+    """
+    obj = _class()
+    source = legacy.to_object(json.loads(text), _class)
+    for variable_name in source.__dict__.keys():
+        setattr(obj, variable_name, getattr(source, variable_name))
+    return obj
+
+
+def makeObjects():
+    rand = random.Random(0)
+    objects = []
+    for _class in [InertiaInfo, PowerInfo, EngineInfo, GPSInfo]:
+        obj = _class()
+        for name in obj.__dict__:
+            setattr(obj, name, rand.uniform(-180, 180))
+        objects.append(obj)
+    return objects
+
+
+def checkEquivalence():
+    """
+    编译序列化器与基线实现逐项对比, 包括枚举、嵌套对象、可调用字段以及运行时被替换类型的字段(走回退路径)
+    """
+    nested = Nested()
+    nested.mode = Mode.Armed
+    nested.inertia.xAxisAcceleration = 1.5
+    nested.tags = [1, 2]
+    replaced = Example()
+    replaced.b = 5
+    replaced.c = None
+    extended = InertiaInfo()
+    extended.extra = "x"
+    samples = makeObjects() + [Example(), nested, replaced, extended]
+    for obj in samples:
+        assert to_dict(obj) == legacy.to_dict(obj), type(obj).__name__
+        data = legacy.to_dict(obj)
+        assert legacy.to_dict(to_object(data, type(obj))) == legacy.to_dict(legacy.to_object(data, type(obj)))
+        fromJson = type(obj)(json=json.dumps(data))
+        assert legacy.to_dict(fromJson) == legacy.to_dict(legacy.to_object(data, type(obj)))
+        target, reference = type(obj)(), type(obj)()
+        assert update_object(data, target) == legacy.update_object(data, reference), type(obj).__name__
+        assert legacy.to_dict(target) == legacy.to_dict(reference)
+        assert json.loads(obj.json(compact=True)) == json.loads(obj.json())
+    # 运行时类型与默认实例不同的更新走回退路径
+    target, reference = Nested(), Nested()
+    target.inertia = reference.inertia = None
+    assert update_object({"inertia": 1}, target) == legacy.update_object({"inertia": 1}, reference)
+
+
+def main():
+    checkEquivalence()
+    number = 20000
+    print(f"{'type':<14}{'to_dict(us)':>18}{'from json(us)':>18}{'update(us)':>18}{'json(B)':>10}{'compact(B)':>12}")
+    for obj in makeObjects():
+        _class = type(obj)
+        data = to_dict(obj)
+        text = json.dumps(data)
+        costs = []
+        for new, old in [(lambda: to_dict(obj), lambda: legacy.to_dict(obj)),
+                         (lambda: _class(json=text), lambda: legacyFromJson(_class, text)),
+                         (lambda: update_object(data, obj), lambda: legacy.update_object(data, obj))]:
+            newCost = timeit.timeit(new, number=number) / number * 1e6
+            oldCost = timeit.timeit(old, number=number) / number * 1e6
+            costs.append(f"{oldCost:.2f}->{newCost:.2f}")
+        print(f"{_class.__name__:<14}{costs[0]:>18}{costs[1]:>18}{costs[2]:>18}{len(obj.json()):>10}{len(obj.json(compact=True)):>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+import json
+import os
+import tempfile
+
+from Communication.RadioLayer import readFile
+
+
+def makeLoopbackConfig(**overrides) -> str:
+    """
+    生成一个以 pyserial loop:// 作为串口的临时配置文件, 两端都使用同一个回环串口
+    :param overrides: 覆盖的配置项
+    :return: 配置文件路径
+    """
+    config = json.loads(readFile(os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "Communication", "config.json")))
+    for configType in config:
+        config[configType]["serialName"] = "loop://"
+        config[configType].update(overrides)
+    fileDescriptor, path = tempfile.mkstemp(suffix=".json")
+    with os.fdopen(fileDescriptor, "w", encoding="utf-8") as f:
+        json.dump(config, f)
+    return path
@@ -0,0 +1,78 @@
+import json
+import time
+import timeit
+
+from Benchmark.Loopback import makeLoopbackConfig
+from Communication.DataProcessingLayer import DataInterface, MessageRegistry, packNormal, packShort, packState, packTyped, parseMessage
+from DataStructure.InformationData import GPSInfo
+from DataStructure.JsonModel import to_dict
+
+
+def legacyDispatch(message: bytes, buffers: dict):
+    """
+    基线版本 onMessageUpdate 的分发方式: 消息头解码为文本后逐个比较, 消息体切片复制
+    """
+    header, data = parseMessage(message)
+    if header == "SHORT":
+        buffers["SHORT"].append(data)
+    elif header == "TYPED":
+        buffers["TYPED"].append(data)
+    else:
+        buffers["JSON-"].append(data)
+
+
+def measureDispatch():
+    gps = GPSInfo()
+    messages = {"JSON-": packNormal(to_dict(gps)), "SHORT": packShort(b"ARM"), "TYPED": packTyped(gps)}
+    buffers = {name: [] for name in messages}
+    registry = MessageRegistry()
+    registry.register(b"JSON-", lambda body: json.loads(str(body, "utf-8")), lambda content, receiveTime: buffers["JSON-"].append(content))
+    registry.register(b"SHORT", lambda body: str(body, "utf-8"), lambda content, receiveTime: buffers["SHORT"].append(content))
+    registry.register(b"TYPED", None, lambda content, receiveTime: buffers["TYPED"].append(content))
+    number = 50000
+    print(f"{'message':<8}{'legacy(us)':>12}{'registry(us)':>14}")
+    for name, message in messages.items():
+        legacyCost = timeit.timeit(lambda: legacyDispatch(message, buffers), number=number) / number * 1e6
+        registryCost = timeit.timeit(lambda: registry.dispatch(message, 0.0), number=number) / number * 1e6
+        for values in buffers.values():
+            values.clear()
+        print(f"{name:<8}{legacyCost:>12.2f}{registryCost:>14.2f}")
+    print("TYPED is registered without a decoder here, so the handler receives the raw memoryview slice")
+
+
+def measureLatency(count=200, interval=0.005):
+    """
+    经 loop:// 回环发送 SHORT 消息, 对比回调处理与按 10ms 周期轮询队列两种方式从收到到被应用处理的延迟
+    """
+    dataInterface = DataInterface("drone", configPath=makeLoopbackConfig())
+    callbackDelays = []
+    # 同时比较回调与轮询队列, 保留默认队列
+    dataInterface.addHandler(b"SHORT", lambda content, receiveTime: callbackDelays.append(time.time() - float(content)), keepQueue=True)
+    dataInterface.connect()
+    pollDelays = []
+    try:
+        for _ in range(count):
+            dataInterface.sendShort(repr(time.time()).encode("utf-8"))
+            time.sleep(interval)
+            while True:
+                data, _ = dataInterface.getMessageShort()
+                if data is None:
+                    break
+                pollDelays.append(time.time() - float(data))
+            time.sleep(0.01 - interval)
+    finally:
+        dataInterface.disconnect()
+    for name, delays in [("callback", callbackDelays), ("poll 10ms", pollDelays)]:
+        delays.sort()
+        if delays:
+            print(f"{name:<10} messages {len(delays):>4}  p50 {delays[len(delays) // 2] * 1e3:6.2f}ms  p99 {delays[int(len(delays) * 0.99)] * 1e3:6.2f}ms")
+
+
+def main():
+    measureDispatch()
+    measureLatency()
+    assert parseMessage(packState({"n": "GPSInfo", "a": 1}))[0] == "STATE"
+
+
+if __name__ == "__main__":
+    main()
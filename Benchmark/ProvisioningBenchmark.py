@@ -0,0 +1,109 @@
+import os
+import re
+import select
+import tempfile
+import threading
+import time
+import tty
+
+from loguru import logger
+
+from Benchmark.Loopback import makeLoopbackConfig
+from Communication.RadioLayer import RadioConnector
+
+
+class LegacyRadioConnector(RadioConnector):
+    """
+    基线版本的 setRadio: 忙等读取, 字符串无限增长, 超时在收到提示信息后才开始计算
+    """
+
+    def setRadio(self):
+        outputBuffer = ""
+        start = None
+        self._openSerial(self.serialName, self.settingBaudRate)
+        while True:
+            outputBuffer += self.serial.read_all().decode('utf-8')
+            if re.match(r'^#1 UartConfig', outputBuffer):
+                time.sleep(0.5)
+                outputBuffer = ""
+                command = self.templateSettingCommand.format(baudRate=self.dictBaudRate[str(self.baudRate)], channel=self.channel)
+                self.serial.write(command.encode('utf-8'))
+                start = time.time()
+            if start is not None:
+                if time.time() - start > 5:
+                    break
+                if re.match(r'^#5 done', outputBuffer):
+                    break
+        self._closeSerial()
+        return True
+
+
+class FakeRadio:
+    def __init__(self, bootDelay=0.3, banner=True):
+        """
+        模拟 DL-30 的配置模式: 上电 bootDelay 秒后输出提示信息, 收到配置指令后回复 "#5 done"
+        """
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.master)
+        tty.setraw(self.slave)
+        self.name = os.ttyname(self.slave)
+        self.bootDelay = bootDelay
+        self.banner = banner
+        self.commands = []
+        self.isRunning = True
+        self.thread = threading.Thread(target=self.threadRun)
+        self.thread.start()
+
+    def threadRun(self):
+        time.sleep(self.bootDelay)
+        if self.banner:
+            os.write(self.master, b"#1 UartConfig\r\n#2 Channel\r\n#3 Rate\r\n")
+        buffer = b""
+        while self.isRunning:
+            if select.select([self.master], [], [], 0.05)[0]:
+                buffer += os.read(self.master, 256)
+                if buffer.startswith(b"DL-30") and buffer.count(b" ") >= 3:
+                    self.commands.append(buffer.decode("utf-8"))
+                    buffer = b""
+                    time.sleep(0.05)
+                    os.write(self.master, b"#4 Saving\r\n#5 done\r\n")
+
+    def close(self):
+        self.isRunning = False
+        self.thread.join()
+        os.close(self.master)
+        os.close(self.slave)
+
+
+def measure(connectorClass, configPath, **radioOptions):
+    radio = FakeRadio(**radioOptions)
+    connector = connectorClass("drone", configPath)
+    connector.serialName = radio.name
+    cpuStart = time.process_time()
+    start = time.perf_counter()
+    result = connector.setRadio()
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpuStart
+    radio.close()
+    return result, elapsed, cpu, len(radio.commands), connector.provisionTimings
+
+
+def main():
+    logger.remove()
+    stampPath = os.path.join(tempfile.mkdtemp(), "radio.json")
+    configPath = makeLoopbackConfig(provisionStampPath=stampPath, provisionTimeout=3)
+    print(f"{'case':<30}{'result':>8}{'time(s)':>9}{'cpu(s)':>8}{'commands':>10}  phases")
+    cases = [("legacy", LegacyRadioConnector, {}),
+             ("event-driven, first boot", RadioConnector, {}),
+             ("event-driven, already set", RadioConnector, {}),
+             ("event-driven, no banner", RadioConnector, {"banner": False})]
+    for name, connectorClass, radioOptions in cases:
+        if name.endswith("no banner"):
+            os.remove(stampPath)
+        result, elapsed, cpu, commands, timings = measure(connectorClass, configPath, **radioOptions)
+        phases = ", ".join(f"{phase} {value:.3f}" for phase, value in timings.items()) if connectorClass is RadioConnector else ""
+        print(f"{name:<30}{str(result):>8}{elapsed:>9.3f}{cpu:>8.3f}{commands:>10}  {phases}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+接收链路的回放测试工具
+
+把录制的或合成的字节流经 pyserial loop:// 或 pty 送入 RadioConnector / DataInterface 或 IMU, 可模拟分块到达、误码与丢字节,
+按线路速度(wall)或最快速度(max)回放, 统计帧率、字节率、端到端延迟(p50/p99)与每帧 CPU 时间
+
+    python -m Benchmark.ReplayHarness                      运行默认的测试组合
+    python -m Benchmark.ReplayHarness --target imu --transport pty --speed wall --ber 1e-5
+    python -m Benchmark.ReplayHarness --recording <飞行记录目录>   回放 FlightRecorder 记录的无线数据帧
+"""
+import argparse
+import bisect
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+from Benchmark.Loopback import makeLoopbackConfig
+from Communication.DataPacket import DataPacket
+from Communication.DataProcessingLayer import DataInterface
+from DataStructure.FlightRecorder import FlightLog
+from DataStructure.SampleRing import SampleRing
+from Drone.IMU import IMU, crc16, crc8
+
+# 回放消息使用单独的消息头, 不经过 DataInterface 的默认消息队列
+replayPrefix = b"RPLAY"
+
+
+class ReplayStream:
+    def __init__(self, frames: list, baudRate: int, linkConfig: dict = None):
+        """
+        :param frames: 线路上的各帧数据, 第 i 帧携带编号 i
+        :param baudRate: 回放使用的线路波特率
+        :param linkConfig: 编码该数据流时的链路配置(framing / fragmented / compressed), 回放时接收端使用相同配置
+        """
+        self.frames = frames
+        self.baudRate = baudRate
+        self.linkConfig = linkConfig or {}
+
+    def impair(self, seed=0, bitErrorRate=0.0, dropRate=0.0):
+        """
+        按比特翻转误码率与逐字节丢失率破坏数据
+        :return: 新的 ReplayStream
+        """
+        generator = np.random.default_rng(seed)
+        frames = []
+        for frame in self.frames:
+            data = np.frombuffer(frame, dtype=np.uint8).copy()
+            flips = generator.binomial(len(data) * 8, bitErrorRate) if bitErrorRate > 0 else 0
+            for position in generator.integers(0, len(data) * 8, flips):
+                data[position // 8] ^= 1 << (position % 8)
+            if dropRate > 0:
+                data = data[generator.random(len(data)) >= dropRate]
+            frames.append(data.tobytes())
+        return ReplayStream(frames, self.baudRate, self.linkConfig)
+
+    def chunks(self, seed=0, minChunk=1, maxChunk=64):
+        """
+        把字节流切成随机长度的块, 模拟串口驱动每次读到的数据
+        :return: (数据流, 各帧结束位置, 各块结束位置, 块列表)
+        """
+        stream = b"".join(self.frames)
+        frameEnds = np.cumsum([len(frame) for frame in self.frames]).tolist()
+        generator = np.random.default_rng(seed + 1)
+        chunkEnds = []
+        position = 0
+        while position < len(stream):
+            position = min(len(stream), position + int(generator.integers(minChunk, maxChunk + 1)))
+            chunkEnds.append(position)
+        chunks = [stream[start:end] for start, end in zip([0] + chunkEnds[:-1], chunkEnds)]
+        return stream, frameEnds, chunkEnds, chunks
+
+
+def _linkConfig(dataPacket: DataPacket) -> dict:
+    return {"framing": dataPacket.framing.value, "fragmented": dataPacket.fragmented, "compressed": dataPacket.compressed,
+            "presetDictionary": dataPacket.presetDictionary is not None}
+
+
+def radioStream(count: int, payloadSize=32, baudRate=115200, **dataPacketOptions) -> ReplayStream:
+    """
+    合成的无线数据流, 每帧为一条 RPLAY 消息, 消息体以 8 位数字编号开头
+    """
+    dataPacket = DataPacket(**dataPacketOptions)
+    filler = b"x" * max(0, payloadSize - 8)
+    return ReplayStream([dataPacket.encodeMany([replayPrefix + b"%08d" % i + filler]) for i in range(count)], baudRate, _linkConfig(dataPacket))
+
+
+def recordedRadioStream(directory: str, baudRate=115200, **dataPacketOptions) -> ReplayStream:
+    """
+    把 FlightRecorder 记录的无线数据帧重新编号后编码为数据流
+    """
+    flightLog = FlightLog(directory)
+    dataPacket = DataPacket(**dataPacketOptions)
+    frames = [dataPacket.encodeMany([replayPrefix + b"%08d" % i + bytes(data)]) for i, (_, data) in enumerate(flightLog.blobs("radio"))]
+    flightLog.close()
+    return ReplayStream(frames, baudRate, _linkConfig(dataPacket))
+
+
+def imuFrame(dataType: int, number: int, body: bytes) -> bytes:
+    header = struct.pack("BBBB", IMU.frame_header, dataType, len(body), number & 0xFF)
+    return header + bytes([crc8(header)]) + struct.pack("<H", crc16(body)) + body + bytes([IMU.frame_end])
+
+
+def imuStream(count: int, baudRate=921600) -> ReplayStream:
+    """
+    合成的 IMU 数据流, IMU 帧与 AHRS 帧交替, 数据中的 timeStamp 为帧编号
+    """
+    frames = []
+    for i in range(count):
+        if i % 2 == 0:
+            body = struct.pack("<ffffffffffffQ", *[float(i)] * 12, i)
+            frames.append(imuFrame(IMU.type_imu, i, body))
+        else:
+            body = struct.pack("<ffffffffffQ", *[float(i)] * 10, i)
+            frames.append(imuFrame(IMU.type_ahrs, i, body))
+    return ReplayStream(frames, baudRate)
+
+
+class Feeder:
+    def __init__(self, write, chunks: list, chunkEnds: list, baudRate: int, wallClock: bool):
+        """
+        回放线程, wallClock 为 True 时按波特率控制写入速度
+        """
+        self.write = write
+        self.chunks = chunks
+        self.chunkEnds = chunkEnds
+        self.bytesPerSecond = baudRate / 10
+        self.wallClock = wallClock
+        self.writeTimes = []
+        self.cpuTime = 0.0
+        self.thread = threading.Thread(target=self.threadFeed)
+
+    def threadFeed(self):
+        cpuStart = time.thread_time()
+        start = time.perf_counter()
+        for chunk, end in zip(self.chunks, self.chunkEnds):
+            if self.wallClock:
+                delay = start + end / self.bytesPerSecond - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            self.write(chunk)
+            self.writeTimes.append(time.perf_counter())
+        self.cpuTime = time.thread_time() - cpuStart
+
+    def writeTime(self, offset: int) -> float:
+        """
+        包含指定位置字节的块的写入时间
+        """
+        return self.writeTimes[bisect.bisect_left(self.chunkEnds, offset)]
+
+
+class PtyPort:
+    def __init__(self):
+        import pty
+        import tty
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.master)
+        tty.setraw(self.slave)
+        self.name = os.ttyname(self.slave)
+
+    def write(self, data: bytes):
+        view = memoryview(data)
+        while len(view) > 0:
+            view = view[os.write(self.master, view):]
+
+    def close(self):
+        os.close(self.master)
+        os.close(self.slave)
+
+
+def runRadio(stream: ReplayStream, transport="loop", wallClock=False, minChunk=1, maxChunk=64, seed=0, timeout=5.0) -> dict:
+    """
+    经 RadioConnector + DataInterface 回放无线数据流
+    """
+    _, frameEnds, chunkEnds, chunks = stream.chunks(seed, minChunk, maxChunk)
+    port = PtyPort() if transport == "pty" else None
+    # 接收端按数据流的编码方式配置, 否则分片 / 帧格式不一致时所有帧都会被丢弃
+    overrides = {"baudRate": str(stream.baudRate), "transmitScheduler": {"enabled": False}, **stream.linkConfig}
+    if port is not None:
+        overrides["serialName"] = port.name
+    dataInterface = DataInterface("drone", configPath=makeLoopbackConfig(**overrides))
+    received = []
+
+    def onReplay(body: memoryview, receiveTime: float):
+        # 误码可能破坏编号, 无法解析的编号记为 -1
+        index = bytes(body[:8])
+        received.append((int(index) if index.isdigit() else -1, time.perf_counter()))
+
+    dataInterface.registerMessage(replayPrefix, None, onReplay)
+    dataInterface.connect()
+    try:
+        feeder = Feeder(port.write if port is not None else dataInterface.radioConnector.serial.write, chunks, chunkEnds, stream.baudRate, wallClock)
+        return _measure(feeder, received, frameEnds, len(stream.frames), timeout)
+    finally:
+        dataInterface.disconnect()
+        if port is not None:
+            port.close()
+
+
+class _TimedRing(SampleRing):
+    """
+    记录每条记录写入时间的环形缓冲区, 替换 IMU.imuData / ahrsData 用于测量延迟
+    """
+
+    def __init__(self, received: list, dtype, capacity: int):
+        super().__init__(dtype, capacity)
+        self.received = received
+
+    def extendBytes(self, data):
+        now = time.perf_counter()
+        self.received.extend((timeStamp, now) for timeStamp in np.frombuffer(data, dtype=self.dtype)["timeStamp"].tolist())
+        super().extendBytes(data)
+
+
+def runIMU(stream: ReplayStream, wallClock=False, minChunk=1, maxChunk=64, seed=0, timeout=5.0, imuClass=IMU, **imuOptions) -> dict:
+    """
+    经 pty 回放 IMU 数据流
+    :param imuClass: IMU 或其子类
+    :param imuOptions: 传给 imuClass 的其他参数, 如 pipeline
+    """
+    _, frameEnds, chunkEnds, chunks = stream.chunks(seed, minChunk, maxChunk)
+    port = PtyPort()
+    imu = imuClass(port.name, stream.baudRate, **imuOptions)
+    received = []
+    imu.imuData = _TimedRing(received, imu.imuData.dtype, imu.imuData.capacity)
+    imu.ahrsData = _TimedRing(received, imu.ahrsData.dtype, imu.ahrsData.capacity)
+    imu.startIMU()
+    try:
+        feeder = Feeder(port.write, chunks, chunkEnds, stream.baudRate, wallClock)
+        return _measure(feeder, received, frameEnds, len(stream.frames), timeout)
+    finally:
+        imu.stop()
+        port.close()
+
+
+def _measure(feeder: Feeder, received: list, frameEnds: list, count: int, timeout: float) -> dict:
+    cpuStart = time.process_time()
+    start = time.perf_counter()
+    feeder.thread.start()
+    feeder.thread.join()
+    # 等待接收端处理完, 超过 timeout 仍未收到新数据时结束
+    lastCount = -1
+    lastChange = time.perf_counter()
+    while len(received) < count and time.perf_counter() - lastChange < timeout:
+        if len(received) != lastCount:
+            lastCount = len(received)
+            lastChange = time.perf_counter()
+        time.sleep(0.01)
+    end = max([receiveTime for _, receiveTime in received], default=time.perf_counter())
+    cpuTime = time.process_time() - cpuStart - feeder.cpuTime
+    latencies = sorted(receiveTime - feeder.writeTime(frameEnds[index] - 1) for index, receiveTime in received if 0 <= index < count)
+    elapsed = end - start
+    return {
+        "frames": len(received),
+        "sent": count,
+        "framesPerSecond": len(received) / elapsed if elapsed > 0 else 0.0,
+        "bytesPerSecond": frameEnds[-1] / elapsed if elapsed > 0 else 0.0,
+        "p50": latencies[len(latencies) // 2] if latencies else float("nan"),
+        "p99": latencies[int(len(latencies) * 0.99)] if latencies else float("nan"),
+        "cpuPerFrame": cpuTime / len(received) if received else float("nan"),
+    }
+
+
+def printResult(name: str, result: dict):
+    print(f"{name:<34}{result['frames']:>7}/{result['sent']:<7}{result['framesPerSecond']:>10.0f}{result['bytesPerSecond'] / 1e3:>10.1f}"
+          f"{result['p50'] * 1e3:>9.2f}{result['p99'] * 1e3:>9.2f}{result['cpuPerFrame'] * 1e6:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay byte streams through the receive pipeline")
+    parser.add_argument("--target", choices=["radio", "imu"])
+    parser.add_argument("--transport", choices=["loop", "pty"], default="loop")
+    parser.add_argument("--speed", choices=["wall", "max"], default="max")
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--chunk", type=int, nargs=2, default=[1, 64], metavar=("MIN", "MAX"))
+    parser.add_argument("--ber", type=float, default=0.0, help="bit error rate")
+    parser.add_argument("--drop", type=float, default=0.0, help="dropped byte rate")
+    parser.add_argument("--framing", choices=["v1", "v2"], default="v1")
+    parser.add_argument("--recording", help="FlightRecorder directory to replay")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'case':<34}{'received':>15}{'frames/s':>10}{'kB/s':>10}{'p50(ms)':>9}{'p99(ms)':>9}{'cpu(us)':>10}")
+    if args.target is None and args.recording is None:
+        cases = [("radio loop max", "radio", "loop", False, 0.0, 0.0), ("radio loop max ber 1e-5", "radio", "loop", False, 1e-5, 0.0),
+                 ("radio pty wall", "radio", "pty", True, 0.0, 0.0), ("radio pty max drop 1e-4", "radio", "pty", False, 0.0, 1e-4),
+                 ("imu pty max", "imu", "pty", False, 0.0, 0.0), ("imu pty wall", "imu", "pty", True, 0.0, 0.0)]
+    else:
+        cases = [(f"{args.target or 'radio'} {args.transport} {args.speed}", args.target or "radio", args.transport, args.speed == "wall", args.ber, args.drop)]
+    for name, target, transport, wallClock, bitErrorRate, dropRate in cases:
+        if target == "imu":
+            stream = imuStream(args.count).impair(args.seed, bitErrorRate, dropRate)
+            result = runIMU(stream, wallClock, args.chunk[0], args.chunk[1], args.seed)
+        else:
+            if args.recording is not None:
+                stream = recordedRadioStream(args.recording, framing=args.framing, fragmented=True)
+            else:
+                stream = radioStream(args.count, framing=args.framing, fragmented=True)
+            stream = stream.impair(args.seed, bitErrorRate, dropRate)
+            result = runRadio(stream, transport, wallClock, args.chunk[0], args.chunk[1], args.seed)
+        printResult(name, result)
+
+
+if __name__ == "__main__":
+    main()
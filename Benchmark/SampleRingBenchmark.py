@@ -0,0 +1,84 @@
+import random
+import struct
+import time
+import tracemalloc
+
+import numpy as np
+
+from DataStructure.SampleRing import SampleRing
+from Drone.IMU import IMU, IMUData, imuDtype
+
+# 全部为 IMU 帧时 921600 波特率下的帧率
+rate = 1440
+duration = 10 * 60
+capacity = 65536
+
+
+def makeBodies(count: int) -> list:
+    rand = random.Random(0)
+    return [struct.pack("<ffffffffffffQ", *[rand.uniform(-10, 10) for _ in range(12)], i * 694) for i in range(count)]
+
+
+def legacyPublish(samples: list, bodies: list):
+    for data in bodies:
+        samples.append(IMUData(*struct.unpack("<ffffffffffffQ", data)))
+
+
+def main():
+    bodies = makeBodies(20000)
+    print(f"{'batch':>6}{'struct + IMUData(us/sample)':>29}{'frombuffer ring(us/sample)':>28}")
+    for batch in [1, 8, 64]:
+        batches = [bodies[i:i + batch] for i in range(0, len(bodies), batch)]
+        samples = []
+        start = time.perf_counter()
+        for group in batches:
+            legacyPublish(samples, group)
+        legacyCost = (time.perf_counter() - start) / len(bodies)
+        ring = SampleRing(imuDtype, capacity)
+        start = time.perf_counter()
+        for group in batches:
+            ring.extendBytes(b"".join(group))
+        ringCost = (time.perf_counter() - start) / len(bodies)
+        print(f"{batch:>6}{legacyCost * 1e6:>29.2f}{ringCost * 1e6:>28.2f}")
+
+    # 环形缓冲区回绕后的内容与最后 capacity 个采样一致
+    ring = SampleRing(imuDtype, 1000)
+    for i in range(0, len(bodies), 37):
+        ring.extendBytes(b"".join(bodies[i:i + 37]))
+    expected = np.frombuffer(b"".join(bodies[-1000:]), dtype=imuDtype)
+    assert np.array_equal(ring.view(), expected) and ring.latest() == expected[-1].item()
+    window = ring.window(0.1)
+    assert window.flags.c_contiguous and np.shares_memory(window, ring.storage) and not window.flags.writeable
+    assert window["timeStamp"][0] >= expected["timeStamp"][-1] - 100000 > window["timeStamp"][0] - 694 * 2
+    ring.extend(expected[:10])
+    assert np.array_equal(ring.view(10), expected[:10])
+
+    samplesPerFlight = rate * duration
+    chunk = b"".join(bodies[:rate])
+    tracemalloc.start()
+    samples = []
+    for _ in range(duration):
+        legacyPublish(samples, bodies[:rate])
+    legacyMemory = tracemalloc.get_traced_memory()[0]
+    del samples
+    tracemalloc.stop()
+    tracemalloc.start()
+    ring = SampleRing(imuDtype, capacity)
+    for _ in range(duration):
+        ring.extendBytes(chunk)
+    ringMemory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{duration / 60:.0f} min at {rate}Hz ({samplesPerFlight} samples): list {legacyMemory / 1e6:.1f}MB and growing, "
+          f"ring {ringMemory / 1e6:.1f}MB fixed ({capacity} samples, {capacity / rate:.0f}s)")
+
+    for name, function in [("latest()", ring.latest), ("view(1000)", lambda: ring.view(1000)), ("window(0.5)", lambda: ring.window(0.5))]:
+        start = time.perf_counter()
+        for _ in range(10000):
+            function()
+        print(f"{name:<12}{(time.perf_counter() - start) / 10000 * 1e6:>8.2f} us")
+    frame = IMU.len_imu + 8
+    print(f"frame time at 921600 baud: {frame * 10 / 921600 * 1e6:.0f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import collections
+import io
+import os
+import time
+
+import numpy as np
+import prettytable as pt
+
+from Drone.IMU import imuDtype
+from Drone.SensorFilter import FilterKind, SensorFilter, lowPassTaps
+
+sampleRate = 720
+duration = 60
+vibration = 80.0
+
+
+def makeData(seed=0) -> np.ndarray:
+    """
+    合成的 IMU 数据: 0.5Hz 机动 + 80Hz 电机振动 + 噪声, 720Hz(921600 波特率下 IMU / AHRS 交替时的 IMU 速率)
+    """
+    generator = np.random.default_rng(seed)
+    t = np.arange(duration * sampleRate) / sampleRate
+    n = len(t)
+    imu = np.zeros(n, dtype=imuDtype)
+    imu['timeStamp'] = np.round(t * 1e6).astype(np.uint64)
+    for name in imuDtype.names[:9]:
+        imu[name] = np.sin(2 * np.pi * 0.5 * t) + 2.0 * np.sin(2 * np.pi * vibration * t + generator.uniform(0, 6)) + generator.normal(0, 0.05, n)
+    return imu
+
+
+def batches(imu: np.ndarray, seed=1) -> list:
+    """
+    按 IMU 线程的节奏切成 1~2 个采样的小批
+    """
+    generator = np.random.default_rng(seed)
+    sizes = generator.integers(1, 3, len(imu))
+    ends = np.cumsum(sizes)
+    ends = ends[ends < len(imu)]
+    return np.split(imu, ends)
+
+
+class NaiveConsumer:
+    """
+    基线: 每个使用者接收全速率的每一个采样, 逐采样做 FIR 低通(或不滤波), 按自己的频率取值
+    """
+
+    def __init__(self, rate: float, kind: FilterKind, taps=31):
+        self.interval = 1000000 / rate
+        self.nextTime = 0
+        self.outputs = []
+        self.coefficients = lowPassTaps(0.4 * rate, sampleRate, taps) if kind == FilterKind.FIR else None
+        self.window = collections.deque(maxlen=taps)
+
+    def onSample(self, record):
+        if self.coefficients is not None:
+            self.window.append(record[:9])
+            if len(self.window) < self.window.maxlen:
+                return
+            filtered = self.coefficients[::-1] @ np.array(self.window)
+        else:
+            filtered = record[:9]
+        if record[-1] >= self.nextTime:
+            self.nextTime = record[-1] + self.interval
+            self.outputs.append(filtered)
+
+
+def runNaive(chunks: list, subscriptions: list):
+    consumers = [NaiveConsumer(rate, kind) for rate, kind in subscriptions]
+    start = time.process_time()
+    for chunk in chunks:
+        for record in chunk.tolist():
+            for consumer in consumers:
+                consumer.onSample(record)
+    return consumers, time.process_time() - start
+
+
+def runFilter(chunks: list, subscriptions: list):
+    sensorFilter = SensorFilter(imuDtype)
+    results = [sensorFilter.subscribe(rate, kind=kind) for rate, kind in subscriptions]
+    start = time.process_time()
+    for chunk in chunks:
+        sensorFilter.update(chunk)
+    return sensorFilter, results, time.process_time() - start
+
+
+def residual(imu: np.ndarray, rate: float, kind: FilterKind) -> float:
+    """
+    输出中与 0.5Hz 机动信号的 RMS 偏差(振动混叠 + 噪声)
+    """
+    sensorFilter = SensorFilter(imuDtype)
+    outputs = []
+    sensorFilter.subscribe(rate, callback=outputs.append, kind=kind)
+    for chunk in batches(imu):
+        sensorFilter.update(chunk)
+    result = np.concatenate([item['angularVelocityX'] for item in outputs])
+    times = np.concatenate([item['timeStamp'] for item in outputs]) * 1e-6
+    if kind == FilterKind.FIR:
+        # FIR 的群延迟为 15 个采样
+        times = times - 15 / sampleRate
+    return float(np.sqrt(np.mean((result - np.sin(2 * np.pi * 0.5 * times)) ** 2)))
+
+
+def redrawCost(records: list, clear: bool):
+    """
+    基线: 每次新建 PrettyTable 并清屏; 新: 复用表格, ANSI 原位刷新
+    """
+    sink = io.StringIO()
+    fieldNames = list(imuDtype.names[:9]) + ['IMUTemp', 'timeStamp']
+    table = pt.PrettyTable()
+    table.field_names = fieldNames
+    start = time.perf_counter()
+    for record in records:
+        values = ['%.6f' % round(x, 6) for x in record[:10] + (record[-1],)]
+        if clear:
+            table = pt.PrettyTable()
+            table.field_names = fieldNames
+            table.add_row(values)
+            os.system('clear > /dev/null')
+            sink.write(f"{table}\n")
+        else:
+            table.clear_rows()
+            table.add_row(values)
+            sink.write("\x1b[H" + "\x1b[K\n".join(table.get_string().split("\n")) + "\x1b[K\n\x1b[J")
+    return (time.perf_counter() - start) / len(records)
+
+
+def main():
+    imu = makeData()
+    chunks = batches(imu)
+    print(f"{duration}s synthetic IMU at {sampleRate}Hz, {vibration:.0f}Hz vibration, {len(chunks)} batches of 1-2 samples")
+    subscriptions = [(10.0, FilterKind.FIR), (50.0, FilterKind.FIR), (2.0, FilterKind.Decimate)]
+    consumers, naiveCost = runNaive(chunks, subscriptions)
+    sensorFilter, results, filterCost = runFilter(chunks, subscriptions)
+    print(f"consumers 10Hz fir / 50Hz fir / 2Hz decimate")
+    print(f"per-sample consumers:       {naiveCost / len(imu) * 1e6:.2f} us/sample ({naiveCost / duration:.2%} of one core), "
+          f"outputs {[len(consumer.outputs) for consumer in consumers]}")
+    print(f"SensorFilter:               {filterCost / len(imu) * 1e6:.2f} us/sample ({filterCost / duration:.2%} of one core), "
+          f"outputs {[result.count for result in results]}")
+
+    iir = runFilter(chunks, [(10.0, FilterKind.IIR)])[2]
+    print(f"SensorFilter 10Hz iir only: {iir / len(imu) * 1e6:.2f} us/sample")
+
+    print(f"{'rate':>6}{'decimate rms':>14}{'fir rms':>10}  (deviation from the 0.5Hz manoeuvre, vibration amplitude 2.0)")
+    for rate in [10.0, 50.0]:
+        print(f"{rate:>6.0f}{residual(imu, rate, FilterKind.Decimate):>14.3f}{residual(imu, rate, FilterKind.FIR):>10.3f}")
+
+    records = imu[:200].tolist()
+    print(f"console redraw: PrettyTable rebuild + os.system('clear') {redrawCost(records, True) * 1e3:.2f} ms, "
+          f"reused table + ANSI in-place {redrawCost(records, False) * 1e3:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
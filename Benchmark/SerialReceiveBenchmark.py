@@ -0,0 +1,76 @@
+import statistics
+import threading
+import time
+
+import serial
+from loguru import logger
+
+from Benchmark.Loopback import makeLoopbackConfig
+from Communication.RadioLayer import RadioConnector
+
+
+class LegacyRadioConnector(RadioConnector):
+    """
+    使用基线版本 recv(忙等 read_all) 的 RadioConnector
+    """
+
+    def recv(self):
+        try:
+            data = self.serial.read_all()
+            outputBuffer = data
+            while data == b'' and self.serial.is_open:
+                data = self.serial.read_all()
+                outputBuffer += data
+        except serial.PortNotOpenError:
+            # 忙等检查 is_open 与读取之间串口可能已被 stopRadioCommunication 关闭
+            return b''
+        return outputBuffer
+
+    def stopRadioCommunication(self):
+        if self.transmitScheduler is not None:
+            self.transmitScheduler.stop()
+            self.transmitScheduler = None
+        self._closeSerial()
+        self.recvThread.join()
+
+
+def measure(connectorClass, configPath, idleSeconds=2.0, messages=200):
+    connector = connectorClass("drone", configPath)
+    received = []
+    connector.callbackMessageUpdate = lambda: received.append(time.perf_counter())
+    connector.startRadioCommunication()
+
+    time.sleep(0.2)
+    cpuStart, wallStart = time.process_time(), time.perf_counter()
+    time.sleep(idleSeconds)
+    idleCpu = (time.process_time() - cpuStart) / (time.perf_counter() - wallStart)
+
+    latencies = []
+    for i in range(messages):
+        count = len(received)
+        sendTime = time.perf_counter()
+        connector.send(f"message {i}".encode("utf-8"))
+        while len(received) == count:
+            time.sleep(0)
+        latencies.append(received[-1] - sendTime)
+        time.sleep(0.002)
+
+    stopStart = time.perf_counter()
+    connector.stopRadioCommunication()
+    stopTime = time.perf_counter() - stopStart
+    latencies.sort()
+    return idleCpu, statistics.median(latencies), latencies[int(len(latencies) * 0.99) - 1], stopTime
+
+
+def main():
+    logger.remove()
+    configPath = makeLoopbackConfig(readTimeout=5)
+    print(f"{'receiver':<12}{'idle CPU':>10}{'p50(ms)':>10}{'p99(ms)':>10}{'stop(ms)':>10}")
+    for name, connectorClass in [("legacy", LegacyRadioConnector), ("blocking", RadioConnector)]:
+        idleCpu, p50, p99, stopTime = measure(connectorClass, configPath)
+        print(f"{name:<12}{idleCpu * 100:>9.1f}%{p50 * 1000:>10.3f}{p99 * 1000:>10.3f}{stopTime * 1000:>10.1f}")
+    print(f"threads alive: {threading.active_count()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import random
+
+from Communication.DataPacket import DataPacket
+from Communication.DataProcessingLayer import packNormal, packState, parseMessage
+from Communication.StateSync import StateReceiver, StateSender
+from DataStructure.InformationData import EngineInfo, GPSInfo, InertiaInfo, PowerInfo
+from DataStructure.JsonModel import to_dict
+
+classes = [InertiaInfo, PowerInfo, EngineInfo, GPSInfo]
+rate = 20
+duration = 60
+deadbands = {"InertiaInfo.xAxisAcceleration": 0.05, "InertiaInfo.yAxisAcceleration": 0.05, "InertiaInfo.zAxisAcceleration": 0.05,
+             "PowerInfo.batteryVoltage": 0.05, "PowerInfo.batteryCurrent": 0.1, "PowerInfo.sensorPower": 0.1,
+             "EngineInfo.engine1Thrust": 0.5, "EngineInfo.engine2Thrust": 0.5, "EngineInfo.engine3Thrust": 0.5, "EngineInfo.engine4Thrust": 0.5,
+             "GPSInfo.latitude": 1e-6, "GPSInfo.longitude": 1e-6, "GPSInfo.altitude": 0.2, "GPSInfo.speed": 0.1, "GPSInfo.course": 1.0}
+
+
+def hover(rand: random.Random, step: int, noise: float):
+    """
+    悬停状态的遥测: 电池电压缓慢下降, noise 为传感器噪声的倍数
+    """
+    t = step / rate
+    inertia = InertiaInfo()
+    inertia.xAxisAcceleration = rand.gauss(0, 0.01 * noise)
+    inertia.yAxisAcceleration = rand.gauss(0, 0.01 * noise)
+    inertia.zAxisAcceleration = 9.81 + rand.gauss(0, 0.01 * noise)
+    power = PowerInfo()
+    power.batteryVoltage = 12.6 - t * 0.002 + rand.gauss(0, 0.005)
+    power.batteryCurrent = 8.0 + rand.gauss(0, 0.02)
+    power.sensorPower = 1.2
+    engine = EngineInfo()
+    engine.engine1Thrust = engine.engine2Thrust = engine.engine3Thrust = engine.engine4Thrust = 50.0 + rand.gauss(0, 0.1 * noise)
+    gps = GPSInfo()
+    gps.latitude = 31.2304 + rand.gauss(0, 2e-7)
+    gps.longitude = 121.4737 + rand.gauss(0, 2e-7)
+    gps.altitude = 20.0 + rand.gauss(0, 0.05 * noise)
+    gps.speed = abs(rand.gauss(0, 0.02))
+    gps.course = 90.0
+    return [inertia, power, engine, gps]
+
+
+def converged(receiver: StateReceiver, objects: list, tolerance=2.0) -> bool:
+    for obj in objects:
+        remote = to_dict(receiver.get(type(obj)))
+        for name, value in to_dict(obj).items():
+            if abs(remote[name] - value) > tolerance * deadbands[f"{type(obj).__name__}.{name}"] + 1e-9:
+                return False
+    return True
+
+
+def run(acknowledged: bool, lossRate: float, noise: float):
+    rand = random.Random(1)
+    dataPacket = DataPacket(fragmented=True)
+    sender = StateSender(deadbands=deadbands, keyframeInterval=5.0, acknowledged=acknowledged)
+    receiver = StateReceiver(classes, sender=sender)
+    fullBytes = stateBytes = ackBytes = 0
+    objects = []
+    for step in range(rate * duration):
+        now = step / rate
+        objects = hover(rand, step, noise)
+        for obj in objects:
+            fullBytes += len(dataPacket.encodeMany([packNormal(to_dict(obj))]))
+            message = sender.encode(obj, now)
+            if message is None:
+                continue
+            wire = packState(message)
+            stateBytes += len(dataPacket.encodeMany([wire]))
+            if rand.random() < lossRate:
+                continue
+            receiver.apply(parseMessage(wire)[1])
+            if acknowledged and rand.random() >= lossRate:
+                ack = packState({"n": message["n"], "a": message["s"]})
+                ackBytes += len(dataPacket.encodeMany([ack]))
+                receiver.apply(parseMessage(ack)[1])
+    return fullBytes, stateBytes, ackBytes, sender.statistics(), receiver.statistics(), converged(receiver, objects)
+
+
+def main():
+    print(f"hover {duration}s at {rate}Hz, {len(classes)} streams")
+    print(f"{'mode':<18}{'noise':>6}{'loss':>6}{'full(B/s)':>11}{'state(B/s)':>12}{'ack(B/s)':>10}{'ratio':>8}{'key':>6}{'delta':>7}{'skip':>6}{'lost':>6}{'synced':>8}")
+    # noise 为 3 时加速度与推力的噪声接近死区, 是增量同步最不利的情况
+    for noise in [1, 3]:
+        for acknowledged in [False, True]:
+            for lossRate in [0.0, 0.05]:
+                fullBytes, stateBytes, ackBytes, sent, received, synced = run(acknowledged, lossRate, noise)
+                mode = "acknowledged" if acknowledged else "unacknowledged"
+                print(f"{mode:<18}{noise:>6}{lossRate:>6.0%}{fullBytes / duration:>11.0f}{stateBytes / duration:>12.0f}{ackBytes / duration:>10.0f}"
+                      f"{fullBytes / (stateBytes + ackBytes):>7.1f}x{sent['keyframes']:>6}{sent['deltas']:>7}{sent['skipped']:>6}{received['lost']:>6}{str(synced):>8}")
+
+
+if __name__ == "__main__":
+    main()
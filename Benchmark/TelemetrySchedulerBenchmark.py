@@ -0,0 +1,76 @@
+import time
+
+from Benchmark.Loopback import makeLoopbackConfig
+from Communication.DataProcessingLayer import DataInterface
+from Communication.TelemetryScheduler import TelemetryScheduler
+from DataStructure.InformationData import EngineInfo, GPSInfo, InertiaInfo, PowerInfo
+from DataStructure.JsonModel import to_dict
+
+baudRate = 9600
+duration = 5.0
+loopRate = 200
+classes = [InertiaInfo, EngineInfo, GPSInfo, PowerInfo]
+# 接收端按字段集合识别数据流
+streamKeys = {frozenset(_class().__dict__): _class.__name__ for _class in classes}
+
+
+def makeSample(_class):
+    """
+    第一个字段写入采样时间, 接收端据此计算数据的新鲜程度
+    """
+    obj = _class()
+    setattr(obj, next(iter(obj.__dict__)), time.time())
+    return obj
+
+
+def run(scheduled: bool):
+    dataInterface = DataInterface("drone", configPath=makeLoopbackConfig(baudRate=str(baudRate)))
+    received = {_class.__name__: [] for _class in classes}
+
+    def onTelemetry(content, receiveTime):
+        name = streamKeys[frozenset(content)]
+        received[name].append(receiveTime - next(iter(content.values())))
+
+    dataInterface.addHandler(b"JSON-", onTelemetry)
+    # 遥测调度依赖发送调度器的遥测通道(默认配置中未启用)
+    dataInterface.radioConnector.transmitConfig["enabled"] = True
+    dataInterface.connect()
+    scheduler = TelemetryScheduler.fromConfig(dataInterface) if scheduled else None
+    if scheduler is not None:
+        scheduler.reallocateInterval = 0.5
+        scheduler.start()
+    start = time.time()
+    try:
+        while time.time() - start < duration:
+            for _class in classes:
+                if scheduler is not None:
+                    scheduler.publish(makeSample(_class))
+                else:
+                    dataInterface.sendNormal(to_dict(makeSample(_class)))
+            time.sleep(1 / loopRate)
+        time.sleep(0.5)
+    finally:
+        if scheduler is not None:
+            scheduler.stop()
+        dataInterface.disconnect()
+    return received, scheduler
+
+
+def main():
+    print(f"baud {baudRate}, application loop {loopRate}Hz x {len(classes)} streams for {duration:.0f}s")
+    for scheduled in [False, True]:
+        received, scheduler = run(scheduled)
+        print("rate scheduler" if scheduled else "send every loop")
+        print(f"  {'stream':<12}{'rx/s':>8}{'age p50(ms)':>13}{'age max(ms)':>13}{'rate(Hz)':>10}")
+        for name, ages in received.items():
+            ages.sort()
+            rate = f"{scheduler.streams[name].rate:.1f}" if scheduler is not None else "-"
+            p50 = ages[len(ages) // 2] * 1e3 if ages else float("nan")
+            maximum = ages[-1] * 1e3 if ages else float("nan")
+            print(f"  {name:<12}{len(ages) / duration:>8.1f}{p50:>13.1f}{maximum:>13.1f}{rate:>10}")
+        if scheduler is not None:
+            print(f"  budget {scheduler.budget:.0f} B/s, measured frame overhead {scheduler.overhead:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import statistics
+import threading
+import time
+
+from Communication.DataPacket import DataPacket
+from Communication.TransmitScheduler import TransmitLane, TransmitScheduler
+
+baudRate = 115200
+bytesPerSecond = baudRate / 10
+
+
+class WireModel:
+    """
+    模拟串口: write 立即返回(数据进入驱动缓冲区), 数据按波特率依次在线路上发出
+    """
+
+    def __init__(self, marker: bytes):
+        self.marker = marker
+        self.wireTime = 0.0
+        self.lock = threading.Lock()
+        self.markerTimes = []
+
+    def write(self, data):
+        with self.lock:
+            start = max(self.wireTime, time.perf_counter())
+            index = bytes(data).find(self.marker)
+            while index >= 0:
+                self.markerTimes.append(start + index / bytesPerSecond)
+                index = bytes(data).find(self.marker, index + 1)
+            self.wireTime = start + len(data) / bytesPerSecond
+
+
+def run(useScheduler: bool, seconds=3.0):
+    wire = WireModel(b"SHORTCMD")
+    dataPacket = DataPacket(fragmented=True)
+    scheduler = None
+    if useScheduler:
+        scheduler = TransmitScheduler(wire.write, dataPacket, baudRate, laneBandwidth={"Telemetry": 0.9})
+        scheduler.start()
+
+    def send(data, lane):
+        if scheduler is not None:
+            scheduler.put(data, lane)
+        else:
+            wire.write(dataPacket.encodeMany([data]))
+
+    sendTimes = []
+    stop = time.perf_counter() + seconds
+    nextControl = time.perf_counter()
+    while time.perf_counter() < stop:
+        # 遥测: 每 50 ms 一次 300 B 的数据(约占线路带宽的 52%), 每秒一次 3 KB 的日志(约 26%)
+        send(b"JSON-" + b"t" * 300, TransmitLane.Telemetry)
+        if len(sendTimes) % 10 == 0 and time.perf_counter() >= nextControl:
+            send(b"JSON-" + b"l" * 3000, TransmitLane.Telemetry)
+        if time.perf_counter() >= nextControl:
+            sendTimes.append(time.perf_counter())
+            send(b"SHORTCMD", TransmitLane.Control)
+            nextControl += 0.1
+        time.sleep(0.05)
+    time.sleep(1.0)
+    statisticsResult = None
+    if scheduler is not None:
+        scheduler.stop()
+        statisticsResult = scheduler.statistics()
+    delays = sorted(wireTime - sendTime for sendTime, wireTime in zip(sendTimes, wire.markerTimes))
+    return delays, statisticsResult
+
+
+def main():
+    print(f"{'sender':<12}{'commands':>10}{'p50(ms)':>10}{'p99(ms)':>10}{'max(ms)':>10}")
+    for name, useScheduler in [("direct", False), ("scheduler", True)]:
+        delays, result = run(useScheduler)
+        print(f"{name:<12}{len(delays):>10}{statistics.median(delays) * 1000:>10.1f}{delays[int(len(delays) * 0.99) - 1] * 1000:>10.1f}{delays[-1] * 1000:>10.1f}")
+        if result is not None:
+            for lane, laneStatistics in result["lanes"].items():
+                print(f"    {lane:<10} sent {laneStatistics['sent']:>5} depth {laneStatistics['depth']:>3} "
+                      f"enqueue-to-wire avg {laneStatistics['latencyAverage'] * 1000:.1f} ms, max {laneStatistics['latencyMax'] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import json
+import random
+import timeit
+
+from Communication.DataPacket import DataPacket
+from Communication.DataProcessingLayer import packNormal, packTyped, parseMessage
+from DataStructure.InformationData import EngineInfo, GPSInfo, InertiaInfo, PowerInfo
+from DataStructure.JsonModel import to_dict
+
+baudRate = 115200
+
+
+def makeObjects():
+    rand = random.Random(0)
+    objects = []
+    for _class in [InertiaInfo, PowerInfo, EngineInfo, GPSInfo]:
+        obj = _class()
+        for name in obj.__dict__:
+            setattr(obj, name, rand.uniform(-180, 180))
+        objects.append(obj)
+    return objects
+
+
+def main():
+    dataPacket = DataPacket(fragmented=True)
+    print(f"{'type':<14}{'json(B)':>9}{'typed(B)':>10}{'json/s':>9}{'typed/s':>9}{'gain':>7}{'json enc+dec(us)':>18}{'typed enc+dec(us)':>19}")
+    for obj in makeObjects():
+        jsonMessage = packNormal(to_dict(obj))
+        typedMessage = packTyped(obj)
+        decoded = parseMessage(typedMessage)[1]
+        assert all(abs(getattr(decoded, name) - value) < 1e-4 * max(1.0, abs(value)) for name, value in obj.__dict__.items())
+        # 线路上的字节数: 帧头 + 分片标记 + 转义后的数据
+        jsonWire = len(dataPacket.encodeMany([jsonMessage]))
+        typedWire = len(dataPacket.encodeMany([typedMessage]))
+        jsonRate = baudRate / 10 / jsonWire
+        typedRate = baudRate / 10 / typedWire
+        number = 20000
+        jsonCost = timeit.timeit(lambda: parseMessage(packNormal(to_dict(obj))), number=number) / number * 1e6
+        typedCost = timeit.timeit(lambda: parseMessage(packTyped(obj)), number=number) / number * 1e6
+        print(f"{type(obj).__name__:<14}{jsonWire:>9}{typedWire:>10}{jsonRate:>9.0f}{typedRate:>9.0f}{typedRate / jsonRate:>6.1f}x{jsonCost:>18.1f}{typedCost:>19.1f}")
+
+
+if __name__ == "__main__":
+    main()
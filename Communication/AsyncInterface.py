@@ -0,0 +1,200 @@
+import asyncio
+import collections
+import os
+import time
+
+import serial
+from loguru import logger
+
+from Communication.DataPacket import DecodeEvent
+from Communication.DataProcessingLayer import MessageRegistry, builtinDecoders, packNormal, packShort, packTyped
+from Communication.RadioLayer import ConnectionStatus, RadioConnector
+
+
+class AsyncRadioConnector(RadioConnector):
+    def __init__(self, configType, configPath=None, writeHighWater=4096, writeLowWater=1024):
+        """
+        asyncio 版本的 RadioConnector
+
+        串口文件描述符注册到事件循环上, 可读时直接把数据送入 DataPacket 解码, 不使用接收线程
+
+        发送的数据先写入发送缓冲区, 串口不可写时由事件循环在可写时继续写出; 缓冲区超过 writeHighWater 时 send 会等待缓冲区降到 writeLowWater 以下
+        :param writeHighWater: 发送缓冲区高水位(字节)
+        :param writeLowWater: 发送缓冲区低水位(字节)
+        """
+        super().__init__(configType, configPath)
+        self.writeHighWater = writeHighWater
+        self.writeLowWater = writeLowWater
+        self.writeBuffer = bytearray()
+        self.writeDrained = None
+        self.messages = None
+        self.droppedMessages = 0
+        self.loop = None
+        self.fileDescriptor = None
+
+    async def startRadioCommunication(self):
+        self.loop = asyncio.get_running_loop()
+        self.messages = asyncio.Queue(self.recvBuffer.capacity)
+        self.writeDrained = asyncio.Event()
+        self.writeDrained.set()
+        self._openSerial(self.serialName, self.baudRate)
+        self.fileDescriptor = self.serial.fileno()
+        self.loop.add_reader(self.fileDescriptor, self._onReadable)
+
+    async def stopRadioCommunication(self):
+        self._shutdown()
+
+    def _shutdown(self):
+        """
+        移除事件循环上的读写回调并关闭串口, 唤醒等待发送与等待消息的协程
+        """
+        if self.fileDescriptor is not None:
+            self.loop.remove_reader(self.fileDescriptor)
+            self.loop.remove_writer(self.fileDescriptor)
+            self.fileDescriptor = None
+        self._closeSerial()
+        if self.writeDrained is not None:
+            self.writeDrained.set()
+        # 队列末尾放入结束标记; 队列满时没有等待中的协程, 取完已有消息后 getMessage 直接返回结束
+        if self.messages is not None and not self.messages.full():
+            self.messages.put_nowait(None)
+
+    def _onReadable(self):
+        try:
+            data = os.read(self.fileDescriptor, self.readChunkSize)
+        except BlockingIOError:
+            return
+        except (OSError, serial.SerialException) as e:
+            # 串口断开等错误: 不再监听该文件描述符, 结束消息迭代
+            logger.error(f"Serial {self.serialName} read failed: {e}")
+            self._shutdown()
+            return
+        if data == b'':
+            # 可读却读不到数据: 设备已断开(与 pyserial 的判断相同)
+            logger.error(f"Serial {self.serialName} disconnected")
+            self._shutdown()
+            return
+        self.linkStatistics.counter("bytesIn").add(len(data))
+        if self.enableMessageLog:
+            logger.debug(f"Get radio message({len(data)}): {data}")
+        now = time.time()
+        for result in self.dataPacket.decode(data):
+            if result.event != DecodeEvent.Frame:
+                if self.enableMessageLog:
+                    logger.debug(f"{result.event.value}: discarded {result.discarded} bytes")
+                continue
+            if self.messages.full():
+                # 与 recvBuffer 相同, 队列满时丢弃最早的消息
+                self.messages.get_nowait()
+                self.droppedMessages += 1
+            self.messages.put_nowait({"data": result.data, "time": now})
+
+    async def send(self, data: bytes):
+        await self.sendMany([data])
+
+    async def sendMany(self, listData: list):
+        if self.connectionStatus != ConnectionStatus.Connected:
+            raise ConnectionError("Radio is not connected")
+        self.writeBuffer += self.dataPacket.encodeMany(listData)
+        self._flush()
+        if len(self.writeBuffer) > self.writeHighWater:
+            await self.drain()
+
+    async def drain(self):
+        while len(self.writeBuffer) > self.writeLowWater and self.connectionStatus == ConnectionStatus.Connected:
+            self.writeDrained.clear()
+            await self.writeDrained.wait()
+
+    def _flush(self):
+        try:
+            written = os.write(self.fileDescriptor, self.writeBuffer)
+        except BlockingIOError:
+            written = 0
+        del self.writeBuffer[:written]
+        self.linkStatistics.counter("bytesOut").add(written)
+        if len(self.writeBuffer) > 0:
+            self.loop.add_writer(self.fileDescriptor, self._flush)
+        else:
+            self.loop.remove_writer(self.fileDescriptor)
+        if len(self.writeBuffer) <= self.writeLowWater:
+            self.writeDrained.set()
+
+    def isClosed(self) -> bool:
+        """
+        :return: 连接已断开且已接收的消息都已取出
+        """
+        return self.connectionStatus != ConnectionStatus.Connected and (self.messages is None or self.messages.empty())
+
+    async def getMessage(self, timeout=None):
+        """
+        等待一条接收到的消息
+        :param timeout: 等待时间(秒), None 为一直等待
+        :return: {"data": bytes, "time": float}, 超时或连接已断开(isClosed)时返回 None
+        """
+        if self.isClosed():
+            return None
+        try:
+            message = await asyncio.wait_for(self.messages.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if message is None:
+            # 结束标记放回队列, 唤醒其他等待中的协程
+            self.messages.put_nowait(None)
+            return None
+        self.linkStatistics.histogram("messageAge").add(time.time() - message["time"])
+        return message
+
+
+class AsyncDataInterface:
+    def __init__(self, configType, encoding="utf-8", configPath=None):
+        """
+        asyncio 版本的 DataInterface
+
+        使用 async for 迭代接收到的消息, 每条消息为 {"type": 消息类型名称, "data": 消息内容, "time": 接收时间};
+        消息经与 DataInterface 相同的 MessageRegistry 与解码函数分发, 未注册的消息头与解码失败的消息记录到统计中并丢弃
+        """
+        self.radioConnector = AsyncRadioConnector(configType, configPath)
+        self.encoding = encoding
+        self.linkStatistics = self.radioConnector.linkStatistics
+        self.messageRegistry = MessageRegistry()
+        # 分发得到的消息, 由 __anext__ 依次取出
+        self.decoded = collections.deque()
+        for prefix, decoder in builtinDecoders(encoding).items():
+            self.registerMessage(prefix, decoder)
+        self.linkStatistics.addSource("messages", self.messageRegistry.statistics)
+
+    def registerMessage(self, prefix: bytes, decoder=None, name=None):
+        """
+        注册新的消息类型(见 MessageRegistry.register), 收到的消息经 async for 取出
+        """
+        messageType = self.messageRegistry.register(prefix, decoder, name=name)
+        if not messageType.handlers:
+            self.messageRegistry.addHandler(prefix, lambda content, receiveTime: self.decoded.append({"type": messageType.name, "data": content, "time": receiveTime}))
+        return messageType
+
+    async def connect(self):
+        await self.radioConnector.startRadioCommunication()
+
+    async def disconnect(self):
+        await self.radioConnector.stopRadioCommunication()
+
+    async def sendNormal(self, data: dict):
+        await self.radioConnector.send(packNormal(data, self.encoding))
+
+    async def sendShort(self, data: bytes):
+        await self.radioConnector.send(packShort(data, self.encoding))
+
+    async def sendTyped(self, obj):
+        await self.radioConnector.send(packTyped(obj))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self.decoded:
+            message = await self.radioConnector.getMessage()
+            if message is None:
+                # 连接断开且队列已取空
+                raise StopAsyncIteration
+            self.messageRegistry.dispatch(message["data"], message["time"])
+        return self.decoded.popleft()
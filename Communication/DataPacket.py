@@ -1,149 +1,345 @@
+import binascii
+import struct
+import time
 import zlib
-import numpy as np
+from collections import OrderedDict
+from enum import Enum
 
 
 class DataPacket:
     escapeChar: bytes = b'\\'
+    headSize: int = 5
+    maxPackageSize: int = 3072
+    # 二进制帧(v2): 同步字 + varint 长度 + 序号 + 包头校验 + 数据 + CRC16
+    syncWord: bytes = b'\xa5\x5a'
+    maxPackageSizeV2: int = 65535
+    maxVarintSize: int = 3
+    # 压缩数据包头: 压缩标记 1 字节 + 压缩流序号 1 字节
+    compressHeadSize: int = 2
+    # Z_SYNC_FLUSH 的输出总是以空的存储块结尾, 发送时去掉, 接收时补回
+    syncFlushTail: bytes = b'\x00\x00\xff\xff'
+    # 分片头: 单片消息为 1 字节标记, 多片消息为 标记 + 消息序号 + 分片序号 + 分片总数
+    fragmentHead: struct.Struct = struct.Struct("<BHHH")
+    maxFragments: int = 0xFFFF
 
-    def __init__(self, compressed=False):
+    def __init__(self, compressed=False, framing=None, presetDictionary: bytes = None, compressLevel=6, compressResetInterval=64,
+                 fragmented=False, reassemblyBudget=256 * 1024, reassemblyTimeout=5.0, statistics=None):
         self.compressed = compressed
+        # LinkStatistics, 为 None 时不记录
+        self.statistics = statistics
+        # 压缩按整条消息进行, 拆成多个包后必须重组再解压, 因此压缩时总是启用分片
+        self.fragmented = fragmented or compressed
+        self.fragmentMessageId = 0
+        self.reassembler = FragmentReassembler(reassemblyBudget, reassemblyTimeout)
+        self.framing = FramingMode.V1 if framing is None else FramingMode(framing)
+        self.sendSequence = 0
+        self.receiveSequence = None
+        self.presetDictionary = presetDictionary
+        self.compressLevel = compressLevel
+        self.compressResetInterval = compressResetInterval
+        self.compressObject = None
+        self.compressCount = 0
+        self.compressSequence = 0
         self.decompressObject = None
-        self.buffer = b''
+        self.decompressSequence = None
+        self.compressionStatistics = CompressionStatistics()
+        self.buffer = bytearray()
         self.bufferIndex = 0
+        self.scanIndex = 0
         self.isRun = True
 
+    def resetCompressObject(self):
+        if self.presetDictionary is None:
+            self.compressObject = zlib.compressobj(self.compressLevel, zlib.DEFLATED, -zlib.MAX_WBITS)
+        else:
+            self.compressObject = zlib.compressobj(self.compressLevel, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=self.presetDictionary)
+        self.compressCount = 0
+
     def resetDecompressObject(self):
         if self.decompressObject is not None:
             self.decompressObject.flush()
-        self.decompressObject = zlib.decompressobj()
+        if self.presetDictionary is None:
+            self.decompressObject = zlib.decompressobj(-zlib.MAX_WBITS)
+        else:
+            self.decompressObject = zlib.decompressobj(-zlib.MAX_WBITS, zdict=self.presetDictionary)
+
+    def compress(self, data: bytes) -> bytes:
+        """
+        压缩一条消息
+
+        所有消息共用一个持续的 raw deflate 压缩流, 每条消息以 Z_SYNC_FLUSH 结束, 使接收端收到这条消息后即可完整解压
+
+        压缩流每 compressResetInterval 条消息重建一次(CompressFlag.DeflateReset), 使丢失消息后接收端可以重新同步
+
+        如果压缩后没有变小, 则发送原始数据(CompressFlag.Raw), 并在下一条消息重建压缩流, 因为压缩流中已经包含了接收端不会收到的数据
+        :param data: 消息
+        :return: 压缩数据包头 + 消息数据
+        """
+        start = time.perf_counter()
+        flag = CompressFlag.Deflate
+        if self.compressObject is None or self.compressCount >= self.compressResetInterval:
+            self.resetCompressObject()
+            flag = CompressFlag.DeflateReset
+        compressed = self.compressObject.compress(data) + self.compressObject.flush(zlib.Z_SYNC_FLUSH)
+        compressed = compressed[:-len(DataPacket.syncFlushTail)]
+        self.compressCount += 1
+        if len(compressed) >= len(data):
+            flag = CompressFlag.Raw
+            compressed = data
+            self.compressObject = None
+        head = bytes((flag.value, self.compressSequence))
+        self.compressSequence = (self.compressSequence + 1) & 0xFF
+        self.compressionStatistics.addCompress(len(data), len(compressed) + DataPacket.compressHeadSize, flag, time.perf_counter() - start)
+        return head + compressed
+
+    def decompress(self, data: bytes):
+        """
+        解压一条消息
+
+        如果压缩流序号不连续(中间有消息丢失), 或解压失败, 则在收到下一条 CompressFlag.DeflateReset 消息之前丢弃所有依赖压缩流的消息
+        :param data: 压缩数据包头 + 消息数据
+        :return: bytes数据: 解压后的消息, None: 消息无法解压
+        """
+        start = time.perf_counter()
+        if len(data) < DataPacket.compressHeadSize:
+            return None
+        flag, sequence = data[0], data[1]
+        inSequence = self.decompressSequence == sequence
+        self.decompressSequence = (sequence + 1) & 0xFF
+        body = data[DataPacket.compressHeadSize:]
+        if flag == CompressFlag.Raw.value:
+            result = body
+        elif flag == CompressFlag.DeflateReset.value or (flag == CompressFlag.Deflate.value and inSequence and self.decompressObject is not None):
+            if flag == CompressFlag.DeflateReset.value:
+                self.resetDecompressObject()
+            try:
+                result = self.decompressObject.decompress(body + DataPacket.syncFlushTail)
+            except zlib.error:
+                self.decompressObject = None
+                return None
+        else:
+            self.decompressObject = None
+            return None
+        self.compressionStatistics.addDecompress(time.perf_counter() - start)
+        return result
 
     def decode(self, data: bytes):
         """
         数据包解码
 
-        该函数将会把bytes流存入缓冲区, 并在缓冲区中查找合法的数据包头
+        该函数将会把bytes流追加到缓冲区(bytearray + 读指针), 并返回一个生成器, 依次产出缓冲区中可以确定的解析结果
+
+        如果找到合法的数据包头, 并且数据包已经完整, 则产出 DecodeEvent.Frame, data 为将转义符还原后的数据包内容
 
-        如果找到合法的数据包头, 则将缓冲区中的数据包头和数据包数据分离, 从缓冲区中删除已解析数据包并返回(但是缓冲区中未解析的数据包还会保留)
+        如果数据包还未完整, 则生成器结束, 等待下一次调用时继续从上次扫描的位置查找
 
-        如果解析数据包头后发现缓冲区中数据长度还未达到数据包长度, 并且未出现非法转义符(没有被转义的转义符), 则会返回 True
+        如果在数据长度未达到数据包长度之前发现了未被转义的转义符(这意味着出现了包头), 表明发生了丢包, 丢弃不完整的数据包并产出 DecodeEvent.Drop
 
-        如果解析过程中在数据长度未达到数据包长度之前发现了未被转义的转义符(这意味着出现了包头), 表明发生了丢包, 则调用函数寻找下一个合法的数据包头, 丢弃无效数据, 并返回 False
+        如若数据本身就不以合法的包头结构开始, 则寻找下一个合法包头, 丢弃无效数据并产出 DecodeEvent.Resync
 
-        如若数据本身就不以合法的包头结构开始, 则调用函数寻找下一个合法包头, 丢弃无效数据, 并返回 False
+        v2 帧的包头校验或 CRC16 不正确时, 在切出数据之前丢弃该帧并产出 DecodeEvent.Corrupt, 序号不连续时 Frame 的 lost 为丢失的帧数
 
+        未被取出的结果会保留在缓冲区中, 在下一次迭代时产出
         :param data: 数据流
-        :return: bytes数据: 成功解析数据包 , True: 等待数据包结束, False: 发生丢包, 清除了无效数据
+        :return: 生成器, DecodeResult
         """
         self.buffer += data
-        escapeChar = DataPacket.escapeChar[0]
-        if len(self.buffer) > self.bufferIndex:
-            if self.buffer[0] == escapeChar and len(self.buffer) > 5:
-                arraySize: bytes = self.buffer[1:5]
-                if len(list(filter(lambda x: b'0'[0] <= x <= b'9'[0], arraySize))) == 4:
-                    packageSize: int = int(arraySize.decode("ascii"))
-                    if self.bufferIndex < 5:
-                        # 如果index小于5, 则设置为5, 因为后续的寻找规则不允许从包头开始搜索, 因为包头已经被正确解析
-                        self.bufferIndex = 5
-                    i = self.bufferIndex
-                    # for i in range(self.bufferIndex, len(self.buffer)):
-                    while i < len(self.buffer):
-                        self.bufferIndex = i
-                        if self.buffer[i] == escapeChar and i != len(self.buffer) - 1:
-                            if self.buffer[i + 1] == escapeChar:
-                                i += 2
-                                continue
-                            else:
-                                if i - 5 == packageSize:
-                                    # 数据包完整
-                                    # 截取包内容, 返回将转义符替换后的内容
-                                    # 从缓存中移除已解析的数据包
-                                    resultData = [self.buffer[5:i].replace(DataPacket.escapeChar + DataPacket.escapeChar, DataPacket.escapeChar)]
-                                    self.buffer = self.buffer[i:]
-                                    self.bufferIndex = 0
-                                    if len(self.buffer) > 5:
-                                        resultRemainData = self.decode(b'')
-                                        if type(resultRemainData) != bool:
-                                            resultData += resultRemainData
-                                    return resultData
-                                else:
-                                    # 数据包不完整
-                                    # 丢弃所有数据
-                                    self.buffer = self.buffer[i + 1:]
-                                    self.bufferIndex = 0
-                                    return False
-                        elif i + 1 - 5 == packageSize:
-                            # 截取包内容, 返回将转义符替换后的内容
-                            # 从缓存中移除已解析的数据包
-                            resultData = [self.buffer[5:i + 1].replace(DataPacket.escapeChar + DataPacket.escapeChar, DataPacket.escapeChar)]
-                            self.buffer = self.buffer[i + 1:]
-                            self.bufferIndex = 0
-                            if len(self.buffer) > 5:
-                                resultRemainData = self.decode(b'')
-                                if type(resultRemainData) != bool:
-                                    resultData += resultRemainData
-                            return resultData
-                        i += 1
-
-                else:
-                    # 包头字符不合法(有不为数字的字符出现在包头位), 进入数据丢弃过程
-                    # 寻找下一个合法的数据包头
-                    result = self.findValidPackageHead()
-                    if result is False:
-                        # 数据包头未找到
-                        # 丢弃所有数据, 仅保留最后一个字符
-                        self.buffer = self.buffer[-1]
-                        self.bufferIndex = 0
-                    else:
-                        # 数据包头已找到
-                        # 丢弃所有合法包头之前数据
-                        self.buffer = self.buffer[result:]
-                        self.bufferIndex = 0
-                    return False
-            elif self.buffer[0] != escapeChar:
-                # 包头字符不合法(第一个字符不为转义字符), 进入数据丢弃过程
-                # 寻找下一个合法的数据包头
-                result = self.findValidPackageHead()
-                if result is False:
-                    # 数据包头未找到
-                    # 丢弃所有数据, 仅保留最后一个字符
-                    self.buffer = self.buffer[-1]
-                    self.bufferIndex = 0
-                else:
-                    # 数据包头已找到
-                    # 丢弃所有合法包头之前数据
-                    self.buffer = self.buffer[result:]
-                    self.bufferIndex = 0
-                return False
-        return True
-
-    def findValidPackageHead(self):
+        return self._decodeBuffer()
+
+    def _decodeBuffer(self):
+        decodeNext = self._decodeNext if self.framing == FramingMode.V1 else self._decodeNextV2
+        statistics = self.statistics
+        while True:
+            start = time.perf_counter()
+            result = decodeNext()
+            if result is None:
+                break
+            if statistics is not None and result.event == DecodeEvent.Frame:
+                statistics.histogram("decodeTime").add(time.perf_counter() - start)
+            if result.event == DecodeEvent.Frame and (self.fragmented or self.compressed):
+                results = self._decodeMessage(result)
+            else:
+                results = (result,)
+            for message in results:
+                if statistics is not None:
+                    self._recordDecode(message)
+                yield message
+        # 移除已经解析的数据, 剩余部分最多为一个不完整的数据包
+        if self.bufferIndex > 0:
+            del self.buffer[:self.bufferIndex]
+            self.scanIndex = max(self.scanIndex - self.bufferIndex, 0)
+            self.bufferIndex = 0
+
+    def _recordDecode(self, result):
+        statistics = self.statistics
+        if result.event == DecodeEvent.Frame:
+            statistics.counter("framesIn").add()
+            statistics.counter("payloadBytesIn").add(len(result.data))
+        else:
+            statistics.counter(eventCounters[result.event]).add()
+            statistics.counter("bytesDiscarded").add(result.discarded)
+        if result.lost > 0:
+            statistics.counter("framesLost").add(result.lost)
+
+    def _decodeMessage(self, result):
+        """
+        从数据包还原消息: 先重组分片, 再解压
+        :param result: DecodeEvent.Frame 结果
+        :return: 生成器, DecodeResult
+        """
+        data = result.data
+        if self.fragmented:
+            if len(data) == 0:
+                yield DecodeResult(DecodeEvent.Drop, sequence=result.sequence, lost=result.lost)
+                return
+            if data[0] == 0:
+                data = data[1:]
+            else:
+                if len(data) < DataPacket.fragmentHead.size:
+                    yield DecodeResult(DecodeEvent.Drop, discarded=len(data), sequence=result.sequence, lost=result.lost)
+                    return
+                _, messageId, index, count = DataPacket.fragmentHead.unpack_from(data)
+                data, discarded = self.reassembler.add(messageId, index, count, data[DataPacket.fragmentHead.size:])
+                if discarded > 0:
+                    yield DecodeResult(DecodeEvent.Drop, discarded=discarded)
+                if data is None:
+                    return
+        if self.compressed:
+            decompressed = self.decompress(data)
+            if decompressed is None:
+                yield DecodeResult(DecodeEvent.Drop, discarded=len(data), sequence=result.sequence, lost=result.lost)
+                return
+            data = decompressed
+        result.data = data
+        yield result
+
+    def _decodeNext(self):
+        """
+        从读指针处解析一个结果
+        :return: DecodeResult, None: 等待更多数据
+        """
+        buffer = self.buffer
+        escapeChar = DataPacket.escapeChar
+        headSize = DataPacket.headSize
+        start = self.bufferIndex
+        if len(buffer) - start < headSize:
+            if len(buffer) > start and buffer[start] != escapeChar[0]:
+                return self._resync(start)
+            return None
+        if buffer[start] != escapeChar[0] or not buffer[start + 1:start + headSize].isdigit():
+            return self._resync(start)
+
+        end = start + headSize + int(buffer[start + 1:start + headSize])
+        # 从上次扫描停止的位置继续, 避免数据包分多次到达时重复扫描
+        i = max(self.scanIndex, start + headSize)
+        while i <= end:
+            index = buffer.find(escapeChar, i, end)
+            if index < 0:
+                if len(buffer) < end:
+                    self.scanIndex = len(buffer)
+                    return None
+                # 数据包完整
+                # 截取包内容, 返回将转义符替换后的内容
+                self.bufferIndex = end
+                self.scanIndex = 0
+                return DecodeResult(DecodeEvent.Frame, bytes(buffer[start + headSize:end]).replace(escapeChar + escapeChar, escapeChar))
+            if index + 1 >= len(buffer):
+                # 转义符位于缓冲区末尾, 需要等待下一个字节才能判断
+                self.scanIndex = index
+                return None
+            if buffer[index + 1] != escapeChar[0]:
+                # 数据包不完整, 出现了新的包头
+                # 丢弃不完整的数据包, 保留新的包头
+                return self._discard(start, index, DecodeEvent.Drop)
+            i = index + 2
+        # 转义符对跨越了数据包结尾, 包头长度与内容不符
+        return self._discard(start, self._findValidPackageHead(start + 1), DecodeEvent.Drop)
+
+    def _resync(self, start: int):
+        return self._discard(start, self._findValidPackageHead(start + 1), DecodeEvent.Resync)
+
+    def _discard(self, start: int, end: int, event):
+        self.bufferIndex = end
+        self.scanIndex = 0
+        return DecodeResult(event, discarded=end - start)
+
+    def _findValidPackageHead(self, start: int) -> int:
         """
         寻找下一个合法的数据包头
-        :return:
-        """
-        escapeChar = DataPacket.escapeChar[0]
-        for i in range(self.bufferIndex, len(self.buffer)):
-            if self.buffer[i] == escapeChar:
-                # 判断是否为缓冲的最后一个字符
-                if i != len(self.buffer) - 1:
-                    # 如果不是最后一个字符, 判断下一个字符是否为转义符
-                    if self.buffer[i + 1] == escapeChar:
-                        # 如果是转义符, 则继续查找
-                        continue
-                    else:
-                        # 如果转义符后一位不是转义符, 则说明数据包头已经找到
-                        arraySize = self.buffer[i + 1: i + 5]
-                        # 判断数据包长度数据是否合法(是否全为数字)
-                        if len(list(filter(lambda x: b'0'[0] <= x <= b'9'[0], arraySize))) == 4:
-                            # 则数据包长度已找到(返回值从转义符开始)
-                            return i
-                        else:
-                            # 否则继续向后查找
-                            continue
-                else:
-                    # 如果是最后一个字符, 则表明下一个合法的数据包头还未存入缓冲区
-                    return False
-        return False
+        :param start: 开始查找的位置
+        :return: 合法包头(或缓冲区末尾可能成为包头的转义符)的位置, 都不存在时返回缓冲区长度
+        """
+        buffer = self.buffer
+        escapeChar = DataPacket.escapeChar
+        index = buffer.find(escapeChar, start)
+        while index >= 0:
+            arraySize = buffer[index + 1:index + DataPacket.headSize]
+            if arraySize.isdigit() and len(arraySize) == DataPacket.headSize - 1:
+                return index
+            if len(arraySize) < DataPacket.headSize - 1 and (len(arraySize) == 0 or arraySize.isdigit()):
+                # 包头还未完整存入缓冲区
+                return index
+            index = buffer.find(escapeChar, index + 1)
+        return len(buffer)
+
+    def _decodeNextV2(self):
+        """
+        从读指针处解析一个 v2 帧
+
+        包头校验与 CRC16 都直接在缓冲区的 memoryview 上计算, 校验通过之后才会复制数据
+        :return: DecodeResult, None: 等待更多数据
+        """
+        buffer = self.buffer
+        syncWord = DataPacket.syncWord
+        start = self.bufferIndex
+        if len(buffer) - start < len(syncWord):
+            if len(buffer) > start and buffer[start] != syncWord[0]:
+                return self._resyncV2(start, DecodeEvent.Resync)
+            return None
+        if buffer[start:start + len(syncWord)] != syncWord:
+            return self._resyncV2(start, DecodeEvent.Resync)
+
+        packageSize = 0
+        index = start + len(syncWord)
+        for shift in range(0, DataPacket.maxVarintSize * 7, 7):
+            if index >= len(buffer):
+                return None
+            packageSize |= (buffer[index] & 0x7F) << shift
+            index += 1
+            if buffer[index - 1] < 0x80:
+                break
+        else:
+            return self._resyncV2(start, DecodeEvent.Corrupt)
+        # 序号 1 字节 + 包头校验 1 字节
+        headEnd = index + 2
+        if len(buffer) < headEnd:
+            return None
+        with memoryview(buffer) as view:
+            if packageSize > DataPacket.maxPackageSizeV2 or binascii.crc_hqx(view[start + len(syncWord):headEnd - 1], 0) & 0xFF != buffer[headEnd - 1]:
+                return self._resyncV2(start, DecodeEvent.Corrupt)
+            end = headEnd + packageSize
+            if len(buffer) < end + 2:
+                return None
+            if binascii.crc_hqx(view[start:end], 0) != int.from_bytes(view[end:end + 2], "little"):
+                return self._resyncV2(start, DecodeEvent.Corrupt)
+
+        sequence = buffer[index]
+        lost = 0 if self.receiveSequence is None else (sequence - self.receiveSequence) & 0xFF
+        self.receiveSequence = (sequence + 1) & 0xFF
+        self.bufferIndex = end + 2
+        return DecodeResult(DecodeEvent.Frame, bytes(buffer[headEnd:end]), sequence=sequence, lost=lost)
+
+    def _resyncV2(self, start: int, event):
+        """
+        丢弃当前位置的数据, 直到下一个同步字(或缓冲区末尾可能成为同步字的字节)
+        """
+        syncWord = DataPacket.syncWord
+        index = self.buffer.find(syncWord, start + 1)
+        if index < 0:
+            index = len(self.buffer)
+            if index - 1 > start and self.buffer[index - 1] == syncWord[0]:
+                index -= 1
+        return self._discard(start, index, event)
 
     def encode(self, data: bytes):
         """
@@ -151,40 +347,228 @@ class DataPacket:
 
         然后计算转义后的长度, 将长度写入包头后返回
 
-        如果原始数据长度大于 3072, 则进行分包
+        如果原始数据长度大于 maxPackageSize, 则进行分包
         :param data: 数据流
         :return: ([原始大小], [转义后大小], [封包后数据流])
         """
-        npData = np.array(list(data))
-        remainData = None
-        if npData.shape[0] > 3072:
-            remainData = npData[3072:]
-            npData = npData[:3072]
-
-        packageRawSize = npData.shape[0]
-        escapeChar = DataPacket.escapeChar[0]
-        # Start add escapeChar
-        indexEscapeChars = np.argwhere(npData == escapeChar)
-        # initNewData
-        escapedData = npData.copy()
-        count = 0
-        for index in indexEscapeChars:
-            escapedData = np.insert(escapedData, index[0] + count, escapeChar)
-            count += 1
-        # End add escapeChar
-        packageSizeEscaped = escapedData.shape[0]
-        # Add head
-        encodedData = np.zeros(packageSizeEscaped + 5, dtype=np.uint32)
-        encodedData[0] = escapeChar
-        encodedData[1: 5] = list(str(packageSizeEscaped).zfill(4).encode("ascii"))
-        encodedData[5:] = escapedData
-        # This operation just can for 1D NDArray
-        result = ([packageRawSize], [packageSizeEscaped], [bytes(list(encodedData))])
-
-        if remainData is not None:
-            remainResults = self.encode(bytes(remainData.tolist()))
-            result[0].extend(remainResults[0])
-            result[1].extend(remainResults[1])
-            result[2].extend(remainResults[2])
+        result = ([], [], [])
+        for rawSize, head, body, tail in self._encodePackages(data):
+            result[0].append(rawSize)
+            result[1].append(len(body))
+            result[2].append(head + body + tail)
+        return result
+
+    def encodeMany(self, payloads) -> bytearray:
+        """
+        批量封包
 
+        先统计所有数据包封包后的总长度, 预分配一个 bytearray, 再将包头、数据与包尾依次写入
+
+        输出与逐个调用 encode 并拼接的结果逐字节一致, 可直接用一次 write 发送
+        :param payloads: 数据流列表
+        :return: 所有数据包拼接后的数据流
+        """
+        packages = [package for payload in payloads for package in self._encodePackages(payload)]
+        result = bytearray(sum(len(head) + len(body) + len(tail) for _, head, body, tail in packages))
+        index = 0
+        for _, head, body, tail in packages:
+            for part in (head, body, tail):
+                result[index:index + len(part)] = part
+                index += len(part)
         return result
+
+    def _encodePackages(self, data: bytes):
+        """
+        按当前帧格式分包
+        :param data: 数据流
+        :return: 生成器, (原始大小, 包头, 数据, 包尾)
+        """
+        if self.compressed:
+            data = self.compress(data)
+        maxPackageSize = DataPacket.maxPackageSize if self.framing == FramingMode.V1 else DataPacket.maxPackageSizeV2
+        if self.fragmented:
+            packages = self._fragment(data, maxPackageSize)
+        else:
+            # 空数据也需要发送一个长度为 0 的数据包
+            packages = (data[start:start + maxPackageSize] for start in range(0, max(len(data), 1), maxPackageSize))
+        escapeChar = DataPacket.escapeChar
+        for package in packages:
+            if self.framing == FramingMode.V1:
+                # 转义使用 bytes.replace 一次完成, 不会因为转义符数量产生额外的整包复制
+                escapedData = bytes(package).replace(escapeChar, escapeChar + escapeChar)
+                encoded = len(package), self._packageHead(len(escapedData)), escapedData, b''
+            else:
+                encoded = len(package), *self._packV2(bytes(package))
+            if self.statistics is not None:
+                self.statistics.counter("framesOut").add()
+                self.statistics.counter("payloadBytesOut").add(encoded[0])
+                self.statistics.counter("frameBytesOut").add(len(encoded[1]) + len(encoded[2]) + len(encoded[3]))
+            yield encoded
+
+    def _fragment(self, data: bytes, maxPackageSize: int):
+        """
+        将消息拆分为带分片头的数据包
+
+        能放入一个数据包的消息只加 1 字节标记, 否则每个分片都带有消息序号、分片序号与分片总数, 由接收端重组
+        :param data: 消息
+        :param maxPackageSize: 单个数据包的最大长度
+        :return: 数据包列表
+        """
+        if len(data) + 1 <= maxPackageSize:
+            return [b'\x00' + data]
+        fragmentSize = maxPackageSize - DataPacket.fragmentHead.size
+        count = (len(data) + fragmentSize - 1) // fragmentSize
+        if count > DataPacket.maxFragments:
+            raise ValueError(f"Message too large: {len(data)} bytes")
+        messageId = self.fragmentMessageId
+        self.fragmentMessageId = (self.fragmentMessageId + 1) & 0xFFFF
+        view = memoryview(data)
+        return [DataPacket.fragmentHead.pack(1, messageId, index, count) + view[index * fragmentSize:(index + 1) * fragmentSize] for index in range(count)]
+
+    def _packV2(self, package: bytes):
+        head = bytearray(DataPacket.syncWord)
+        packageSize = len(package)
+        while packageSize >= 0x80:
+            head.append(packageSize & 0x7F | 0x80)
+            packageSize >>= 7
+        head.append(packageSize)
+        head.append(self.sendSequence)
+        head.append(binascii.crc_hqx(memoryview(head)[len(DataPacket.syncWord):], 0) & 0xFF)
+        self.sendSequence = (self.sendSequence + 1) & 0xFF
+        return bytes(head), package, binascii.crc_hqx(package, binascii.crc_hqx(head, 0)).to_bytes(2, "little")
+
+    @staticmethod
+    def _packageHead(packageSizeEscaped: int) -> bytes:
+        return DataPacket.escapeChar + str(packageSizeEscaped).zfill(4).encode("ascii")
+
+
+class FragmentReassembler:
+    def __init__(self, memoryBudget: int, timeout: float):
+        """
+        分片重组表
+
+        未完成的消息按到达顺序保存, 超时或总大小超出内存预算时从最早的消息开始丢弃
+        :param memoryBudget: 未完成消息占用的最大字节数
+        :param timeout: 未完成消息的最长保留时间(秒)
+        """
+        self.memoryBudget = memoryBudget
+        self.timeout = timeout
+        self.messages = OrderedDict()
+        self.size = 0
+
+    def add(self, messageId: int, index: int, count: int, data: bytes):
+        """
+        添加一个分片
+        :return: (完整的消息或 None, 丢弃的字节数)
+        """
+        discarded = self.expire(time.monotonic())
+        if count < 2 or index >= count or len(data) > self.memoryBudget:
+            return None, discarded + len(data)
+        message = self.messages.get(messageId)
+        if message is not None and len(message.fragments) != count:
+            discarded += self._remove(messageId)
+            message = None
+        if message is None:
+            message = self.messages[messageId] = _PendingMessage(count)
+        if message.fragments[index] is not None:
+            # 重复的分片
+            return None, discarded + len(data)
+        message.fragments[index] = data
+        message.received += 1
+        message.size += len(data)
+        self.size += len(data)
+        if message.received == count:
+            self._remove(messageId)
+            return b''.join(message.fragments), discarded
+        while self.size > self.memoryBudget:
+            discarded += self._remove(next(iter(self.messages)))
+        return None, discarded
+
+    def expire(self, now: float) -> int:
+        """
+        丢弃超时的未完成消息
+        :return: 丢弃的字节数
+        """
+        discarded = 0
+        while len(self.messages) > 0:
+            messageId, message = next(iter(self.messages.items()))
+            if now - message.time <= self.timeout:
+                break
+            discarded += self._remove(messageId)
+        return discarded
+
+    def _remove(self, messageId: int) -> int:
+        message = self.messages.pop(messageId)
+        self.size -= message.size
+        return message.size
+
+
+class _PendingMessage:
+    def __init__(self, count: int):
+        self.fragments = [None] * count
+        self.received = 0
+        self.size = 0
+        self.time = time.monotonic()
+
+
+class CompressFlag(Enum):
+    Raw = 0
+    Deflate = 1
+    DeflateReset = 2
+
+
+class CompressionStatistics:
+    def __init__(self):
+        self.messages = 0
+        self.rawBytes = 0
+        self.compressedBytes = 0
+        self.rawFallbacks = 0
+        self.compressTime = 0.0
+        self.decompressedMessages = 0
+        self.decompressTime = 0.0
+
+    def addCompress(self, rawSize: int, compressedSize: int, flag, cost: float):
+        self.messages += 1
+        self.rawBytes += rawSize
+        self.compressedBytes += compressedSize
+        self.compressTime += cost
+        if flag == CompressFlag.Raw:
+            self.rawFallbacks += 1
+
+    def addDecompress(self, cost: float):
+        self.decompressedMessages += 1
+        self.decompressTime += cost
+
+    def summary(self) -> dict:
+        return {
+            "messages": self.messages,
+            "ratio": self.compressedBytes / self.rawBytes if self.rawBytes > 0 else 1.0,
+            "rawFallbacks": self.rawFallbacks,
+            "compressMicrosecondsPerMessage": self.compressTime / self.messages * 1e6 if self.messages > 0 else 0.0,
+            "decompressMicrosecondsPerMessage": self.decompressTime / self.decompressedMessages * 1e6 if self.decompressedMessages > 0 else 0.0,
+        }
+
+
+class FramingMode(Enum):
+    V1 = "v1"
+    V2 = "v2"
+
+
+class DecodeEvent(Enum):
+    Frame = "Frame"
+    Drop = "Drop"
+    Resync = "Resync"
+    Corrupt = "Corrupt"
+
+
+# 各丢弃事件对应的统计计数器
+eventCounters = {DecodeEvent.Drop: "drops", DecodeEvent.Resync: "resyncs", DecodeEvent.Corrupt: "corrupts"}
+
+
+class DecodeResult:
+    def __init__(self, event: DecodeEvent, data: bytes = None, discarded: int = 0, sequence: int = None, lost: int = 0):
+        self.event = event
+        self.data = data
+        self.discarded = discarded
+        self.sequence = sequence
+        self.lost = lost
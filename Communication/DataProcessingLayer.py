@@ -1,6 +1,159 @@
 import json
+import queue
+import time
 
+from loguru import logger
+
+from Communication.MessageQueue import MessageQueue, OverflowPolicy
 from Communication.RadioLayer import RadioConnector
+from Communication.TransmitScheduler import TransmitLane
+from DataStructure.BinaryCodec import decodeTyped, encodeTyped
+
+
+def packNormal(data: dict, encoding="utf-8") -> bytes:
+    dataJson: str = json.dumps(data)
+    dataComplete: str = "JSON-" + dataJson
+    return dataComplete.encode(encoding)
+
+
+def packShort(data: bytes, encoding="utf-8") -> bytes:
+    return "SHORT".encode(encoding) + data
+
+
+def packTyped(obj) -> bytes:
+    return b"TYPED" + encodeTyped(obj)
+
+
+def packState(data: dict, encoding="utf-8") -> bytes:
+    return ("STATE" + json.dumps(data, separators=(',', ':'))).encode(encoding)
+
+
+def parseMessage(data: bytes, encoding="utf-8"):
+    """
+    解析接收到的消息
+    :param data: 消息数据(包含 5 字节消息头)
+    :return: (消息头, 消息内容), SHORT 消息内容为字符串, TYPED 消息内容为解码后的 JObject, 其余(JSON-/STATE)为 JSON 解析后的对象
+    """
+    header: str = data[:5].decode(encoding)
+    body: bytes = data[5:]
+    if header == "SHORT":
+        return header, body.decode(encoding)
+    if header == "TYPED":
+        return header, decodeTyped(body)
+    return header, json.loads(body.decode(encoding))
+
+
+class MessageType:
+    def __init__(self, prefix: bytes, decoder=None, name=None):
+        """
+        :param prefix: 5 字节消息头
+        :param decoder: 消息体解码函数, 参数为消息体的 memoryview, 为 None 时处理函数直接收到 memoryview
+        :param name: 名称, 默认为消息头文本
+        """
+        self.prefix = prefix
+        self.decoder = decoder
+        self.name = name if name is not None else prefix.decode("ascii", "replace")
+        self.handlers = []
+        self.count = 0
+        self.errors = 0
+        # 处理函数抛出异常的次数
+        self.handlerErrors = 0
+
+
+class MessageRegistry:
+    headerSize = 5
+
+    def __init__(self):
+        """
+        消息类型注册表
+
+        每种消息以 5 字节消息头注册一次, 附带解码函数与若干处理函数; 分发时直接以消息头字节查表, 不做文本解码,
+        消息体以 memoryview 切片交给解码函数, 不复制数据
+        """
+        self.messageTypes = {}
+        self.unknown = 0
+
+    def register(self, prefix: bytes, decoder=None, handler=None, name=None) -> MessageType:
+        """
+        注册消息类型, 重复注册同一消息头时替换解码函数并保留已有处理函数
+        :param prefix: 5 字节消息头
+        :param decoder: 解码函数 decoder(memoryview) -> 内容
+        :param handler: 处理函数 handler(内容, 接收时间)
+        :param name: 名称
+        :return: MessageType
+        """
+        if len(prefix) != MessageRegistry.headerSize:
+            raise ValueError(f"Message prefix must be {MessageRegistry.headerSize} bytes: {prefix!r}")
+        messageType = self.messageTypes.get(prefix)
+        if messageType is None:
+            messageType = MessageType(prefix, decoder, name)
+            self.messageTypes[prefix] = messageType
+        else:
+            messageType.decoder = decoder
+        if handler is not None:
+            self.addHandler(prefix, handler)
+        return messageType
+
+    # 处理函数列表整体替换而不是原地修改, 接收线程遍历时不会受其它线程增删的影响
+    def addHandler(self, prefix: bytes, handler):
+        messageType = self.messageTypes[prefix]
+        messageType.handlers = messageType.handlers + [handler]
+
+    def removeHandler(self, prefix: bytes, handler):
+        messageType = self.messageTypes[prefix]
+        if handler not in messageType.handlers:
+            raise ValueError(f"Handler is not registered for {messageType.name}")
+        messageType.handlers = [item for item in messageType.handlers if item is not handler]
+
+    def dispatch(self, data: bytes, receiveTime: float):
+        """
+        解码一条消息并依次调用处理函数
+        :param data: 消息数据(包含 5 字节消息头)
+        :param receiveTime: 接收时间
+        :return: 是否找到了对应的消息类型并成功解码
+        """
+        messageType = self.messageTypes.get(data[:MessageRegistry.headerSize])
+        if messageType is None:
+            self.unknown += 1
+            logger.warning(f"Unknown message header: {bytes(data[:MessageRegistry.headerSize])!r}")
+            return False
+        body = memoryview(data)[MessageRegistry.headerSize:]
+        try:
+            content = body if messageType.decoder is None else messageType.decoder(body)
+        except ValueError as e:
+            messageType.errors += 1
+            logger.warning(f"Unable to parse {messageType.name} message: {e}")
+            return False
+        messageType.count += 1
+        for handler in messageType.handlers:
+            try:
+                handler(content, receiveTime)
+            except queue.Full:
+                logger.warning(f"Message queue full, dropped {messageType.name} message")
+            except Exception as e:
+                # 处理函数的异常不能传到接收线程, 否则接收线程退出, 链路中断
+                messageType.handlerErrors += 1
+                logger.exception(f"{messageType.name} message handler failed: {e}")
+        return True
+
+    def statistics(self) -> dict:
+        result = {messageType.name: {"count": messageType.count, "errors": messageType.errors, "handlerErrors": messageType.handlerErrors} for messageType in self.messageTypes.values()}
+        result["unknown"] = self.unknown
+        return result
+
+
+def builtinDecoders(encoding="utf-8") -> dict:
+    """
+    内置消息类型的解码函数, DataInterface 与 AsyncDataInterface 共用
+    :return: {消息头: 解码函数}
+    """
+    def decodeText(body: memoryview) -> str:
+        return str(body, encoding)
+
+    def decodeJson(body: memoryview):
+        return json.loads(str(body, encoding))
+
+    return {b"JSON-": decodeJson, b"SHORT": decodeText, b"TYPED": decodeTyped, b"STATE": decodeJson}
 
 
 class DataInterface:
@@ -8,8 +161,57 @@ class DataInterface:
         self.radioConnector = RadioConnector(configType, configPath)
         self.radioConnector.callbackMessageUpdate = self.onMessageUpdate
         self.encoding = encoding
-        self.jsonMessageBuffer = []
-        self.shortMessageBuffer = []
+        queueConfig = self.radioConnector.config.get('queues', {})
+        # 遥测数据只关心最新值, 队列满时丢弃最早的消息; 控制指令不能丢弃, 队列满时阻塞接收线程
+        self.jsonMessageBuffer = MessageQueue.fromConfig(queueConfig.get('normal', {}))
+        self.shortMessageBuffer = MessageQueue.fromConfig(queueConfig.get('short', {}), overflowPolicy=OverflowPolicy.Block, putTimeout=1.0)
+        self.typedMessageBuffer = MessageQueue.fromConfig(queueConfig.get('typed', {}))
+        self.stateMessageBuffer = MessageQueue.fromConfig(queueConfig.get('state', {}))
+        self.linkStatistics = self.radioConnector.linkStatistics
+        self.linkStatistics.addSource("normalQueue", self.jsonMessageBuffer.statistics)
+        self.linkStatistics.addSource("shortQueue", self.shortMessageBuffer.statistics)
+
+        # 已有的消息队列作为各消息类型的默认处理函数, getMessageNormal 等接口保持不变;
+        # 应用注册了自己的处理函数后默认不再写入队列(没有人读取时 SHORT 队列写满会阻塞接收线程), 见 addHandler
+        self.messageRegistry = MessageRegistry()
+        self.queueHandlers = {b"JSON-": self.queueHandler(self.jsonMessageBuffer), b"SHORT": self.queueHandler(self.shortMessageBuffer),
+                              b"TYPED": self.queueHandler(self.typedMessageBuffer), b"STATE": self.queueHandler(self.stateMessageBuffer)}
+        for prefix, decoder in builtinDecoders(encoding).items():
+            self.messageRegistry.register(prefix, decoder, self.queueHandlers[prefix])
+        self.linkStatistics.addSource("messages", self.messageRegistry.statistics)
+
+    @staticmethod
+    def queueHandler(messageQueue: MessageQueue):
+        return lambda content, receiveTime: messageQueue.put({"data": content, "time": receiveTime})
+
+    def registerMessage(self, prefix: bytes, decoder=None, handler=None, name=None, keepQueue=False):
+        """
+        注册新的消息类型(见 MessageRegistry.register), 处理函数在接收线程中调用, 不应长时间阻塞
+        :param keepQueue: 见 addHandler
+        """
+        messageType = self.messageRegistry.register(prefix, decoder, name=name)
+        if handler is not None:
+            self.addHandler(prefix, handler, keepQueue)
+        return messageType
+
+    def addHandler(self, prefix: bytes, handler, keepQueue=False):
+        """
+        为已注册的消息类型增加处理函数 handler(内容, 接收时间), 收到消息时直接回调, 不需要轮询队列
+        :param keepQueue: 是否仍把消息写入默认队列(getMessageNormal 等); 默认不写入, 避免没有人读取的队列写满后丢弃消息或阻塞接收线程
+        """
+        self.messageRegistry.addHandler(prefix, handler)
+        queueHandler = self.queueHandlers.get(prefix)
+        if not keepQueue and queueHandler in self.messageRegistry.messageTypes[prefix].handlers:
+            self.messageRegistry.removeHandler(prefix, queueHandler)
+
+    def removeHandler(self, prefix: bytes, handler):
+        """
+        移除处理函数, 移除最后一个处理函数后恢复写入默认队列
+        """
+        self.messageRegistry.removeHandler(prefix, handler)
+        queueHandler = self.queueHandlers.get(prefix)
+        if queueHandler is not None and not self.messageRegistry.messageTypes[prefix].handlers:
+            self.messageRegistry.addHandler(prefix, queueHandler)
 
     def connect(self):
         self.radioConnector.startRadioCommunication()
@@ -21,35 +223,72 @@ class DataInterface:
         self.radioConnector.setRadio()
 
     def sendNormal(self, data: dict):
-        dataJson: str = json.dumps(data)
-        dataComplete: str = "JSON-" + dataJson
-        dataBytes = dataComplete.encode(self.encoding)
-        self.radioConnector.send(dataBytes)
+        self.radioConnector.send(packNormal(data, self.encoding))
 
     def sendShort(self, data: bytes):
-        dataBytes = "SHORT".encode(self.encoding) + data
-        self.radioConnector.send(dataBytes)
+        self.radioConnector.send(packShort(data, self.encoding), TransmitLane.Control)
+
+    def sendTyped(self, obj):
+        """
+        以二进制布局发送 JObject(需要在两端通过 registerSchema 注册同一个类)
+        """
+        self.radioConnector.send(packTyped(obj))
+
+    def sendState(self, data: dict):
+        """
+        发送状态同步消息(见 Communication.StateSync)
+        """
+        self.radioConnector.send(packState(data, self.encoding))
 
     def onMessageUpdate(self):
-        while self.radioConnector.hasMessage():
+        message = self.radioConnector.getMessage()
+        while message is not None:
+            self.messageRegistry.dispatch(message["data"], message["time"])
             message = self.radioConnector.getMessage()
-            header: bytes = message["data"][:5]
-            body: bytes = message["data"][5:]
-            if header.decode(self.encoding) == "SHORT":
-                self.shortMessageBuffer.append({"data": body.decode(self.encoding), "time": message["time"]})
-            else:
-                self.jsonMessageBuffer.append({"data": json.loads(body.decode(self.encoding)), "time": message["time"]})
-
-    def getMessageNormal(self):
-        if len(self.jsonMessageBuffer) > 0:
-            message = self.jsonMessageBuffer.pop(0)
+
+    def getMessageNormal(self, timeout=0):
+        """
+        :param timeout: 等待时间(秒), 0 为不等待, None 为一直等待
+        :return: (数据, 接收时间), 没有消息时为 (None, None)
+        """
+        message = self.jsonMessageBuffer.get(timeout)
+        if message is not None:
+            self.linkStatistics.histogram("normalMessageAge").add(time.time() - message["time"])
+            return message["data"], message["time"]
+
+        return None, None
+
+    def getMessageShort(self, timeout=0):
+        """
+        :param timeout: 等待时间(秒), 0 为不等待, None 为一直等待
+        :return: (数据, 接收时间), 没有消息时为 (None, None)
+        """
+        message = self.shortMessageBuffer.get(timeout)
+        if message is not None:
+            self.linkStatistics.histogram("shortMessageAge").add(time.time() - message["time"])
+            return message["data"], message["time"]
+
+        return None, None
+
+    def getMessageTyped(self, timeout=0):
+        """
+        :param timeout: 等待时间(秒), 0 为不等待, None 为一直等待
+        :return: (JObject, 接收时间), 没有消息时为 (None, None)
+        """
+        message = self.typedMessageBuffer.get(timeout)
+        if message is not None:
+            self.linkStatistics.histogram("typedMessageAge").add(time.time() - message["time"])
             return message["data"], message["time"]
 
         return None, None
 
-    def getMessageShort(self):
-        if len(self.shortMessageBuffer) > 0:
-            message = self.shortMessageBuffer.pop(0)
+    def getMessageState(self, timeout=0):
+        """
+        :param timeout: 等待时间(秒), 0 为不等待, None 为一直等待
+        :return: (同步消息字典, 接收时间), 没有消息时为 (None, None)
+        """
+        message = self.stateMessageBuffer.get(timeout)
+        if message is not None:
             return message["data"], message["time"]
 
         return None, None
@@ -0,0 +1,134 @@
+import json
+import math
+import threading
+import time
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+
+    def add(self, value=1):
+        self.value += value
+
+
+class Histogram:
+    def __init__(self):
+        """
+        以 2 的幂为桶边界的直方图
+
+        记录只需要一次 frexp 和一次字典更新, 分位数按桶的上边界近似
+        """
+        self.buckets = {}
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, count=1):
+        """
+        :param count: 相同取值的记录次数
+        """
+        exponent = math.frexp(value)[1] if value > 0 else -1074
+        self.buckets[exponent] = self.buckets.get(exponent, 0) + count
+        self.count += count
+        self.sum += value * count
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> float:
+        if self.count == 0:
+            return 0.0
+        target = q * self.count
+        total = 0
+        for exponent in sorted(self.buckets):
+            total += self.buckets[exponent]
+            if total >= target:
+                return min(math.ldexp(1.0, exponent), self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        if self.count == 0:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean": self.sum / self.count,
+            "min": self.min,
+            "p50": self.percentile(0.5),
+            "p99": self.percentile(0.99),
+            "max": self.max,
+        }
+
+
+class LinkStatistics:
+    def __init__(self):
+        """
+        链路统计
+
+        计数器与直方图在第一次使用时创建, 记录时不加锁; 其他模块已有的统计(压缩、队列、发送调度器)通过 addSource 注册, 在 snapshot 时读取
+        """
+        self.counters = {}
+        self.histograms = {}
+        self.sources = {}
+        self.startTime = time.time()
+        self.exportThread = None
+        self.exportStop = threading.Event()
+
+    def counter(self, name: str) -> Counter:
+        counter = self.counters.get(name)
+        if counter is None:
+            counter = self.counters[name] = Counter()
+        return counter
+
+    def histogram(self, name: str) -> Histogram:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        return histogram
+
+    def addSource(self, name: str, source):
+        """
+        注册统计来源
+        :param name: 名称
+        :param source: 无参数函数, 返回可以序列化为 JSON 的统计数据
+        """
+        self.sources[name] = source
+
+    def snapshot(self) -> dict:
+        counters = {name: counter.value for name, counter in list(self.counters.items())}
+        result = {
+            "time": time.time(),
+            "uptime": time.time() - self.startTime,
+            "counters": counters,
+            "histograms": {name: histogram.summary() for name, histogram in list(self.histograms.items())},
+        }
+        if counters.get("payloadBytesOut", 0) > 0:
+            result["escapeExpansion"] = counters.get("frameBytesOut", 0) / counters["payloadBytesOut"]
+        for name, source in list(self.sources.items()):
+            result[name] = source()
+        return result
+
+    def startExport(self, path: str, interval: float):
+        """
+        定期将统计快照以 JSON Lines 格式追加写入文件
+        """
+        self.exportStop.clear()
+        self.exportThread = threading.Thread(target=self.threadExport, args=(path, interval), daemon=True)
+        self.exportThread.start()
+
+    def stopExport(self):
+        if self.exportThread is not None:
+            self.exportStop.set()
+            self.exportThread.join()
+            self.exportThread = None
+
+    def threadExport(self, path: str, interval: float):
+        while not self.exportStop.wait(interval):
+            self.export(path)
+        self.export(path)
+
+    def export(self, path: str):
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.snapshot()) + "\n")
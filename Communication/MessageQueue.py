@@ -0,0 +1,89 @@
+import queue
+import threading
+from collections import deque
+from enum import Enum
+
+
+class OverflowPolicy(Enum):
+    DropOldest = "DropOldest"
+    Block = "Block"
+    Raise = "Raise"
+
+
+class MessageQueue:
+    def __init__(self, capacity=1024, overflowPolicy=OverflowPolicy.DropOldest, putTimeout=None):
+        """
+        有界的线程安全消息队列
+
+        队列满时按 overflowPolicy 处理: DropOldest 丢弃最早的消息, Block 阻塞写入方直到有空位(超过 putTimeout 则抛出 queue.Full), Raise 直接抛出 queue.Full
+        :param capacity: 队列容量
+        :param overflowPolicy: 队列满时的处理策略
+        :param putTimeout: Block 策略下写入的最长等待时间(秒), None 为一直等待
+        """
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.overflowPolicy = OverflowPolicy(overflowPolicy)
+        self.putTimeout = putTimeout
+        self.messages = deque()
+        self.condition = threading.Condition()
+
+        self.putCount = 0
+        self.getCount = 0
+        self.dropped = 0
+        self.highWaterMark = 0
+
+    @staticmethod
+    def fromConfig(config: dict, capacity=1024, overflowPolicy=OverflowPolicy.DropOldest, putTimeout=None):
+        return MessageQueue(config.get('capacity', capacity), config.get('policy', OverflowPolicy(overflowPolicy).value), config.get('timeout', putTimeout))
+
+    def put(self, message):
+        with self.condition:
+            if len(self.messages) >= self.capacity:
+                if self.overflowPolicy == OverflowPolicy.DropOldest:
+                    self.messages.popleft()
+                    self.dropped += 1
+                elif self.overflowPolicy == OverflowPolicy.Block:
+                    if not self.condition.wait_for(lambda: len(self.messages) < self.capacity, self.putTimeout):
+                        self.dropped += 1
+                        raise queue.Full
+                else:
+                    self.dropped += 1
+                    raise queue.Full
+            self.messages.append(message)
+            self.putCount += 1
+            self.highWaterMark = max(self.highWaterMark, len(self.messages))
+            self.condition.notify_all()
+
+    def get(self, timeout=0):
+        """
+        取出最早的消息
+        :param timeout: 等待时间(秒), 0 为不等待, None 为一直等待
+        :return: 消息, 超时时返回 None
+        """
+        with self.condition:
+            if len(self.messages) == 0:
+                if timeout == 0 or not self.condition.wait_for(lambda: len(self.messages) > 0, timeout):
+                    return None
+            message = self.messages.popleft()
+            self.getCount += 1
+            self.condition.notify_all()
+            return message
+
+    def clear(self):
+        with self.condition:
+            self.messages.clear()
+            self.condition.notify_all()
+
+    def __len__(self):
+        return len(self.messages)
+
+    def statistics(self) -> dict:
+        return {
+            "size": len(self.messages),
+            "capacity": self.capacity,
+            "put": self.putCount,
+            "get": self.getCount,
+            "dropped": self.dropped,
+            "highWaterMark": self.highWaterMark,
+        }
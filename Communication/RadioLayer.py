@@ -8,7 +8,11 @@ import os
 import re
 
 from loguru import logger
-from Communication.DataPacket import DataPacket
+from Communication.DataPacket import DataPacket, DecodeEvent, FramingMode
+from Communication.LinkStatistics import LinkStatistics
+from Communication.MessageQueue import MessageQueue
+from Communication.TransmitScheduler import TransmitLane, TransmitScheduler
+from DataStructure.InformationData import presetDictionary
 
 
 def readFile(fileName, encoding='utf-8'):
@@ -16,6 +20,16 @@ def readFile(fileName, encoding='utf-8'):
         return f.read()
 
 
+def provisionStampPath(configType, serialName) -> str:
+    """
+    记录无线模块上次成功配置的文件, 放在用户缓存目录($XDG_CACHE_HOME 或 ~/.cache)下, 不写入源码目录;
+    按配置类型与串口区分, 同一台机器上连接多个无线模块时互不影响
+    """
+    cacheDirectory = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    device = re.sub(r'[^A-Za-z0-9_.-]+', '_', serialName).strip('_.')
+    return os.path.join(cacheDirectory, "FlightControl", f"radio-{configType}-{device}.json")
+
+
 class RadioConnector:
     def __init__(self, configType, configPath=None):
         if configPath is None:
@@ -31,19 +45,52 @@ class RadioConnector:
         self.dictBaudRate = self.config['dictBaudRate']
         self.settingBaudRate = self.config['settingBaudRate']
         self.templateSettingCommand = self.config['templateSettingCommand']
+        self.framing = FramingMode(self.config.get('framing', FramingMode.V1.value))
+        self.compressed = self.config.get('compressed', False)
+        self.presetDictionary = presetDictionary() if self.config.get('presetDictionary', False) else None
+        # 压缩时总是启用分片(见 DataPacket)
+        self.fragmented = self.config.get('fragmented', False) or self.compressed
+        # 接收: 单次读取的最大字节数, 空闲时阻塞读取的超时时间, 收到数据后为凑满一次读取最多额外等待的时间
+        self.readChunkSize = self.config.get('readChunkSize', 4096)
+        self.readTimeout = self.config.get('readTimeout', 0.5)
+        self.readLatency = self.config.get('readLatency', 0)
+        self.transmitConfig = self.config.get('transmitScheduler', {})
+        self.statisticsConfig = self.config.get('statistics', {})
+        # 无线模块配置: 总超时, 提示信息输出停止的判定时间, 等待提示信息输出停止的最长时间, 接收缓冲区上限, 记录上次成功配置的文件
+        self.provisionTimeout = self.config.get('provisionTimeout', 10)
+        self.provisionQuietTime = self.config.get('provisionQuietTime', 0.1)
+        self.provisionSettleTime = self.config.get('provisionSettleTime', 0.5)
+        self.provisionBufferSize = 256
+        self.provisionStampPath = self.config.get('provisionStampPath') or provisionStampPath(configType, self.serialName)
+        self.provisionTimings = {}
 
-        self.timeout = 5
         self.serial = None
-        self.recvBuffer = []
+        self.recvBuffer = MessageQueue.fromConfig(self.config.get('queues', {}).get('recv', {}))
         self.recvThread = None
-        self.dataPacket = DataPacket()
+        self.transmitScheduler = None
+        self.linkStatistics = LinkStatistics()
+        self.dataPacket = DataPacket(compressed=self.compressed, framing=self.framing, presetDictionary=self.presetDictionary, fragmented=self.fragmented,
+                                     statistics=self.linkStatistics)
+        self.linkStatistics.addSource("recvQueue", self.recvBuffer.statistics)
+        self.linkStatistics.addSource("provisioning", lambda: self.provisionTimings)
+        if self.compressed:
+            self.linkStatistics.addSource("compression", self.dataPacket.compressionStatistics.summary)
         self.connectionStatus = ConnectionStatus.Unknown
 
         self.enableMessageLog = False
         self.callbackMessageUpdate = None
+        self.flightRecord = None
+
+    def setFlightRecorder(self, flightRecorder, capacity=1000000, dataCapacity=256 * 1024 * 1024):
+        """
+        把每个解码出的数据帧写入飞行记录器(DataStructure.FlightRecorder)的 radio 通道, 需要在 startRadioCommunication 之前调用
+        :param capacity: 最多记录的数据帧数
+        :param dataCapacity: 数据文件大小(字节)
+        """
+        self.flightRecord = flightRecorder.blobChannel("radio", capacity, dataCapacity)
 
     def _openSerial(self, deviceName, baudRate):
-        self.serial = serial.Serial(deviceName, baudRate, timeout=self.timeout)
+        self.serial = serial.serial_for_url(deviceName, baudRate, timeout=self.readTimeout)
         logger.info(f"Connected to serial {deviceName} on {baudRate}")
         self.connectionStatus = ConnectionStatus.Connected
 
@@ -53,77 +100,219 @@ class RadioConnector:
             self.serial.close()
             logger.info(f"Serial {self.serialName} closed")
 
-    def setRadio(self):
-        outputBuffer = ""
-        start = None
+    def setRadio(self, force=False, timeout=None) -> bool:
+        """
+        配置 DL-30 无线模块的波特率与信道
+
+        先检查记录文件中上次成功写入的配置, 与当前配置一致时跳过(更换模块或手动改过模块配置时使用 force=True);
+        否则以 settingBaudRate 打开串口, 等待模块输出 "#1 UartConfig", 待输出停止后写入配置指令, 等待 "#5 done"。
+        读取阻塞在串口上, 接收缓冲区有长度上限, 整个过程受 timeout 限制, 各阶段耗时记录在 provisionTimings 中
+        :param force: 忽略记录文件, 总是重新配置
+        :param timeout: 总超时时间(秒), 默认使用配置中的 provisionTimeout
+        :return: 是否成功(或无需配置)
+        """
+        start = time.perf_counter()
+        timings = {}
+        self.provisionTimings = timings
+        command = self.templateSettingCommand.format(baudRate=self.dictBaudRate[str(self.baudRate)], channel=self.channel)
+        state = {"serialName": self.serialName, "command": command}
+        if not force and self._readProvisionStamp() == state:
+            timings["probe"] = time.perf_counter() - start
+            logger.info(f"Radio already set to: rate=[{self.baudRate}], channel=[{self.channel}], skipped")
+            return True
+        deadline = start + (self.provisionTimeout if timeout is None else timeout)
+
+        def phase(name):
+            timings[name] = time.perf_counter() - start
+
         self._openSerial(self.serialName, self.settingBaudRate)
-        logger.info("Start set radio")
-        logger.debug("Waiting for setting mode...")
+        try:
+            phase("open")
+            logger.info("Start set radio")
+            logger.debug("Waiting for setting mode...")
+            if not self._waitFor(b"#1 UartConfig", deadline):
+                logger.error("Set radio timeout: setting mode banner not received")
+                return False
+            phase("banner")
+            logger.debug(f"Got UartConfig")
+            # 模块输出完提示信息后才接受指令, 等待输出停止
+            self._waitQuiet(self.provisionQuietTime, min(deadline, time.perf_counter() + self.provisionSettleTime))
+            phase("settle")
+            self.serial.write(command.encode('utf-8'))
+            logger.debug(f"Set radio: {command}")
+            if not self._waitFor(b"#5 done", deadline):
+                logger.error('Set radio command timeout')
+                return False
+            phase("done")
+            self._writeProvisionStamp(state)
+            logger.info(f"Successfully set radio to: rate=[{self.baudRate}], channel=[{self.channel}] in {timings['done']:.3f}s")
+            return True
+        finally:
+            self._closeSerial()
+
+    def _waitFor(self, pattern: bytes, deadline: float) -> bool:
+        """
+        阻塞读取串口直到收到 pattern 或超过 deadline, 缓冲区只保留最近 provisionBufferSize 字节
+        """
+        buffer = bytearray()
         while True:
-            outputBuffer += self.serial.read_all().decode('utf-8')
-            if re.match(r'^#1 UartConfig', outputBuffer):
-                logger.debug(f"Got UartConfig:")
-                time.sleep(0.5)
-                outputBuffer = ""
-                command = self.templateSettingCommand.format(baudRate=self.dictBaudRate[str(self.baudRate)], channel=self.channel)
-                self.serial.write(command.encode('utf-8'))
-                logger.debug(f"Set radio: {command}")
-                start = time.time()
-            if start is not None:
-                if time.time() - start > self.timeout:
-                    logger.error('Set radio command timeout')
-                    break
-                if re.match(r'^#5 done', outputBuffer):
-                    logger.info(f"Successfully set radio to: rate=[{self.baudRate}], channel=[{self.channel}]")
-                    break
-        self._closeSerial()
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return False
+            self.serial.timeout = min(self.readTimeout, remaining)
+            data = self.serial.read(max(1, self.serial.in_waiting))
+            if data == b'':
+                continue
+            buffer += data
+            if pattern in buffer:
+                return True
+            if len(buffer) > self.provisionBufferSize:
+                del buffer[:len(buffer) - self.provisionBufferSize]
+
+    def _waitQuiet(self, quietTime: float, deadline: float):
+        """
+        读取并丢弃串口数据, 直到 quietTime 秒内没有新数据或超过 deadline
+        """
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return
+            self.serial.timeout = min(quietTime, remaining)
+            if self.serial.read(max(1, self.serial.in_waiting)) == b'':
+                return
+
+    def _readProvisionStamp(self):
+        try:
+            return json.loads(readFile(self.provisionStampPath))
+        except (OSError, ValueError):
+            return None
 
-    def send(self, data: bytes):
-        encoded = self.dataPacket.encode(data)
-        for rawSize, escapedSize, encodedData in zip(encoded[0], encoded[1], encoded[2]):
-            self.serial.write(encodedData)
+    def _writeProvisionStamp(self, state: dict):
+        try:
+            os.makedirs(os.path.dirname(self.provisionStampPath) or ".", exist_ok=True)
+            with open(self.provisionStampPath, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+        except OSError as e:
+            logger.warning(f"Unable to write radio provision stamp: {e}")
+
+    def send(self, data: bytes, lane=TransmitLane.Telemetry):
+        """
+        发送数据
+
+        启用发送调度器时, 数据放入对应的发送通道, 由发送线程编码后写入串口, 否则直接在调用线程写入
+        :param data: 数据
+        :param lane: 发送通道, 控制指令使用 TransmitLane.Control
+        """
+        if self.transmitScheduler is not None:
+            self.transmitScheduler.put(data, lane)
+        else:
+            self._write(self.dataPacket.encodeMany([data]))
+
+    def sendMany(self, listData: list, lane=TransmitLane.Telemetry):
+        if self.transmitScheduler is not None:
+            for data in listData:
+                self.transmitScheduler.put(data, lane)
+        else:
+            self._write(self.dataPacket.encodeMany(listData))
+
+    def _write(self, data: bytes):
+        self.serial.write(data)
+        self.linkStatistics.counter("bytesOut").add(len(data))
 
     def recv(self):
-        data = self.serial.read_all()
-        outputBuffer = data
-        while data == b'':
-            data = self.serial.read_all()
-            outputBuffer += data
-            if self.enableMessageLog and data != b'':
-                logger.debug(f"Received radio message({len(data)}): {data}")
-
-        if self.enableMessageLog:
+        """
+        阻塞读取串口数据
+
+        没有数据时阻塞在串口读取上(不占用CPU), 直到有数据到达、超过 readTimeout 或被 cancel_read 打断
+
+        如果设置了 readLatency, 收到数据后最多再等待 readLatency 秒以凑满 readChunkSize, 减少高负载时的唤醒次数
+        :return: 读取到的数据, 超时或被打断时为 b''
+        """
+        outputBuffer = self.serial.read(max(1, min(self.serial.in_waiting, self.readChunkSize)))
+        if outputBuffer != b'' and self.readLatency > 0 and len(outputBuffer) < self.readChunkSize:
+            time.sleep(self.readLatency)
+            outputBuffer += self.serial.read(min(self.serial.in_waiting, self.readChunkSize - len(outputBuffer)))
+        self.linkStatistics.counter("bytesIn").add(len(outputBuffer))
+
+        if self.enableMessageLog and outputBuffer != b'':
             logger.debug(f"Get radio message({len(outputBuffer)}): {outputBuffer}")
         return outputBuffer
 
     def threadReceive(self):
         while self.connectionStatus == ConnectionStatus.Connected:
             buffer = self.recv()
-            decoded = self.dataPacket.decode(buffer)
-            if type(decoded) != bool:
-                for decodedData in decoded:
-                    self.recvBuffer.append({"data": decodedData, "time": time.time()})
+            if buffer == b'':
+                continue
+            hasNewMessage = False
+            for result in self.dataPacket.decode(buffer):
+                if result.event != DecodeEvent.Frame:
                     if self.enableMessageLog:
-                        logger.debug(f"Message Log:")
-                        logger.debug(f"    Received message(Bytes): {decodedData}")
-                        logger.debug(f"    Received message(Decoded): {decodedData.decode('utf-8')}")
-                if self.callbackMessageUpdate is not None:
+                        logger.debug(f"{result.event.value}: discarded {result.discarded} bytes")
+                    continue
+                if result.lost > 0 and self.enableMessageLog:
+                    logger.debug(f"Sequence gap before frame {result.sequence}: {result.lost} frames lost")
+                hasNewMessage = True
+                receiveTime = time.time()
+                if self.flightRecord is not None:
+                    # 记录器使用单调时钟, 系统时间调整不会使时间索引回退
+                    self.flightRecord.append(self.flightRecord.clock(), result.data)
+                self.recvBuffer.put({"data": result.data, "time": receiveTime})
+                if self.enableMessageLog:
+                    logger.debug(f"Message Log:")
+                    logger.debug(f"    Received message(Bytes): {result.data}")
+                    logger.debug(f"    Received message(Decoded): {result.data.decode('utf-8')}")
+            if hasNewMessage and self.callbackMessageUpdate is not None:
+                try:
                     self.callbackMessageUpdate()
+                except Exception as e:
+                    # 回调的异常不能结束接收线程
+                    self.linkStatistics.counter("callbackErrors").add()
+                    logger.exception(f"Message update callback failed: {e}")
 
     def startRadioCommunication(self):
         self._openSerial(self.serialName, self.baudRate)
         self.recvThread = threading.Thread(target=self.threadReceive)
         self.recvThread.start()
+        if self.transmitConfig.get('enabled', False):
+            self.transmitScheduler = TransmitScheduler(self._write, self.dataPacket, self.baudRate,
+                                                       maxWriteSize=self.transmitConfig.get('maxWriteSize', 256),
+                                                       maxLead=self.transmitConfig.get('maxLead', 0.005),
+                                                       laneBandwidth=self.transmitConfig.get('laneBandwidth'),
+                                                       laneCapacity=self.transmitConfig.get('laneCapacity'))
+            self.transmitScheduler.start()
+            self.linkStatistics.addSource("transmitScheduler", self.transmitScheduler.statistics)
+        if self.statisticsConfig.get('exportPath') is not None:
+            self.linkStatistics.startExport(self.statisticsConfig['exportPath'], self.statisticsConfig.get('exportInterval', 10))
 
     def stopRadioCommunication(self):
-        self._closeSerial()
+        """
+        停止接收线程并关闭串口
+
+        先打断正在阻塞的读取并等待接收线程退出, 再关闭串口, 不需要等待串口超时
+        """
+        self.connectionStatus = ConnectionStatus.Disconnected
+        if self.transmitScheduler is not None:
+            self.transmitScheduler.stop()
+            self.transmitScheduler = None
+        if hasattr(self.serial, "cancel_read"):
+            self.serial.cancel_read()
         self.recvThread.join()
+        self._closeSerial()
+        self.linkStatistics.stopExport()
 
     def hasMessage(self):
         return len(self.recvBuffer) > 0
 
-    def getMessage(self):
-        return self.recvBuffer.pop(0)
+    def getMessage(self, timeout=0):
+        """
+        取出一条接收到的消息
+        :param timeout: 等待时间(秒), 0 为不等待, None 为一直等待
+        :return: {"data": bytes, "time": float}, 超时时返回 None
+        """
+        message = self.recvBuffer.get(timeout)
+        if message is not None:
+            self.linkStatistics.histogram("messageAge").add(time.time() - message["time"])
+        return message
 
 
 class ConnectionStatus(Enum):
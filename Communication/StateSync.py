@@ -0,0 +1,221 @@
+import time
+
+from DataStructure.JsonModel import JObject, to_dict, update_object
+
+
+def diffState(current: dict, baseline: dict, deadbands: dict, deadband: float, prefix: str) -> dict:
+    """
+    计算 current 相对 baseline 的变化字段
+    浮点字段变化量不超过死区时视为未变化, 嵌套对象只输出变化的子字段
+    :param current: 当前状态(to_dict 的结果)
+    :param baseline: 基准状态
+    :param deadbands: 字段死区, 键为 update_object 返回的路径格式, 如 "GPSInfo.altitude"
+    :param deadband: 未单独配置的浮点字段使用的死区
+    :param prefix: 当前层级的路径前缀
+    :return: 变化字段组成的字典, 结构与 current 相同
+    """
+    delta = {}
+    for name, value in current.items():
+        if name not in baseline:
+            delta[name] = value
+            continue
+        old = baseline[name]
+        if type(value) is dict and type(old) is dict:
+            child = diffState(value, old, deadbands, deadband, f"{prefix}.{name}")
+            if child:
+                delta[name] = child
+        elif type(value) is float and type(old) in (float, int):
+            if abs(value - old) > deadbands.get(f"{prefix}.{name}", deadband):
+                delta[name] = value
+        elif value != old:
+            delta[name] = value
+    return delta
+
+
+def mergeState(baseline: dict, delta: dict) -> dict:
+    """
+    把变化字段合并进基准状态, 返回新的字典(不修改 baseline)
+    """
+    merged = dict(baseline)
+    for name, value in delta.items():
+        if type(value) is dict and type(merged.get(name)) is dict:
+            merged[name] = mergeState(merged[name], value)
+        else:
+            merged[name] = value
+    return merged
+
+
+class StateSender:
+    def __init__(self, dataInterface=None, deadband=0.0, deadbands=None, keyframeInterval=5.0, acknowledged=False, pendingLimit=64):
+        """
+        增量状态同步的发送端
+
+        每类对象维护一份基准快照, 只发送相对基准变化的字段, 并按 keyframeInterval 周期发送完整关键帧, 供中途加入或丢包的接收端恢复。
+        acknowledged 为 False 时以上一次发送的内容为基准(单向链路, 丢包靠关键帧恢复);
+        为 True 时以接收端最后确认的快照为基准, 增量中包含自确认以来的全部变化, 丢失的增量会在下一次发送时补上
+        :param dataInterface: DataInterface, 为 None 时只编码不发送
+        :param deadband: 浮点字段的默认死区
+        :param deadbands: 按字段路径配置的死区, 如 {"GPSInfo.altitude": 0.5}
+        :param keyframeInterval: 关键帧间隔(秒)
+        :param acknowledged: 是否使用接收端确认的快照作为基准
+        :param pendingLimit: 每类对象等待确认的快照数量上限
+        """
+        self.dataInterface = dataInterface
+        self.deadband = deadband
+        self.deadbands = deadbands if deadbands is not None else {}
+        self.keyframeInterval = keyframeInterval
+        self.acknowledged = acknowledged
+        self.pendingLimit = pendingLimit
+        # 类名 -> 基准快照 / 序号 / 上次关键帧时间 / 等待确认的快照
+        self.baselines = {}
+        self.sequences = {}
+        self.keyframeTimes = {}
+        self.pending = {}
+
+        self.keyframes = 0
+        self.deltas = 0
+        self.skipped = 0
+
+    def encode(self, obj: JObject, now=None):
+        """
+        生成对象的同步消息
+        :param obj: 要同步的对象
+        :param now: 当前时间, 默认 time.time()
+        :return: 消息字典, 没有需要发送的变化时为 None
+        """
+        now = time.time() if now is None else now
+        name = type(obj).__name__
+        current = to_dict(obj)
+        baseline = self.baselines.get(name)
+        keyframe = baseline is None or now - self.keyframeTimes.get(name, 0) >= self.keyframeInterval
+        if keyframe:
+            data = current
+            self.keyframeTimes[name] = now
+        else:
+            data = diffState(current, baseline, self.deadbands, self.deadband, name)
+            if not data:
+                self.skipped += 1
+                return None
+        sequence = self.sequences.get(name, -1) + 1
+        self.sequences[name] = sequence
+        snapshot = current if keyframe else mergeState(baseline, data)
+        if self.acknowledged:
+            pending = self.pending.setdefault(name, {})
+            pending[sequence] = snapshot
+            while len(pending) > self.pendingLimit:
+                del pending[min(pending)]
+            # 关键帧之前没有确认过的基准, 先按关键帧内容计算后续增量
+            if baseline is None:
+                self.baselines[name] = snapshot
+        else:
+            self.baselines[name] = snapshot
+        if keyframe:
+            self.keyframes += 1
+        else:
+            self.deltas += 1
+        message = {"n": name, "s": sequence, "d": data}
+        if keyframe:
+            message["k"] = 1
+        return message
+
+    def publish(self, obj: JObject, now=None) -> bool:
+        """
+        编码并通过 dataInterface 发送
+        :return: 是否发送了消息
+        """
+        message = self.encode(obj, now)
+        if message is None:
+            return False
+        self.dataInterface.sendState(message)
+        return True
+
+    def onAck(self, name: str, sequence: int):
+        """
+        处理接收端的确认, 把对应快照设为新的基准, 并丢弃更早的待确认快照
+        """
+        pending = self.pending.get(name)
+        if pending is None or sequence not in pending:
+            return
+        self.baselines[name] = pending[sequence]
+        for old in [old for old in pending if old <= sequence]:
+            del pending[old]
+
+    def statistics(self) -> dict:
+        return {"keyframes": self.keyframes, "deltas": self.deltas, "skipped": self.skipped}
+
+
+class StateReceiver:
+    def __init__(self, classes: list, dataInterface=None, acknowledge=False, sender: StateSender = None):
+        """
+        增量状态同步的接收端, 通过 update_object 把关键帧与增量应用到本地对象
+        :param classes: 需要同步的 JObject 子类
+        :param dataInterface: DataInterface, 用于取出 STATE 消息及发送确认
+        :param acknowledge: 是否向发送端回复确认
+        :param sender: 本端的 StateSender, 收到的确认消息交给它处理
+        """
+        self.objects = {_class.__name__: _class() for _class in classes}
+        self.dataInterface = dataInterface
+        self.acknowledge = acknowledge
+        self.sender = sender
+        # 类名 -> 最后应用的序号, 收到关键帧之前为 None
+        self.sequences = {name: None for name in self.objects}
+
+        self.lost = 0
+        self.stale = 0
+
+    def get(self, _class: type) -> JObject:
+        return self.objects[_class.__name__]
+
+    def synchronized(self, _class: type) -> bool:
+        """
+        是否已收到过该类的关键帧
+        """
+        return self.sequences[_class.__name__] is not None
+
+    def apply(self, message: dict) -> list:
+        """
+        应用一条同步消息
+        :param message: 消息字典
+        :return: 变更的字段路径, 确认消息或无法应用的消息返回空列表
+        """
+        name = message.get("n")
+        if "a" in message:
+            if self.sender is not None:
+                self.sender.onAck(name, message["a"])
+            return []
+        if name not in self.objects:
+            return []
+        sequence = message["s"]
+        last = self.sequences[name]
+        keyframe = message.get("k", 0)
+        if not keyframe:
+            # 收到关键帧之前的增量缺少基准, 丢弃
+            if last is None:
+                self.stale += 1
+                return []
+            if sequence <= last:
+                self.stale += 1
+                return []
+        if last is not None and sequence > last + 1:
+            self.lost += sequence - last - 1
+        self.sequences[name] = sequence
+        changed = update_object(message["d"], self.objects[name])
+        if self.acknowledge and self.dataInterface is not None:
+            self.dataInterface.sendState({"n": name, "a": sequence})
+        return changed
+
+    def poll(self, timeout=0) -> list:
+        """
+        取出并应用 dataInterface 中全部的 STATE 消息
+        :param timeout: 等待第一条消息的时间(秒)
+        :return: 变更的字段路径
+        """
+        changed = []
+        message, _ = self.dataInterface.getMessageState(timeout)
+        while message is not None:
+            changed += self.apply(message)
+            message, _ = self.dataInterface.getMessageState()
+        return changed
+
+    def statistics(self) -> dict:
+        return {"lost": self.lost, "stale": self.stale}
@@ -0,0 +1,271 @@
+import threading
+import time
+
+from loguru import logger
+
+from Communication.DataProcessingLayer import packNormal, packTyped
+from Communication.TransmitScheduler import TransmitLane
+from DataStructure.JsonModel import to_dict
+
+
+class TelemetryStream:
+    def __init__(self, name: str, rate: float, priority=0, minRate=0.0, typed=False):
+        """
+        一路遥测数据流
+        :param name: 名称, 与遥测对象的类名一致, 如 "GPSInfo"
+        :param rate: 目标发送频率(Hz)
+        :param priority: 优先级, 数值越小越重要, 链路饱和时先降低数值大的数据流
+        :param minRate: 降频的下限(Hz)
+        :param typed: 使用 TYPED 二进制格式发送(需要注册 BinarySchema), 否则以 JSON 发送
+        """
+        self.name = name
+        self.targetRate = rate
+        self.priority = priority
+        self.minRate = min(minRate, rate)
+        self.typed = typed
+        # 当前分配到的发送频率
+        self.rate = rate
+        self.nextTime = 0.0
+        # 只保留最新的一个采样, 发送前被新采样覆盖的旧采样不再发送
+        self.latest = None
+        # 消息长度的滑动平均, 首次发送前为 None
+        self.payloadSize = None
+
+        self.published = 0
+        self.sent = 0
+        self.replaced = 0
+        # 无法编码而丢弃的采样数
+        self.failed = 0
+
+    def encode(self, obj) -> bytes:
+        return packTyped(obj) if self.typed else packNormal(to_dict(obj))
+
+    def encodeFailed(self, error: Exception):
+        """
+        记录一个无法编码而丢弃的采样, 只在第一次失败时输出错误日志
+        """
+        self.failed += 1
+        if self.failed == 1:
+            logger.error(f"Unable to encode {self.name}, dropping samples that cannot be encoded: {error}")
+        else:
+            logger.debug(f"Unable to encode {self.name}: {error}")
+
+    def cost(self, rate: float, overhead: float) -> float:
+        """
+        按指定频率发送时占用的线路字节数(字节/秒)
+        """
+        return rate * (self.payloadSize or 0) * overhead
+
+    def statistics(self) -> dict:
+        return {"targetRate": self.targetRate, "rate": self.rate, "priority": self.priority, "payloadSize": self.payloadSize,
+                "published": self.published, "sent": self.sent, "replaced": self.replaced, "failed": self.failed}
+
+
+class TelemetryScheduler:
+    def __init__(self, dataInterface, streams: list, utilization=0.9, reallocateInterval=1.0, smoothing=0.2, maxBacklog=2):
+        """
+        按链路带宽分配遥测发送频率
+
+        应用调用 publish 提交采样, 每路数据流只保留最新的采样, 由调度线程按分配的频率发送;
+        链路预算 = 波特率 / 10 x 遥测通道带宽比例 x utilization - 实测的其它数据(控制指令等)占用,
+        每个数据流的占用 = 频率 x 实测消息长度 x 实测帧开销(帧头、转义、分片标记等, 由 frameBytesOut / payloadBytesOut 得到),
+        预算不足时从优先级最低的数据流开始降频, 直到 minRate;
+        发送调度器的遥测通道中积压超过 maxBacklog 个数据包时暂停提交, 保证发出的总是最新的采样
+        :param dataInterface: DataInterface
+        :param streams: TelemetryStream 列表
+        :param utilization: 可使用的预算比例, 留出余量给链路抖动
+        :param reallocateInterval: 重新测量并分配频率的间隔(秒)
+        :param smoothing: 测量值滑动平均的系数
+        :param maxBacklog: 遥测通道允许积压的数据包数量
+        """
+        self.dataInterface = dataInterface
+        self.radioConnector = dataInterface.radioConnector
+        self.streams = {stream.name: stream for stream in streams}
+        self.utilization = utilization
+        self.reallocateInterval = reallocateInterval
+        self.smoothing = smoothing
+        self.maxBacklog = maxBacklog
+        self.backlogWait = 0.002
+        laneBandwidth = self.radioConnector.transmitConfig.get('laneBandwidth') or {}
+        # 1 起始位 + 8 数据位 + 1 停止位
+        self.linkBudget = int(self.radioConnector.baudRate) / 10 * laneBandwidth.get(TransmitLane.Telemetry.value, 1.0) * utilization
+        self.budget = self.linkBudget
+        # 帧字节数 / 消息字节数, 首次测量前按 v1 帧头 5 字节加少量转义估计
+        self.overhead = 1.1
+        self.otherTraffic = 0.0
+
+        self.condition = threading.Condition()
+        self.isRunning = False
+        self.thread = None
+        self.lastMeasure = None
+        self.ownBytes = 0
+
+    @staticmethod
+    def fromConfig(dataInterface):
+        """
+        按 config.json 中的 telemetryScheduler 配置创建
+        """
+        config = dataInterface.radioConnector.config.get('telemetryScheduler', {})
+        streams = [TelemetryStream(name, streamConfig['rate'], streamConfig.get('priority', 0), streamConfig.get('minRate', 0.0), streamConfig.get('typed', False))
+                   for name, streamConfig in config.get('streams', {}).items()]
+        return TelemetryScheduler(dataInterface, streams, config.get('utilization', 0.9), config.get('reallocateInterval', 1.0))
+
+    def start(self):
+        self.isRunning = True
+        self.thread = threading.Thread(target=self.threadSchedule)
+        self.thread.start()
+        self.radioConnector.linkStatistics.addSource("telemetryScheduler", self.statistics)
+
+    def stop(self):
+        with self.condition:
+            self.isRunning = False
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+
+    def publish(self, obj):
+        """
+        提交一个遥测采样, 覆盖该数据流中尚未发送的采样
+        :param obj: 遥测对象, 按类名对应数据流
+        """
+        stream = self.streams[type(obj).__name__]
+        with self.condition:
+            if stream.latest is not None:
+                stream.replaced += 1
+            stream.latest = obj
+            stream.published += 1
+            self.condition.notify_all()
+
+    def threadSchedule(self):
+        nextReallocate = time.perf_counter()
+        while True:
+            with self.condition:
+                samples = []
+                while self.isRunning:
+                    now = time.perf_counter()
+                    if now >= nextReallocate:
+                        break
+                    if self._backlogged():
+                        self.condition.wait(self.backlogWait)
+                        continue
+                    due = [stream for stream in self.streams.values() if stream.latest is not None and stream.rate > 0 and stream.nextTime <= now]
+                    # 首次出现的数据流还不知道消息长度, 先按它的采样估计长度并重新分配; 其它到期的数据流照常发送
+                    if any(stream.payloadSize is None for stream in due):
+                        nextReallocate = now
+                        due = [stream for stream in due if stream.payloadSize is not None]
+                    if len(due) > 0:
+                        for stream in due:
+                            samples.append((stream, stream.latest))
+                            stream.latest = None
+                            period = 1.0 / stream.rate
+                            stream.nextTime = max(stream.nextTime, now - period) + period
+                        break
+                    if now >= nextReallocate:
+                        break
+                    self.condition.wait(self._waitTime(now, nextReallocate))
+                if not self.isRunning:
+                    break
+            if now >= nextReallocate:
+                self.reallocate()
+                nextReallocate = now + self.reallocateInterval
+            for stream, obj in samples:
+                self._send(stream, obj)
+
+    def _backlogged(self) -> bool:
+        """
+        发送调度器的遥测通道中是否已有足够多的数据等待发送, 此时采样留在数据流中继续被新采样覆盖, 不进入发送队列排队
+        """
+        transmitScheduler = self.radioConnector.transmitScheduler
+        return transmitScheduler is not None and transmitScheduler.depth(TransmitLane.Telemetry) >= self.maxBacklog
+
+    def _waitTime(self, now: float, nextReallocate: float) -> float:
+        waitTime = nextReallocate - now
+        for stream in self.streams.values():
+            if stream.latest is not None and stream.rate > 0:
+                waitTime = min(waitTime, stream.nextTime - now)
+        return max(waitTime, 0.0005)
+
+    def _send(self, stream: TelemetryStream, obj):
+        try:
+            payload = stream.encode(obj)
+        except Exception as e:
+            stream.encodeFailed(e)
+            return
+        size = len(payload)
+        stream.payloadSize = size if stream.payloadSize is None else stream.payloadSize + self.smoothing * (size - stream.payloadSize)
+        stream.sent += 1
+        self.ownBytes += size
+        self.radioConnector.send(payload, TransmitLane.Telemetry)
+
+    def measure(self):
+        """
+        由链路统计计数器测量帧开销以及其它数据占用的线路带宽
+        """
+        linkStatistics = self.radioConnector.linkStatistics
+        current = (time.perf_counter(), linkStatistics.counter("payloadBytesOut").value, linkStatistics.counter("frameBytesOut").value, self.ownBytes)
+        if self.lastMeasure is not None:
+            elapsed = current[0] - self.lastMeasure[0]
+            payloadBytes = current[1] - self.lastMeasure[1]
+            frameBytes = current[2] - self.lastMeasure[2]
+            ownBytes = current[3] - self.lastMeasure[3]
+            if payloadBytes > 0 and elapsed > 0:
+                self.overhead += self.smoothing * (frameBytes / payloadBytes - self.overhead)
+                other = max(0.0, (payloadBytes - ownBytes) * frameBytes / payloadBytes) / elapsed
+                self.otherTraffic += self.smoothing * (other - self.otherTraffic)
+        self.lastMeasure = current
+
+    def reallocate(self):
+        """
+        重新测量并按优先级分配各数据流的发送频率
+        """
+        self.measure()
+        with self.condition:
+            pending = [(stream, stream.latest) for stream in self.streams.values() if stream.payloadSize is None and stream.latest is not None]
+        for stream, obj in pending:
+            try:
+                stream.payloadSize = len(stream.encode(obj))
+            except Exception as e:
+                # 无法编码的采样直接丢弃, payloadSize 保持 None, 否则调度线程会反复为它重新分配
+                stream.encodeFailed(e)
+                with self.condition:
+                    if stream.latest is obj:
+                        stream.latest = None
+        budget = max(0.0, self.linkBudget - self.otherTraffic)
+        rates = self.allocate(budget)
+        with self.condition:
+            self.budget = budget
+            for stream in self.streams.values():
+                stream.rate = rates[stream.name]
+            self.condition.notify_all()
+
+    def allocate(self, budget: float) -> dict:
+        """
+        在预算内分配发送频率: 预算足够时全部使用目标频率, 否则从优先级最低的一组开始降到 minRate,
+        最后一组被降频的数据流按比例取 minRate 与目标频率之间的值; 全部降到 minRate 仍不够时整体按比例降低
+        :param budget: 可用的线路字节数(字节/秒)
+        :return: {名称: 频率}
+        """
+        streams = list(self.streams.values())
+        rates = {stream.name: stream.targetRate for stream in streams}
+        total = sum(stream.cost(stream.targetRate, self.overhead) for stream in streams)
+        if total <= budget:
+            return rates
+        for priority in sorted({stream.priority for stream in streams}, reverse=True):
+            group = [stream for stream in streams if stream.priority == priority]
+            reducible = sum(stream.cost(stream.targetRate - stream.minRate, self.overhead) for stream in group)
+            if total - reducible <= budget:
+                factor = (budget - (total - reducible)) / reducible
+                for stream in group:
+                    rates[stream.name] = stream.minRate + factor * (stream.targetRate - stream.minRate)
+                return rates
+            for stream in group:
+                rates[stream.name] = stream.minRate
+            total -= reducible
+        factor = budget / total if total > 0 else 0.0
+        return {name: rate * factor for name, rate in rates.items()}
+
+    def statistics(self) -> dict:
+        result = {"budget": self.budget, "overhead": self.overhead, "otherTraffic": self.otherTraffic}
+        for stream in self.streams.values():
+            result[stream.name] = stream.statistics()
+        return result
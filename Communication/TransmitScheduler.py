@@ -0,0 +1,194 @@
+import queue
+import threading
+import time
+from collections import deque
+from enum import Enum
+
+from loguru import logger
+
+from Communication.MessageQueue import OverflowPolicy
+
+
+class TransmitLane(Enum):
+    Control = "Control"
+    Telemetry = "Telemetry"
+
+
+class TransmitScheduler:
+    # 按优先级排列的发送通道
+    lanePriority = [TransmitLane.Control, TransmitLane.Telemetry]
+
+    def __init__(self, write, dataPacket, baudRate, maxWriteSize=256, maxLead=0.005, laneBandwidth: dict = None, laneCapacity: dict = None):
+        """
+        发送调度器
+
+        所有数据由一个发送线程编码并写入串口, 控制指令(Control)总是先于遥测数据(Telemetry)发送, 同一次写入中会合并多个小数据包
+
+        发送线程按串口波特率估算数据在线路上发送完毕的时间, 已写入但未发送完的数据超过 maxLead 秒时暂停写入,
+        使串口驱动缓冲区中始终只有少量数据, 新到的控制指令最多等待 maxWriteSize 字节的发送时间
+        :param write: 串口写入函数
+        :param dataPacket: 编码使用的 DataPacket, 之后只能由发送线程使用
+        :param baudRate: 串口波特率
+        :param maxWriteSize: 单次写入合并的最大字节数(单个数据包超过该长度时单独写入)
+        :param maxLead: 允许写入超前线路发送的最长时间(秒)
+        :param laneBandwidth: 各通道可使用的线路带宽比例, 如 {"Telemetry": 0.8}, 未设置的通道不限制
+        :param laneCapacity: 各通道队列容量
+        """
+        self.write = write
+        self.dataPacket = dataPacket
+        # 1 起始位 + 8 数据位 + 1 停止位
+        self.bytesPerSecond = int(baudRate) / 10
+        self.maxWriteSize = maxWriteSize
+        self.maxLead = maxLead
+        self.lanes = {lane: _Lane(lane, self.bytesPerSecond, maxWriteSize, (laneBandwidth or {}).get(lane.value), (laneCapacity or {}).get(lane.value, 1024))
+                      for lane in TransmitScheduler.lanePriority}
+        self.condition = threading.Condition()
+        self.wireFreeTime = 0.0
+        self.isRunning = False
+        self.thread = None
+
+        self.writes = 0
+        self.bytesWritten = 0
+
+    def start(self):
+        self.isRunning = True
+        # 守护线程: 使用方没有调用 stop 时也不会阻止进程退出
+        self.thread = threading.Thread(target=self.threadTransmit, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.isRunning = False
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+
+    def put(self, data: bytes, lane=TransmitLane.Telemetry):
+        """
+        将数据放入发送通道
+
+        遥测通道满时丢弃最早的数据, 控制通道满时抛出 queue.Full
+        """
+        lane = self.lanes[TransmitLane(lane)]
+        with self.condition:
+            if len(lane.messages) >= lane.capacity:
+                lane.dropped += 1
+                if lane.overflowPolicy == OverflowPolicy.Raise:
+                    raise queue.Full
+                lane.messages.popleft()
+            lane.messages.append((data, time.perf_counter()))
+            self.condition.notify_all()
+
+    def depth(self, lane=TransmitLane.Telemetry) -> int:
+        """
+        通道中等待发送的数据包数量
+        """
+        return len(self.lanes[TransmitLane(lane)].messages)
+
+    def threadTransmit(self):
+        while True:
+            with self.condition:
+                batch = []
+                while self.isRunning:
+                    batch = self._takeBatch()
+                    if len(batch) > 0:
+                        break
+                    self.condition.wait(self._waitTime())
+                if not self.isRunning:
+                    break
+            try:
+                self._transmit(batch)
+            except Exception as e:
+                logger.error(f"Transmit failed: {e}")
+
+    def _waitTime(self):
+        """
+        计算下一次可能发送的时间
+        :return: 等待时间(秒), None 表示等待新数据
+        """
+        now = time.perf_counter()
+        waitTime = None
+        for lane in self.lanes.values():
+            if len(lane.messages) > 0:
+                laneWait = max(self.wireFreeTime - self.maxLead - now, lane.waitTime(now), 0.0005)
+                waitTime = laneWait if waitTime is None else min(waitTime, laneWait)
+        return waitTime
+
+    def _takeBatch(self):
+        """
+        按优先级从各通道取出本次写入的数据
+        :return: [(通道, 数据, 入队时间)]
+        """
+        now = time.perf_counter()
+        if self.wireFreeTime - now > self.maxLead:
+            return []
+        batch = []
+        batchSize = 0
+        for lane in self.lanes.values():
+            while len(lane.messages) > 0 and batchSize < self.maxWriteSize and lane.waitTime(now) == 0:
+                data, enqueueTime = lane.messages.popleft()
+                batch.append((lane, data, enqueueTime))
+                batchSize += len(data)
+                lane.consume(len(data))
+        return batch
+
+    def _transmit(self, batch):
+        encoded = self.dataPacket.encodeMany([data for _, data, _ in batch])
+        self.write(encoded)
+        now = time.perf_counter()
+        self.wireFreeTime = max(self.wireFreeTime, now) + len(encoded) / self.bytesPerSecond
+        self.writes += 1
+        self.bytesWritten += len(encoded)
+        for lane, _, enqueueTime in batch:
+            lane.addLatency(now - enqueueTime)
+
+    def statistics(self) -> dict:
+        with self.condition:
+            return {
+                "writes": self.writes,
+                "bytesWritten": self.bytesWritten,
+                "lanes": {lane.value: laneState.statistics() for lane, laneState in self.lanes.items()},
+            }
+
+
+class _Lane:
+    def __init__(self, lane: TransmitLane, bytesPerSecond: float, burst: int, bandwidth, capacity: int):
+        self.lane = lane
+        self.capacity = capacity
+        self.overflowPolicy = OverflowPolicy.Raise if lane == TransmitLane.Control else OverflowPolicy.DropOldest
+        self.messages = deque()
+        # 令牌桶限速, 没有设置带宽比例时不限制
+        self.rate = None if bandwidth is None else bytesPerSecond * bandwidth
+        self.burst = burst
+        self.tokens = burst
+        self.tokenTime = time.perf_counter()
+
+        self.sent = 0
+        self.dropped = 0
+        self.latencyTotal = 0.0
+        self.latencyMax = 0.0
+
+    def waitTime(self, now: float) -> float:
+        if self.rate is None:
+            return 0
+        self.tokens = min(self.burst, self.tokens + (now - self.tokenTime) * self.rate)
+        self.tokenTime = now
+        return 0 if self.tokens > 0 else -self.tokens / self.rate
+
+    def consume(self, size: int):
+        if self.rate is not None:
+            self.tokens -= size
+
+    def addLatency(self, latency: float):
+        self.sent += 1
+        self.latencyTotal += latency
+        self.latencyMax = max(self.latencyMax, latency)
+
+    def statistics(self) -> dict:
+        return {
+            "depth": len(self.messages),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "latencyAverage": self.latencyTotal / self.sent if self.sent > 0 else 0.0,
+            "latencyMax": self.latencyMax,
+        }
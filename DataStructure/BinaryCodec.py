@@ -0,0 +1,94 @@
+import binascii
+import struct
+from enum import Enum
+
+# 默认值类型对应的 struct 格式
+formatTable = {bool: "?", int: "i", float: "f"}
+
+schemasByClass = {}
+schemasByTypeId = {}
+
+
+class BinarySchema:
+    head = struct.Struct("<HH")
+
+    def __init__(self, _class: type):
+        """
+        由 JObject 子类生成的定长二进制布局
+
+        字段顺序与类型取自默认实例的 __dict__, 类属性 binaryFormats 可以覆盖单个字段的 struct 格式(例如需要双精度的经纬度)
+
+        数据格式: 类型编号(2 字节) + 布局版本(2 字节) + 按布局打包的字段
+        :param _class: JObject 子类, 所有字段必须为 bool/int/float 或值为这些类型的 Enum
+        """
+        instance = _class()
+        overrides = getattr(_class, "binaryFormats", {})
+        self._class = _class
+        self.fieldNames = []
+        self.enumFields = {}
+        formats = []
+        for name, value in instance.__dict__.items():
+            if isinstance(value, Enum):
+                self.enumFields[name] = type(value)
+                value = value.value
+            fieldFormat = overrides.get(name, formatTable.get(type(value)))
+            if fieldFormat is None:
+                raise TypeError(f"Field {_class.__name__}.{name} of type {type(value).__name__} has no binary format")
+            self.fieldNames.append(name)
+            formats.append(fieldFormat)
+        self.struct = struct.Struct("<" + "".join(formats))
+        self.typeId = binascii.crc_hqx(_class.__name__.encode("utf-8"), 0)
+        layout = ",".join(f"{name}:{fieldFormat}" for name, fieldFormat in zip(self.fieldNames, formats))
+        self.version = binascii.crc_hqx(f"{_class.__name__}({layout})".encode("utf-8"), 0)
+        self.size = BinarySchema.head.size + self.struct.size
+
+    def pack(self, obj) -> bytes:
+        values = [getattr(obj, name) for name in self.fieldNames]
+        if self.enumFields:
+            values = [value.value if isinstance(value, Enum) else value for value in values]
+        return BinarySchema.head.pack(self.typeId, self.version) + self.struct.pack(*values)
+
+    def unpack(self, data):
+        typeId, version = BinarySchema.head.unpack_from(data)
+        if typeId != self.typeId or version != self.version:
+            raise ValueError(f"Schema mismatch for {self._class.__name__}: type {typeId:04x} version {version:04x}")
+        if len(data) != self.size:
+            raise ValueError(f"Invalid size for {self._class.__name__}: {len(data)}, expected {self.size}")
+        obj = self._class()
+        for name, value in zip(self.fieldNames, self.struct.unpack_from(data, BinarySchema.head.size)):
+            if name in self.enumFields:
+                value = self.enumFields[name](value)
+            setattr(obj, name, value)
+        return obj
+
+
+def registerSchema(_class: type) -> BinarySchema:
+    schema = schemasByClass.get(_class)
+    if schema is None:
+        schema = BinarySchema(_class)
+        if schema.typeId in schemasByTypeId:
+            raise ValueError(f"Type id collision between {_class.__name__} and {schemasByTypeId[schema.typeId]._class.__name__}")
+        schemasByClass[_class] = schema
+        schemasByTypeId[schema.typeId] = schema
+    return schema
+
+
+def encodeTyped(obj) -> bytes:
+    return registerSchema(type(obj)).pack(obj)
+
+
+def decodeTyped(data):
+    """
+    解码二进制数据
+
+    类型编号未注册或布局版本不一致(两端的类定义不同)时抛出 ValueError
+    :param data: encodeTyped 的输出
+    :return: 对象
+    """
+    if len(data) < BinarySchema.head.size:
+        raise ValueError(f"Invalid typed message size: {len(data)}")
+    typeId, version = BinarySchema.head.unpack_from(data)
+    schema = schemasByTypeId.get(typeId)
+    if schema is None:
+        raise ValueError(f"Unknown type id: {typeId:04x}")
+    return schema.unpack(data)
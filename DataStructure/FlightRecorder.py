@@ -0,0 +1,278 @@
+import json
+import mmap
+import os
+import struct
+import time
+
+import numpy as np
+
+# 索引文件头: 魔数, 已写入的记录数, 容量
+indexHead = struct.Struct("<8sQQ")
+indexHeadSize = 64
+indexMagic = b"FLTREC01"
+timeFormat = struct.Struct("<d")
+
+
+def _mapFile(path: str, size: int, writable: bool):
+    """
+    映射文件, 写入时按 size 预分配(稀疏文件, 不实际占用磁盘空间直到写入)
+    """
+    with open(path, "r+b" if writable else "rb") as f:
+        if writable:
+            f.truncate(size)
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+
+
+def _createFile(path: str):
+    open(path, "wb").close()
+
+
+class RecordChannel:
+    def __init__(self, directory: str, name: str, dtype: np.dtype, capacity: int, clock=None):
+        """
+        定长记录通道
+
+        每条记录为 8 字节时间 + 原始数据(布局由 dtype 描述), 时间同时写入索引文件, 读取时在连续的时间数组上二分查找;
+        只允许一个线程写入, 写入不加锁: 先写记录和时间, 最后更新索引头中的记录数, 读取方只读取记录数以内的数据
+        :param directory: 记录目录
+        :param name: 通道名称
+        :param dtype: 记录的 numpy 结构化类型, 第一个字段必须为 ('time', '<f8')
+        :param capacity: 最多记录数, 写满后的记录被丢弃并计数
+        :param clock: 记录时间的时钟(FlightRecorder.now), 写入方用 channel.clock() 取得时间戳
+        """
+        self.name = name
+        self.clock = time.time if clock is None else clock
+        self.dtype = np.dtype(dtype)
+        self.capacity = capacity
+        self.recordSize = self.dtype.itemsize
+        self.count = 0
+        self.dropped = 0
+        # 时间索引必须单调不减(读取时二分查找), 回退的时间戳按上一条记录的时间写入并计数
+        self.lastTime = float("-inf")
+        self.clamped = 0
+        self.recordPath = os.path.join(directory, f"{name}.bin")
+        self.indexPath = os.path.join(directory, f"{name}.idx")
+        _createFile(self.recordPath)
+        _createFile(self.indexPath)
+        self.records = _mapFile(self.recordPath, max(1, capacity * self.recordSize), True)
+        self.index = _mapFile(self.indexPath, indexHeadSize + capacity * 8, True)
+        indexHead.pack_into(self.index, 0, indexMagic, 0, capacity)
+
+    def append(self, timestamp: float, data):
+        """
+        追加一条记录
+        :param timestamp: 时间戳(秒), 小于上一条记录的时间时按上一条记录的时间写入
+        :param data: 原始数据, 长度为记录长度减 8
+        """
+        count = self.count
+        if count >= self.capacity:
+            self.dropped += 1
+            return
+        if timestamp < self.lastTime:
+            timestamp = self.lastTime
+            self.clamped += 1
+        self.lastTime = timestamp
+        offset = count * self.recordSize
+        timeFormat.pack_into(self.records, offset, timestamp)
+        self.records[offset + 8:offset + self.recordSize] = data
+        timeFormat.pack_into(self.index, indexHeadSize + count * 8, timestamp)
+        self.count = count + 1
+        struct.pack_into("<Q", self.index, 8, self.count)
+
+    def meta(self) -> dict:
+        return {"kind": "record", "dtype": self.dtype.descr, "capacity": self.capacity, "count": self.count, "dropped": self.dropped, "clamped": self.clamped}
+
+    def close(self):
+        self.records.flush()
+        self.index.flush()
+        self.records.close()
+        self.index.close()
+
+
+class BlobChannel:
+    def __init__(self, directory: str, name: str, capacity: int, dataCapacity: int, clock=None):
+        """
+        变长数据通道(如无线数据帧)
+
+        数据依次写入数据文件, 索引文件中每条记录对应一个时间, 结束位置文件中记录每条数据的结束偏移
+        :param capacity: 最多记录数
+        :param dataCapacity: 数据文件大小(字节)
+        :param clock: 记录时间的时钟(FlightRecorder.now)
+        """
+        self.name = name
+        self.clock = time.time if clock is None else clock
+        self.capacity = capacity
+        self.dataCapacity = dataCapacity
+        self.count = 0
+        self.dropped = 0
+        self.lastTime = float("-inf")
+        self.clamped = 0
+        self.position = 0
+        self.dataPath = os.path.join(directory, f"{name}.bin")
+        self.indexPath = os.path.join(directory, f"{name}.idx")
+        self.endPath = os.path.join(directory, f"{name}.end")
+        for path in [self.dataPath, self.indexPath, self.endPath]:
+            _createFile(path)
+        self.data = _mapFile(self.dataPath, max(1, dataCapacity), True)
+        self.index = _mapFile(self.indexPath, indexHeadSize + capacity * 8, True)
+        self.ends = _mapFile(self.endPath, max(1, capacity * 8), True)
+        indexHead.pack_into(self.index, 0, indexMagic, 0, capacity)
+
+    def append(self, timestamp: float, data):
+        count = self.count
+        end = self.position + len(data)
+        if count >= self.capacity or end > self.dataCapacity:
+            self.dropped += 1
+            return
+        if timestamp < self.lastTime:
+            timestamp = self.lastTime
+            self.clamped += 1
+        self.lastTime = timestamp
+        self.data[self.position:end] = data
+        struct.pack_into("<Q", self.ends, count * 8, end)
+        timeFormat.pack_into(self.index, indexHeadSize + count * 8, timestamp)
+        self.position = end
+        self.count = count + 1
+        struct.pack_into("<Q", self.index, 8, self.count)
+
+    def meta(self) -> dict:
+        return {"kind": "blob", "capacity": self.capacity, "dataCapacity": self.dataCapacity, "count": self.count, "dropped": self.dropped, "clamped": self.clamped}
+
+    def close(self):
+        for mapped in [self.data, self.index, self.ends]:
+            mapped.flush()
+            mapped.close()
+
+
+class FlightRecorder:
+    def __init__(self, directory: str):
+        """
+        飞行记录器
+
+        每个通道预先分配内存映射文件, 追加记录时只做内存拷贝, 不加锁也不进行系统调用; 每个通道只能由一个线程写入。
+        记录时间使用 now(): 单调时钟加上创建时的墙上时间偏移(写入 meta.json 的 clock), 飞行中系统时间被 NTP 或手动调整不影响时间索引
+        :param directory: 记录目录, 不存在时创建
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.channels = {}
+        self.wallOffset = time.time() - time.monotonic()
+
+    def now(self) -> float:
+        """
+        :return: 记录时间(秒), 单调不减, 与创建记录器时的墙上时间对齐
+        """
+        return time.monotonic() + self.wallOffset
+
+    def recordChannel(self, name: str, dtype, capacity: int) -> RecordChannel:
+        """
+        创建或取得定长记录通道, 记录布局为 ('time', '<f8') 加上 dtype 的各字段
+        :param dtype: 原始数据的 numpy 结构化类型
+        """
+        channel = self.channels.get(name)
+        if channel is None:
+            channel = self.channels[name] = RecordChannel(self.directory, name, [('time', '<f8')] + np.dtype(dtype).descr, capacity, self.now)
+            self.writeMeta()
+        return channel
+
+    def blobChannel(self, name: str, capacity: int, dataCapacity: int) -> BlobChannel:
+        channel = self.channels.get(name)
+        if channel is None:
+            channel = self.channels[name] = BlobChannel(self.directory, name, capacity, dataCapacity, self.now)
+            self.writeMeta()
+        return channel
+
+    def writeMeta(self):
+        with open(os.path.join(self.directory, "meta.json"), "w", encoding="utf-8") as f:
+            meta = {name: channel.meta() for name, channel in self.channels.items()}
+            meta["clock"] = {"kind": "monotonic", "wallOffset": self.wallOffset}
+            json.dump(meta, f)
+
+    def statistics(self) -> dict:
+        return {name: {"count": channel.count, "dropped": channel.dropped, "clamped": channel.clamped} for name, channel in self.channels.items()}
+
+    def close(self):
+        self.writeMeta()
+        for channel in self.channels.values():
+            channel.close()
+        self.channels = {}
+
+
+class FlightLog:
+    def __init__(self, directory: str):
+        """
+        读取飞行记录, 可以在记录过程中读取(只能看到读取时已完成的记录)
+        """
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        # 记录时钟(FlightRecorder.now) 的信息, 其余为各通道
+        self.clock = self.meta.pop("clock", None)
+        self.maps = {}
+
+    def _map(self, path: str) -> mmap.mmap:
+        mapped = self.maps.get(path)
+        if mapped is None:
+            mapped = self.maps[path] = _mapFile(path, 0, False)
+        return mapped
+
+    def times(self, name: str) -> np.ndarray:
+        """
+        通道的时间索引(只读视图)
+        """
+        index = self._map(os.path.join(self.directory, f"{name}.idx"))
+        magic, count, _ = indexHead.unpack_from(index)
+        if magic != indexMagic:
+            raise ValueError(f"Invalid flight recorder index: {name}")
+        return np.frombuffer(index, dtype='<f8', count=count, offset=indexHeadSize)
+
+    def _range(self, times: np.ndarray, start, end):
+        first = 0 if start is None else int(np.searchsorted(times, start, 'left'))
+        last = len(times) if end is None else int(np.searchsorted(times, end, 'right'))
+        return first, max(first, last)
+
+    def read(self, name: str, start=None, end=None) -> np.ndarray:
+        """
+        读取定长记录通道中 [start, end] 时间范围内的记录
+        :return: numpy 结构化数组, 直接映射记录文件, 不复制数据
+        """
+        channel = self.meta[name]
+        if channel["kind"] != "record":
+            raise ValueError(f"Channel {name} is not a record channel")
+        dtype = np.dtype([tuple(field) for field in channel["dtype"]])
+        times = self.times(name)
+        first, last = self._range(times, start, end)
+        records = self._map(os.path.join(self.directory, f"{name}.bin"))
+        return np.frombuffer(records, dtype=dtype, count=last - first, offset=first * dtype.itemsize)
+
+    def readBlobs(self, name: str, start=None, end=None):
+        """
+        读取变长数据通道中 [start, end] 时间范围内的数据
+        :return: (时间数组, 结束偏移数组, 首条数据的起点, 数据), 均为不复制的视图, 第 i 条数据为 data[ends[i - 1]:ends[i]], 首条为 data[begin:ends[0]]
+        """
+        if self.meta[name]["kind"] != "blob":
+            raise ValueError(f"Channel {name} is not a blob channel")
+        times = self.times(name)
+        first, last = self._range(times, start, end)
+        ends = np.frombuffer(self._map(os.path.join(self.directory, f"{name}.end")), dtype='<u8', count=len(times))
+        data = memoryview(self._map(os.path.join(self.directory, f"{name}.bin")))
+        begin = int(ends[first - 1]) if first > 0 else 0
+        return times[first:last], ends[first:last], begin, data
+
+    def blobs(self, name: str, start=None, end=None):
+        """
+        逐条返回 (时间, memoryview)
+        """
+        times, ends, begin, data = self.readBlobs(name, start, end)
+        for timestamp, stop in zip(times.tolist(), ends.tolist()):
+            yield timestamp, data[begin:stop]
+            begin = stop
+
+    def close(self):
+        for mapped in self.maps.values():
+            try:
+                mapped.close()
+            except BufferError:
+                # 仍有 read 返回的数组引用映射, 由垃圾回收关闭
+                pass
+        self.maps = {}
@@ -1,40 +1,60 @@
-from DataStructure.JsonModel import JObject
+import json
+
+from DataStructure.BinaryCodec import registerSchema
+from DataStructure.JsonModel import JObject, to_dict
 
 
 class InertiaInfo(JObject):
     def __init__(self, **kwargs):
-        self.xAxisAcceleration: float = 0
-        self.yAxisAcceleration: float = 0
-        self.zAxisAcceleration: float = 0
+        self.xAxisAcceleration: float = 0.0
+        self.yAxisAcceleration: float = 0.0
+        self.zAxisAcceleration: float = 0.0
 
         super().__init__(**kwargs)
 
 
 class PowerInfo(JObject):
     def __init__(self, **kwargs):
-        self.batteryVoltage: float = 0
-        self.batteryCurrent: float = 0
-        self.sensorPower: float = 0
+        self.batteryVoltage: float = 0.0
+        self.batteryCurrent: float = 0.0
+        self.sensorPower: float = 0.0
 
         super().__init__(**kwargs)
 
 
 class EngineInfo(JObject):
     def __init__(self, **kwargs):
-        self.engine1Thrust: float = 0
-        self.engine2Thrust: float = 0
-        self.engine3Thrust: float = 0
-        self.engine4Thrust: float = 0
+        self.engine1Thrust: float = 0.0
+        self.engine2Thrust: float = 0.0
+        self.engine3Thrust: float = 0.0
+        self.engine4Thrust: float = 0.0
 
         super().__init__(**kwargs)
 
 
 class GPSInfo(JObject):
+    # 经纬度使用单精度时误差约为 1 米
+    binaryFormats = {"latitude": "d", "longitude": "d"}
+
     def __init__(self, **kwargs):
-        self.latitude: float = 0
-        self.longitude: float = 0
-        self.altitude: float = 0
-        self.speed: float = 0
-        self.course: float = 0
+        self.latitude: float = 0.0
+        self.longitude: float = 0.0
+        self.altitude: float = 0.0
+        self.speed: float = 0.0
+        self.course: float = 0.0
 
         super().__init__(**kwargs)
+
+
+for _class in [InertiaInfo, PowerInfo, EngineInfo, GPSInfo]:
+    registerSchema(_class)
+
+
+def presetDictionary() -> bytes:
+    """
+    生成压缩预置字典
+
+    字典内容为各遥测信息类默认值的 JSON 文本, 与 DataInterface.sendNormal 的发送格式一致, 两端需使用同一份字典
+    :return: zlib 预置字典
+    """
+    return "".join("JSON-" + json.dumps(to_dict(_class())) for _class in [InertiaInfo, PowerInfo, EngineInfo, GPSInfo]).encode("utf-8")
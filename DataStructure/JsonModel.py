@@ -4,7 +4,7 @@ from enum import Enum
 type_list = [int, float, dict, list, type(None), str, tuple, bool]
 
 
-def to_dict(obj: object) -> dict:
+def _to_dict(obj: object) -> dict:
     global type_list
     results = {}
     for variable_name in obj.__dict__.keys():
@@ -20,7 +20,7 @@ def to_dict(obj: object) -> dict:
     return results
 
 
-def to_object(json_dict: dict, _class: type) -> object:
+def _to_object(json_dict: dict, _class: type) -> object:
     global type_list
     results = _class()
     for variable_name in results.__dict__.keys():
@@ -44,7 +44,7 @@ def to_object(json_dict: dict, _class: type) -> object:
     return results
 
 
-def update_object(json_dict: dict, obj: object) -> list:
+def _update_object(json_dict: dict, obj: object) -> list:
     """
     更新对象
     更新对象中json_dict中有的值
@@ -74,6 +74,215 @@ def update_object(json_dict: dict, obj: object) -> list:
     return list_changed
 
 
+class FieldKind(Enum):
+    Value = "value"
+    Callable = "callable"
+    EnumMember = "enumMember"
+    Object = "object"
+
+
+class JsonSerializer:
+    """
+    按类编译的序列化器
+    以默认实例(_class())为样本一次性分析各字段的类型分支, 生成直线式的 to_dict / update_object 函数以及 to_object 的字段计划,
+    运行时只做类型守卫; 守卫不满足(字段增删、类型被替换)时退回通用实现, 保证输出与通用实现一致
+    """
+
+    def __init__(self, _class: type):
+        self._class = _class
+        sample = _class()
+        self.fields = []
+        self.objectPlan = []
+        for variable_name, value in sample.__dict__.items():
+            self.fields.append((variable_name, type(value), self.fieldKind(value)))
+            converter = self.objectConverter(value)
+            if converter is not False:
+                self.objectPlan.append((variable_name, converter))
+        self.names = frozenset(name for name, _, _ in self.fields)
+        self.update = self.compileUpdate(sample)
+        self.toDict = self.compileToDict()
+
+    @staticmethod
+    def fieldKind(value) -> FieldKind:
+        """
+        按 _to_dict 的分支顺序判定字段类别
+        :param value: 默认实例中的字段值
+        :return: FieldKind
+        """
+        if hasattr(value, '__call__'):
+            return FieldKind.Callable
+        if type(value) in type_list:
+            return FieldKind.Value
+        if type(type(value)) == type(Enum):
+            return FieldKind.EnumMember
+        return FieldKind.Object
+
+    @staticmethod
+    def objectConverter(value):
+        """
+        按 _to_object 的分支顺序确定字段的转换函数
+        :param value: 默认实例中的字段值
+        :return: False 表示跳过该字段, None 表示原样赋值, 否则为转换函数
+        """
+        if type(value).__name__ == "function":
+            return False
+        if type(value) in type_list or value in type_list:
+            return None
+        if type(Enum) == type(value):
+            return value
+        if type(type(value)) == type(Enum):
+            return type(value)
+        _class = value if type(value) is type else type(value)
+        return lambda json_dict: to_object(json_dict, _class)
+
+    def compileToDict(self):
+        """
+        生成直线式的 to_dict 函数: 一次取出全部字段, 一条守卫表达式, 一个字典字面量
+        :return: function(obj) -> dict
+        """
+        namespace = {"valueTypes": frozenset(type_list), "fallback": _to_dict, "len": len, "type": type}
+        lines = ["def toDict(obj):",
+                 "    d = obj.__dict__",
+                 f"    if len(d) != {len(self.fields)}:",
+                 "        return fallback(obj)",
+                 "    try:"]
+        guards = []
+        items = []
+        for i, (name, _type, kind) in enumerate(self.fields):
+            lines.append(f"        v{i} = d[{name!r}]")
+            if kind == FieldKind.Callable:
+                guards.append(f"hasattr(v{i}, '__call__')")
+            elif kind == FieldKind.Value:
+                guards.append(f"type(v{i}) in valueTypes")
+                items.append(f"{name!r}: v{i}")
+            elif kind == FieldKind.EnumMember:
+                namespace[f"T{i}"] = _type
+                guards.append(f"type(v{i}) is T{i}")
+                items.append(f"{name!r}: v{i}.value")
+            else:
+                namespace[f"T{i}"] = _type
+                namespace[f"S{i}"] = getSerializer(_type).toDict if isJObject(_type) else to_dict
+                guards.append(f"type(v{i}) is T{i}")
+                items.append(f"{name!r}: S{i}(v{i})")
+        lines += ["    except KeyError:",
+                  "        return fallback(obj)",
+                  f"    if {' and '.join(guards) or 'True'}:",
+                  f"        return {{{', '.join(items)}}}",
+                  "    return fallback(obj)"]
+        exec("\n".join(lines), namespace)
+        return namespace["toDict"]
+
+    def toObject(self, json_dict: dict, obj: object = None) -> object:
+        """
+        按字段计划把 json_dict 写入对象
+        :param json_dict: 已解析的字典
+        :param obj: 目标对象, 为 None 时新建默认实例
+        :return: 对象
+        """
+        if obj is None:
+            obj = self._class()
+        for variable_name, converter in self.objectPlan:
+            if variable_name not in json_dict:
+                continue
+            value = json_dict[variable_name]
+            setattr(obj, variable_name, value if converter is None else converter(value))
+        return obj
+
+    def compileUpdate(self, sample: object):
+        """
+        按 _update_object 的分支顺序为每个字段预先确定动作, 生成直线式的 update_object 函数
+        守卫全部通过后才开始写入, 任一字段运行时类型与默认实例不同则整体退回通用实现
+        :param sample: 默认实例
+        :return: function(json_dict, obj) -> list
+        """
+        namespace = {"names": self.names, "fallback": _update_object, "update_object": update_object,
+                     "len": len, "type": type, "setattr": setattr}
+        guards = []
+        actions = []
+        for i, (variable_name, value) in enumerate(sample.__dict__.items()):
+            name_path = f"{self._class.__name__}.{variable_name}"
+            namespace[f"T{i}"] = type(value)
+            namespace[f"V{i}"] = value
+            if type(value) is type:
+                guards.append(f"({variable_name!r} not in json_dict or d[{variable_name!r}] is V{i})")
+            else:
+                guards.append(f"({variable_name!r} not in json_dict or type(d[{variable_name!r}]) is T{i})")
+            actions.append(f"    if {variable_name!r} in json_dict:")
+            _type = value if type(value) is type else type(value)
+            if _type in type_list or value in type_list:
+                actions.append(f"        setattr(obj, {variable_name!r}, json_dict[{variable_name!r}])")
+            elif _type == type(Enum) or type(_type) == type(Enum):
+                namespace[f"C{i}"] = _type
+                actions.append(f"        setattr(obj, {variable_name!r}, C{i}(json_dict[{variable_name!r}]))")
+            else:
+                actions.append(f"        list_changed.append({name_path!r})")
+                actions.append(f"        list_changed += [{name_path + '.'!r} + result"
+                               f" for result in update_object(json_dict[{variable_name!r}], d[{variable_name!r}])]")
+                continue
+            actions.append(f"        list_changed.append({name_path!r})")
+        lines = ["def update(json_dict, obj):",
+                 "    d = obj.__dict__",
+                 f"    if len(d) != {len(guards)} or not names.issuperset(d):",
+                 "        return fallback(json_dict, obj)",
+                 f"    if not ({' and '.join(guards) or 'True'}):",
+                 "        return fallback(json_dict, obj)",
+                 "    list_changed = []"] + actions + ["    return list_changed"]
+        exec("\n".join(lines), namespace)
+        return namespace["update"]
+
+
+serializerAttribute = "_jsonSerializer"
+
+
+def isJObject(_class: type) -> bool:
+    return isinstance(_class, type) and issubclass(_class, JObject)
+
+
+def getSerializer(_class: type) -> JsonSerializer:
+    """
+    取得类的编译序列化器, 首次调用时编译并缓存到类属性上(子类不会继承父类的缓存)
+    :param _class: JObject 子类
+    :return: JsonSerializer
+    """
+    serializer = _class.__dict__.get(serializerAttribute)
+    if serializer is None:
+        serializer = JsonSerializer(_class)
+        setattr(_class, serializerAttribute, serializer)
+    return serializer
+
+
+def to_dict(obj: object) -> dict:
+    # 已编译的类直接命中类属性, 省去子类判断
+    serializer = type(obj).__dict__.get(serializerAttribute)
+    if serializer is not None:
+        return serializer.toDict(obj)
+    if isJObject(type(obj)):
+        return getSerializer(type(obj)).toDict(obj)
+    return _to_dict(obj)
+
+
+def to_object(json_dict: dict, _class: type) -> object:
+    if isJObject(_class):
+        return getSerializer(_class).toObject(json_dict)
+    return _to_object(json_dict, _class)
+
+
+def update_object(json_dict: dict, obj: object) -> list:
+    """
+    更新对象
+    更新对象中json_dict中有的值
+    :param json_dict:
+    :param obj:
+    :return:
+    """
+    serializer = type(obj).__dict__.get(serializerAttribute)
+    if serializer is not None:
+        return serializer.update(json_dict, obj)
+    if isJObject(type(obj)):
+        return getSerializer(type(obj)).update(json_dict, obj)
+    return _update_object(json_dict, obj)
+
+
 class JObject:
     def __init__(self, **kwargs):
         json_object: dict = None
@@ -83,13 +292,17 @@ class JObject:
                 json_object, _type = (json.loads(value), type(self))
 
         if json_object is not None and _type is not None:
-            obj = to_object(json_object, _type)
-            for variable_name in obj.__dict__.keys():
-                setattr(self,
-                        variable_name,
-                        getattr(obj, variable_name))
+            # 直接把字段写入自身, 不再构造一个临时对象再逐个拷贝
+            getSerializer(_type).toObject(json_object, self)
 
-    def json(self):
+    def json(self, compact: bool = False):
+        """
+        序列化为json字符串
+        :param compact: 紧凑模式, 无缩进无空格且不排序, 用于无线链路传输
+        :return: json字符串
+        """
+        if compact:
+            return json.dumps(to_dict(self), separators=(',', ':'))
         return json.dumps(to_dict(self), sort_keys=True, indent=4, separators=(', ', ': '))
 
     def __str__(self):
@@ -0,0 +1,104 @@
+import bisect
+import math
+
+import numpy as np
+
+
+class SampleRing:
+    def __init__(self, dtype, capacity: int, timeField="timeStamp", timeScale=1e-6):
+        """
+        定长采样环形缓冲区
+
+        存储为 2 * capacity 条记录的 numpy 结构化数组, 每条记录同时写入 i 与 i + capacity 两个位置,
+        因此最近的任意 n(n <= capacity) 条记录总是存储中连续的一段, view / window 返回的都是不复制的连续数组;
+        内存占用在创建时确定, 写满后覆盖最旧的记录。只允许一个线程写入, 先写数据再更新记录数
+        :param dtype: 记录的 numpy 结构化类型
+        :param capacity: 最多保留的记录数
+        :param timeField: 时间字段名, 必须单调不减
+        :param timeScale: 时间字段的单位(秒), IMU 的 timeStamp 为微秒
+        """
+        self.dtype = np.dtype(dtype)
+        self.capacity = capacity
+        self.timeField = timeField
+        self.timeScale = timeScale
+        self.storage = np.zeros(capacity * 2, dtype=self.dtype)
+        # 写入时直接按字节拷贝, 避免结构化数组逐字段赋值的开销
+        self.raw = memoryview(self.storage.view(np.uint8))
+        self.itemSize = self.dtype.itemsize
+        self.head = 0
+        # 写入的总记录数
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def extend(self, records: np.ndarray):
+        """
+        批量写入记录
+        :param records: dtype 相同的结构化数组
+        """
+        self.extendBytes(np.ascontiguousarray(records, dtype=self.dtype).view(np.uint8))
+
+    def extendBytes(self, data):
+        """
+        从原始字节批量写入记录(如多个数据帧消息体拼接的 bytes), 超过容量时只保留最后 capacity 条
+        :param data: 连续的记录数据, 长度为记录长度的整数倍
+        """
+        itemSize = self.itemSize
+        capacity = self.capacity
+        size = len(data) // itemSize
+        if size == 0:
+            return
+        if size > capacity:
+            self.head = (self.head + size - capacity) % capacity
+            self.count += size - capacity
+            data = data[(size - capacity) * itemSize:]
+            size = capacity
+        head = self.head
+        raw = self.raw
+        first = min(size, capacity - head)
+        firstBytes = first * itemSize
+        raw[head * itemSize:(head + first) * itemSize] = data[:firstBytes]
+        raw[(head + capacity) * itemSize:(head + capacity + first) * itemSize] = data[:firstBytes]
+        if first < size:
+            restBytes = (size - first) * itemSize
+            raw[:restBytes] = data[firstBytes:firstBytes + restBytes]
+            raw[capacity * itemSize:capacity * itemSize + restBytes] = data[firstBytes:firstBytes + restBytes]
+        self.head = (head + size) % capacity
+        self.count += size
+
+    def view(self, count: int = None) -> np.ndarray:
+        """
+        最近 count 条记录(默认全部)的只读视图, 不复制数据
+
+        视图在写入方再写入 capacity - count 条记录之后会被覆盖, 需要长期保存时应 copy
+        """
+        size = len(self)
+        count = size if count is None else min(count, size)
+        end = self.head + self.capacity
+        result = self.storage[end - count:end]
+        result.flags.writeable = False
+        return result
+
+    def latest(self):
+        """
+        :return: 最新的一条记录, 按 dtype 字段顺序的 tuple(如 IMUData(*latest())), 没有记录时返回 None
+        """
+        if self.count == 0:
+            return None
+        return self.storage[self.head + self.capacity - 1].item()
+
+    def window(self, seconds: float) -> np.ndarray:
+        """
+        以最新一条记录的时间为终点, 最近 seconds 秒内的记录(只读视图, 不复制数据)
+        """
+        records = self.view()
+        if len(records) == 0:
+            return records
+        times = records[self.timeField]
+        start = times[-1].item() - seconds / self.timeScale
+        if times.dtype.kind in "iu":
+            # 整数时间字段与 float 比较很慢, 向上取整不改变查找结果
+            start = math.ceil(start)
+        # 时间字段是跨步视图, np.searchsorted 会先复制整个字段, 逐个元素二分查找只需访问 log2(n) 个元素
+        return records[bisect.bisect_left(times, start):]
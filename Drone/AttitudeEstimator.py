@@ -0,0 +1,346 @@
+import bisect
+import math
+import threading
+
+import numpy as np
+
+from DataStructure.SampleRing import SampleRing
+from Drone.IMU import AttitudeData
+from Drone.SensorFilter import concatenateRecords, firstOrder
+
+# 估计结果的历史记录, 用于与 AHRS 数据比较
+estimateDtype = np.dtype([('roll', '<f4'), ('pitch', '<f4'), ('heading', '<f4'), ('timeStamp', '<u8')])
+
+
+def wrapAngle(angle):
+    """
+    把角度限制在 [-pi, pi)
+    """
+    return (angle + np.pi) % (2 * np.pi) - np.pi
+
+
+def eulerToQuaternion(roll: float, pitch: float, heading: float) -> tuple:
+    """
+    ZYX 欧拉角转四元数
+    :return: (Q1, Q2, Q3, Q4), Q1 为实部
+    """
+    cr, sr = math.cos(roll * 0.5), math.sin(roll * 0.5)
+    cp, sp = math.cos(pitch * 0.5), math.sin(pitch * 0.5)
+    cy, sy = math.cos(heading * 0.5), math.sin(heading * 0.5)
+    return cr * cp * cy + sr * sp * sy, sr * cp * cy - cr * sp * sy, cr * sp * cy + sr * cp * sy, cr * cp * sy - sr * sp * cy
+
+
+def _scalarHeading(magX, magY, magZ, roll, pitch):
+    """
+    单个采样的倾斜补偿磁航向, 见 AttitudeEstimator._magneticHeading
+    """
+    sinRoll, cosRoll = math.sin(roll), math.cos(roll)
+    horizontalX = magX * math.cos(pitch) + (magY * sinRoll + magZ * cosRoll) * math.sin(pitch)
+    horizontalY = magY * cosRoll - magZ * sinRoll
+    return math.atan2(-horizontalY, horizontalX)
+
+
+class AttitudeEstimator:
+    def __init__(self, timeConstant=0.5, headingTimeConstant=2.0, publishRate=50.0, onAttitude=None, historyCapacity=65536, maxStep=0.05, blockSize=256,
+                 vectorThreshold=64, compareInterval=1.0):
+        """
+        互补滤波姿态估计, update / compare / reset / statistics 可以在不同线程中调用
+
+        坐标系为 NED(机体 x 前 y 右 z 下), 角速度单位 rad/s, timeStamp 单位微秒。
+        陀螺仪积分的欧拉角速率与加速度计(横滚、俯仰)、倾斜补偿后的磁力计(航向)测量按时间常数融合:
+        y[k] = a * (y[k - 1] + rate * dt) + (1 - a) * measure, a = tau / (tau + dt)。
+        这是一阶线性递推, 每批数据用累乘/累加一次算完; 欧拉角速率依赖姿态本身, 先用上一批的姿态计算一遍, 再用第一遍的结果重新计算。
+
+        IMU 数据先缓存, 每到一个发布时刻才计算一次。向量化计算每次有约 150us 的 numpy 调用固定开销, 只有一次计算的采样足够多时才比逐采样计算快:
+        实时数据(720Hz, 50Hz 发布)每次只有十几个采样, 少于 vectorThreshold 个采样时逐采样递推; 回放、离线处理等大批数据使用向量化计算
+        :param timeConstant: 横滚、俯仰的融合时间常数(秒), 越大越相信陀螺仪
+        :param headingTimeConstant: 航向的融合时间常数(秒)
+        :param publishRate: 发布 AttitudeData 的频率(Hz), None 表示每次 update 都计算并发布最后一个采样
+        :param onAttitude: 发布回调, 参数为 AttitudeData
+        :param historyCapacity: 保留的逐采样估计结果数
+        :param maxStep: 两个采样之间的最大积分步长(秒), 数据中断后不会把整段间隔积分进去
+        :param blockSize: 递推分块大小
+        :param vectorThreshold: 一次计算的采样数不少于该值时使用向量化计算
+        :param compareInterval: compare 与 AHRS 数据比较的最小间隔(秒), AHRS 数据积累一段时间再一起比较
+        """
+        self.timeConstant = timeConstant
+        self.headingTimeConstant = headingTimeConstant
+        self.publishRate = publishRate
+        self.onAttitude = onAttitude
+        self.maxStep = maxStep
+        self.blockSize = blockSize
+        self.vectorThreshold = vectorThreshold
+        self.compareInterval = compareInterval
+        # Threaded 模式下 update 在 IMU 线程调用, compare 在 AHRS 线程调用, 两者都读写历史记录与状态;
+        # update 时间戳回退时会调用 reset, onAttitude 回调中也可能调用 statistics, 因此使用可重入锁
+        self.lock = threading.RLock()
+        self.history = SampleRing(estimateDtype, historyCapacity)
+        self.pending = []
+        self.pendingAHRS = []
+        # 状态: 横滚, 俯仰, 航向(弧度), 上一个采样的时间戳, 上一个发布时段
+        self.state = None
+        self.lastTime = None
+        self.lastSlot = None
+        # 最近一个输入的时间戳, 用于发现时间戳回退(设备复位); compare 上次比较时的 lastTime
+        self.inputTime = None
+        self.comparedTime = None
+        self.attitude = None
+        self.resets = 0
+        self.samples = 0
+        self.published = 0
+        self.divergenceCount = 0
+        self.divergenceSquares = np.zeros(3)
+        self.divergenceMax = np.zeros(3)
+
+    def update(self, records: np.ndarray):
+        """
+        输入一批 IMU 数据
+        :param records: imuDtype 结构化数组(如 IMU.imuData.view() 的一段, 或 np.frombuffer 解析的消息体)
+        :return: 本次计算时发布的 AttitudeData 列表, 仍在缓存时返回空列表
+        """
+        with self.lock:
+            if len(records) == 0:
+                return []
+            times = records['timeStamp']
+            result = []
+            if self.inputTime is not None and times[0].item() < self.inputTime:
+                result = self.reset()
+            self.inputTime = times[-1].item()
+            self.pending.append(records)
+            if self.publishRate is not None and self.lastSlot is not None and self.inputTime * self.publishRate // 1000000 <= self.lastSlot:
+                return result
+            batch = concatenateRecords(self.pending)
+            self.pending = []
+            return result + self.process(batch)
+
+    def reset(self) -> list:
+        """
+        时间戳回退(设备复位)时调用: 先计算并发布缓存的数据, 再清除状态与历史, 之后的数据重新初始化姿态
+        :return: 缓存数据发布的 AttitudeData 列表
+        """
+        with self.lock:
+            result = self.process(concatenateRecords(self.pending)) if self.pending else []
+            self.pending = []
+            self.pendingAHRS = []
+            self.state = None
+            self.lastTime = None
+            self.lastSlot = None
+            self.inputTime = None
+            self.comparedTime = None
+            # 历史记录按时间查找, 复位前后的时间戳不能混在一起
+            self.history = SampleRing(estimateDtype, self.history.capacity)
+            self.resets += 1
+            return result
+
+    def process(self, records: np.ndarray) -> list:
+        """
+        立即计算一批 IMU 数据并发布
+        """
+        records = np.ascontiguousarray(records)
+        n = len(records)
+        times = records['timeStamp'].astype(np.int64)
+        if n < self.vectorThreshold:
+            estimate = self._integrateScalar(records)
+        else:
+            estimate = self._integrateVector(records, times)
+        self.samples += n
+        estimates = np.empty(n, dtype=estimateDtype)
+        estimates['roll'] = estimate[:, 0]
+        estimates['pitch'] = estimate[:, 1]
+        estimates['heading'] = estimate[:, 2]
+        estimates['timeStamp'] = times
+        self.history.extend(estimates)
+        return self._publish(records, times, estimate)
+
+    def _integrateScalar(self, records: np.ndarray) -> np.ndarray:
+        """
+        逐采样递推, 与向量化计算的公式相同, 欧拉角速率使用上一采样的姿态
+        :return: (n, 3) 横滚、俯仰、航向
+        """
+        estimate = []
+        timeConstant, headingTimeConstant, maxStep = self.timeConstant, self.headingTimeConstant, self.maxStep
+        state = None if self.state is None else tuple(self.state.tolist())
+        lastTime = self.lastTime
+        for record in records.tolist():
+            gyroX, gyroY, gyroZ, accX, accY, accZ, magX, magY, magZ = record[:9]
+            timeStamp = record[-1]
+            accRoll = math.atan2(-accY, -accZ)
+            accPitch = math.atan2(accX, math.hypot(accY, accZ))
+            if state is None:
+                state = (accRoll, accPitch, _scalarHeading(magX, magY, magZ, accRoll, accPitch))
+                lastTime = timeStamp
+            roll, pitch, heading = state
+            dt = min(max((timeStamp - lastTime) * 1e-6, 0.0), maxStep)
+            lastTime = timeStamp
+            sinRoll, cosRoll = math.sin(roll), math.cos(roll)
+            turn = gyroY * sinRoll + gyroZ * cosRoll
+            headingRate = turn / max(math.cos(pitch), 1e-6)
+            a = timeConstant / (timeConstant + dt)
+            roll, pitch = (a * (roll + (gyroX + turn * math.tan(pitch)) * dt) + (1 - a) * accRoll,
+                           a * (pitch + (gyroY * cosRoll - gyroZ * sinRoll) * dt) + (1 - a) * accPitch)
+            # 倾斜补偿磁航向(见 _magneticHeading), 逐采样调用函数的开销与计算本身相当, 直接展开
+            sinRoll, cosRoll = math.sin(roll), math.cos(roll)
+            horizontalY = magY * cosRoll - magZ * sinRoll
+            measured = math.atan2(-horizontalY, magX * math.cos(pitch) + (magY * sinRoll + magZ * cosRoll) * math.sin(pitch))
+            measured += 2 * math.pi * round((heading - measured) / (2 * math.pi))
+            a = headingTimeConstant / (headingTimeConstant + dt)
+            heading = (a * (heading + headingRate * dt) + (1 - a) * measured + math.pi) % (2 * math.pi) - math.pi
+            state = (roll, pitch, heading)
+            estimate.append(state)
+        self.state = np.array(state)
+        self.lastTime = lastTime
+        return np.array(estimate)
+
+    def _integrateVector(self, records: np.ndarray, times: np.ndarray) -> np.ndarray:
+        """
+        向量化递推, 两遍计算
+        :return: (n, 3) 横滚、俯仰、航向
+        """
+        n = len(records)
+        # 前 9 个字段(角速度、加速度、磁感应)是连续的 float32, 一次转换为 (n, 9) 数组
+        sensors = np.ndarray((n, 9), dtype='<f4', buffer=records, strides=(records.strides[0], 4)).astype(np.float64)
+        accX, accY, accZ = sensors[:, 3], sensors[:, 4], sensors[:, 5]
+        magnetic = sensors[:, 6:9]
+
+        accRoll = np.arctan2(-accY, -accZ)
+        accPitch = np.arctan2(accX, np.hypot(accY, accZ))
+        if self.state is None:
+            self.state = np.array([accRoll[0], accPitch[0], self._magneticHeading(magnetic[:1], accRoll[:1], accPitch[:1])[0]])
+            self.lastTime = int(times[0])
+        dt = np.empty(n)
+        dt[0] = times[0] - self.lastTime
+        np.subtract(times[1:], times[:-1], out=dt[1:])
+        np.clip(dt * 1e-6, 0.0, self.maxStep, out=dt)
+        a = np.empty((n, 3))
+        a[:, :2] = (self.timeConstant / (self.timeConstant + dt))[:, None]
+        a[:, 2] = self.headingTimeConstant / (self.headingTimeConstant + dt)
+        rates = np.empty((n, 3))
+        measured = np.empty((n, 3))
+        measured[:, 0] = accRoll
+        measured[:, 1] = accPitch
+        dt = dt[:, None]
+
+        # 第一遍: 用上一批的姿态计算欧拉角速率
+        self._eulerRates(sensors, self.state[0], self.state[1], rates)
+        estimate = firstOrder(a[:, :2], a[:, :2] * (rates[:, :2] * dt - measured[:, :2]) + measured[:, :2], self.state[:2], self.blockSize)
+        roll, pitch = estimate[:, 0], estimate[:, 1]
+        # 第二遍: 用第一遍的结果重新计算角速率与倾斜补偿, 三个角度一起递推
+        self._eulerRates(sensors, roll, pitch, rates)
+        heading = self._magneticHeading(magnetic, roll, pitch)
+        # 磁航向展开为连续角度并平移到当前航向附近, 递推在连续的角度上进行
+        heading[1:] = heading[0] + wrapAngle(heading[1:] - heading[:-1]).cumsum()
+        measured[:, 2] = heading + 2 * np.pi * np.round((self.state[2] - heading[0]) / (2 * np.pi))
+        estimate = firstOrder(a, a * (rates * dt - measured) + measured, self.state, self.blockSize)
+        estimate[:, 2] = wrapAngle(estimate[:, 2])
+
+        self.state = estimate[-1].copy()
+        self.lastTime = int(times[-1])
+        return estimate
+
+    @staticmethod
+    def _eulerRates(sensors, roll, pitch, out):
+        """
+        机体角速度转换为 ZYX 欧拉角速率
+        :param sensors: (n, 9) 传感器数据, 前 3 列为角速度
+        :param out: (n, 3) 输出: 横滚、俯仰、航向角速率
+        """
+        gyroX, gyroY, gyroZ = sensors[:, 0], sensors[:, 1], sensors[:, 2]
+        sinRoll, cosRoll = np.sin(roll), np.cos(roll)
+        turn = gyroY * sinRoll + gyroZ * cosRoll
+        np.add(gyroX, turn * np.tan(pitch), out=out[:, 0])
+        np.subtract(gyroY * cosRoll, gyroZ * sinRoll, out=out[:, 1])
+        np.divide(turn, np.maximum(np.cos(pitch), 1e-6), out=out[:, 2])
+
+    @staticmethod
+    def _magneticHeading(magnetic, roll, pitch):
+        """
+        倾斜补偿后的磁航向
+        :param magnetic: (n, 3) 磁感应
+        """
+        magX, magY, magZ = magnetic[:, 0], magnetic[:, 1], magnetic[:, 2]
+        sinRoll, cosRoll = np.sin(roll), np.cos(roll)
+        sinPitch, cosPitch = np.sin(pitch), np.cos(pitch)
+        horizontalX = magX * cosPitch + (magY * sinRoll + magZ * cosRoll) * sinPitch
+        horizontalY = magY * cosRoll - magZ * sinRoll
+        return np.arctan2(-horizontalY, horizontalX)
+
+    def _publish(self, records, times, estimate) -> list:
+        if self.publishRate is None:
+            indices = [len(records) - 1]
+            self.lastSlot = None
+        else:
+            slots = times * self.publishRate // 1000000
+            previous = np.empty_like(slots)
+            previous[0] = -1 if self.lastSlot is None else self.lastSlot
+            previous[1:] = slots[:-1]
+            indices = np.flatnonzero(slots > previous).tolist()
+            self.lastSlot = int(slots[-1])
+        result = []
+        for index in indices:
+            fields = records[index].item()
+            roll, pitch, heading = estimate[index].tolist()
+            attitude = AttitudeData(*fields[:10], roll, pitch, heading, *eulerToQuaternion(roll, pitch, heading), fields[-1])
+            result.append(attitude)
+            if self.onAttitude is not None:
+                self.onAttitude(attitude)
+        if result:
+            self.attitude = result[-1]
+            self.published += len(result)
+        return result
+
+    def compare(self, ahrsRecords: np.ndarray):
+        """
+        与 AHRS 数据比较, 在 AHRS 时间戳处对估计结果线性插值
+
+        估计结果只在发布时刻计算, 晚于最新估计结果的 AHRS 数据先缓存, 每 compareInterval 秒一起比较一次
+        :param ahrsRecords: ahrsDtype 结构化数组
+        :return: 本次比较的 {"count", "rms": [横滚, 俯仰, 航向], "max": [...]}(弧度), 无可比较数据时返回 None
+        """
+        with self.lock:
+            if len(ahrsRecords) > 0:
+                self.pendingAHRS.append(ahrsRecords)
+            # 距上次比较不足 compareInterval 时只缓存
+            if not self.pendingAHRS or self.lastTime is None or (self.comparedTime is not None and self.lastTime - self.comparedTime < self.compareInterval * 1e6):
+                return None
+            self.comparedTime = self.lastTime
+            estimates = self.history.view()
+            if len(estimates) < 2:
+                return None
+            ahrsRecords = concatenateRecords(self.pendingAHRS)
+            estimateTimes = estimates['timeStamp']
+            ahrsTimes = ahrsRecords['timeStamp']
+            ready = bisect.bisect_right(ahrsTimes, estimateTimes[-1])
+            self.pendingAHRS = [ahrsRecords[ready:]] if ready < len(ahrsRecords) else []
+            # 早于估计结果的 AHRS 数据无法比较, 直接丢弃
+            skip = bisect.bisect_left(ahrsTimes, estimateTimes[0], 0, ready)
+            ahrsRecords = ahrsRecords[skip:ready]
+            if len(ahrsRecords) == 0:
+                return None
+            # 只取覆盖这批 AHRS 数据的估计结果
+            first = max(0, bisect.bisect_left(estimateTimes, ahrsTimes[skip]) - 1)
+            last = bisect.bisect_right(estimateTimes, ahrsTimes[ready - 1]) + 1
+            estimates = estimates[first:last]
+            estimateTimes = estimates['timeStamp'].astype(np.float64)
+            ahrsTimes = ahrsRecords['timeStamp'].astype(np.float64)
+            difference = np.empty((len(ahrsRecords), 3))
+            for axis, name in enumerate(['roll', 'pitch', 'heading']):
+                angle = estimates[name].astype(np.float64)
+                angle[1:] = angle[0] + wrapAngle(angle[1:] - angle[:-1]).cumsum()
+                interpolated = np.interp(ahrsTimes, estimateTimes, angle)
+                difference[:, axis] = wrapAngle(interpolated - ahrsRecords[name])
+            difference = np.abs(difference)
+            self.divergenceCount += len(difference)
+            self.divergenceSquares += np.sum(difference ** 2, axis=0)
+            self.divergenceMax = np.maximum(self.divergenceMax, difference.max(axis=0))
+            return {"count": len(difference), "rms": np.sqrt(np.mean(difference ** 2, axis=0)).tolist(), "max": difference.max(axis=0).tolist()}
+
+    def statistics(self) -> dict:
+        """
+        :return: 处理的采样数, 发布次数, 以及累计的与 AHRS 的偏差(弧度)
+        """
+        with self.lock:
+            divergence = {"count": self.divergenceCount}
+            if self.divergenceCount > 0:
+                divergence["rms"] = np.sqrt(self.divergenceSquares / self.divergenceCount).tolist()
+                divergence["max"] = self.divergenceMax.tolist()
+            return {"samples": self.samples, "published": self.published, "resets": self.resets, "divergence": divergence}
@@ -1,15 +1,22 @@
-import os
-import struct
 import sys
 import threading
 import time
-from queue import Queue
+from enum import Enum
+from queue import Empty, Queue
 
 import crcmod
+import numpy as np
 import serial
 
 import prettytable as pt
-from reprint import output
+
+from Communication.LinkStatistics import Histogram
+from DataStructure.SampleRing import SampleRing
+from Drone.SensorFilter import FilterKind, SensorFilter
+
+# CRC 函数只在导入时构造一次: 帧头(前 4 字节)使用 CRC8, 消息体使用 CRC16
+crc8 = crcmod.mkCrcFun(0x107, rev=False)
+crc16 = crcmod.mkCrcFun(0x18005)
 
 
 class IMU:
@@ -20,199 +27,413 @@ class IMU:
     type_ahrs = 0x41
     len_ahrs = 48
 
-    def __init__(self, com, baudRate=921600):
+    def __init__(self, com, baudRate=921600, flightRecorder=None, recordCapacity=3600 * 1000, verifyCRC=True, pipeline=None, readTimeout=0.1,
+                 sampleCapacity=65536, attitudeEstimator=None):
+        """
+        :param com: 串口
+        :param baudRate: 波特率
+        :param verifyCRC: 是否校验帧头 CRC8 与消息体 CRC16, 校验失败的数据帧被丢弃并计数
+        :param flightRecorder: 飞行记录器(DataStructure.FlightRecorder), 设置后每个解析出的 IMU / AHRS 数据帧都写入记录
+        :param recordCapacity: 每个记录通道的最大记录数
+        :param pipeline: PipelineMode, 默认 PipelineMode.Single
+        :param readTimeout: 串口读取超时(秒), 决定 stop 时线程退出的最长等待时间
+        :param sampleCapacity: imuData / ahrsData 环形缓冲区保留的采样数
+        :param attitudeEstimator: 姿态估计器(Drone.AttitudeEstimator), 设置后 IMU 数据交给估计器计算姿态, AHRS 数据用于比较偏差
+        """
         self.com = com
         self.baudRate = baudRate
+        self.readTimeout = readTimeout
+        self.pipeline = PipelineMode.Single if pipeline is None else PipelineMode(pipeline)
         self.serial = None
 
-        self.serialBuffer: list = []
+        self.frameParser = IMUFrameParser()
+        self.frameDecoder = IMUFrameDecoder(verifyCRC)
         self.framesBuffer: Queue = Queue()
         self.queueIMU: Queue = Queue()
         self.queueAHRS: Queue = Queue()
-        self.imuData: list = []
-        self.ahrsData: list = []
+        self.imuData = SampleRing(imuDtype, sampleCapacity)
+        self.ahrsData = SampleRing(ahrsDtype, sampleCapacity)
+        self.attitudeEstimator = attitudeEstimator
+        # 低速的使用者(遥测、日志、控制台)订阅这两个滤波器, 以自己的频率接收滤波、抽取后的数据
+        self.imuFilter = SensorFilter(imuDtype)
+        self.ahrsFilter = SensorFilter(ahrsDtype)
+        # 从串口读到数据帧最后一个字节到数据加入 imuData / ahrsData 的延迟
+        self.latency = {"imu": Histogram(), "ahrs": Histogram()}
 
-        self.isRunning = True
+        self.isRunning = False
+        self.threads: list = []
 
-        self.receiveThread = None
-        self.decodeThread = None
-        self.IMUParseThread = None
-        self.AHRSParseThread = None
+        self.imuRecord = None
+        self.ahrsRecord = None
+        if flightRecorder is not None:
+            self.imuRecord = flightRecorder.recordChannel("imu", imuDtype, recordCapacity)
+            self.ahrsRecord = flightRecorder.recordChannel("ahrs", ahrsDtype, recordCapacity)
 
     def connect(self):
-        self.serial = serial.Serial(self.com, self.baudRate)
+        self.serial = serial.Serial(self.com, self.baudRate, timeout=self.readTimeout)
 
     def disconnect(self):
         self.serial.close()
 
     def startIMU(self):
+        """
+        PipelineMode.Single: 一个线程完成读取、切帧、校验与解析;
+        PipelineMode.Threaded: 接收、校验、IMU 解析、AHRS 解析各一个线程, 之间通过阻塞队列传递数据
+        """
         self.connect()
-        self.receiveThread = threading.Thread(target=self.threadReceive)
-        self.receiveThread.start()
-        self.decodeThread = threading.Thread(target=self.threadDecode)
-        self.decodeThread.start()
-        self.IMUParseThread = threading.Thread(target=self.threadIMUParse)
-        self.IMUParseThread.start()
-        self.AHRSParseThread = threading.Thread(target=self.threadAHRSParse)
-        self.AHRSParseThread.start()
-
-    def removeInvalidData(self):
-        for i in range(len(self.serialBuffer)):
-            if self.serialBuffer[i] == IMU.frame_header:
-                self.serialBuffer = self.serialBuffer[i:]
-                break
+        self.isRunning = True
+        if self.pipeline == PipelineMode.Single:
+            targets = [self.threadPipeline]
+        else:
+            targets = [self.threadReceive, self.threadDecode, self.threadIMUParse, self.threadAHRSParse]
+        self.threads = [threading.Thread(target=target) for target in targets]
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        """
+        停止所有线程并关闭串口
+        """
+        self.isRunning = False
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+        if self.serial is not None:
+            self.disconnect()
+
+    def read(self):
+        """
+        阻塞读取串口, 最长等待 readTimeout
+        :return: (数据, 读取完成的时间)
+        """
+        data = self.serial.read(max(1, self.serial.in_waiting))
+        return data, time.perf_counter()
+
+    def threadPipeline(self):
+        while self.isRunning:
+            data, readTime = self.read()
+            if data:
+                frames = self.frameParser.feed(data)
+                if frames:
+                    imuBodies, ahrsBodies = self.frameDecoder.decode(frames)
+                    if imuBodies:
+                        self.publishIMU(imuBodies, readTime)
+                    if ahrsBodies:
+                        self.publishAHRS(ahrsBodies, readTime)
 
     def threadReceive(self):
         while self.isRunning:
-            data = self.serial.read_all()
-            index = 0
-            if data != '':
-                buffer = list(data)
-                self.serialBuffer += buffer
-
-                if len(self.serialBuffer) > 0:
-                    if self.serialBuffer[0] == IMU.frame_header:
-                        for i in range(index, len(self.serialBuffer)):
-                            if IMU.frame_end == self.serialBuffer[i]:
-                                frame = self.serialBuffer[:i + 1]
-                                if len(frame) >= 9:
-                                    self.framesBuffer.put(frame)
-                                self.serialBuffer = []
-                                index = 0
-                                break
-
-                        if len(self.serialBuffer) > 263:
-                            self.serialBuffer.pop(0)
-                            self.removeInvalidData()
-                    else:
-                        self.removeInvalidData()
-            time.sleep(0.0005)
+            data, readTime = self.read()
+            if data:
+                frames = self.frameParser.feed(data)
+                if frames:
+                    self.framesBuffer.put((readTime, frames))
 
     def threadDecode(self):
         while self.isRunning:
-            if self.framesBuffer.qsize() > 0:
-                frame: list = self.framesBuffer.get()
-                header = bytes(frame[:5])
-                headerChar, dataType, dataLength, number, CRC8 = struct.unpack('BBBBB', header)
-                resultCRC8 = crcmod.mkCrcFun(0x107, rev=False)(header[:-1])
-                if dataLength + 8 == len(frame):
-                    CRC16 = struct.unpack("<H", bytes(frame[5:7]))
-                    dataBody = bytes(frame[7:-1])
-                    resultCRC16 = crcmod.mkCrcFun(0x18005)(dataBody)
-                    if dataType == self.type_imu:
-                        if dataLength == self.len_imu:
-                            self.queueIMU.put(dataBody)
-                    if dataType == self.type_ahrs:
-                        if dataLength == self.len_ahrs:
-                            self.queueAHRS.put(dataBody)
-            time.sleep(0.001)
+            try:
+                readTime, frames = self.framesBuffer.get(timeout=self.readTimeout)
+            except Empty:
+                continue
+            imuBodies, ahrsBodies = self.frameDecoder.decode(frames)
+            if imuBodies:
+                self.queueIMU.put((readTime, imuBodies))
+            if ahrsBodies:
+                self.queueAHRS.put((readTime, ahrsBodies))
 
     def threadIMUParse(self):
-        index = 0
-        with output(output_type='dict') as output_lines:
-            output_lines["Type"] = "Count"
-            while self.isRunning:
-                if self.queueIMU.qsize() > 0:
-                    data = self.queueIMU.get()
-                    information = struct.unpack("<ffffffffffffQ", data)
-                    angularVelocityX, angularVelocityY, angularVelocityZ = information[0:3]
-                    accelerationX, accelerationY, accelerationZ = information[3:6]
-                    magneticInductionX, magneticInductionY, magneticInductionZ = information[6:9]
-                    IMUTemp, Pressure, PressureTemp = information[9:12]
-                    timeStamp = information[12]
-                    self.imuData.append(
-                        IMUData(angularVelocityX=angularVelocityX, angularVelocityY=angularVelocityY, angularVelocityZ=angularVelocityZ, accelerationX=accelerationX, accelerationY=accelerationY,
-                                accelerationZ=accelerationZ, magneticInductionX=magneticInductionX, magneticInductionY=magneticInductionY, magneticInductionZ=magneticInductionZ, IMUTemp=IMUTemp,
-                                Pressure=Pressure, PressureTemp=PressureTemp, timeStamp=timeStamp))
+        while self.isRunning:
+            try:
+                readTime, bodies = self.queueIMU.get(timeout=self.readTimeout)
+            except Empty:
+                continue
+            self.publishIMU(bodies, readTime)
 
     def threadAHRSParse(self):
         while self.isRunning:
-            if self.queueAHRS.qsize() > 0:
-                data = self.queueAHRS.get()
-                information = struct.unpack("<ffffffffffQ", data)
-                rollSpeed, pitchSpeed, headingSpeed = information[0:3]
-                roll, pitch, heading = information[3:6]
-                Q1, Q2, Q3, Q4 = information[6:10]
-                timeStamp = information[10]
-                self.ahrsData.append(
-                    AHRSData(rollSpeed=rollSpeed, pitchSpeed=pitchSpeed, headingSpeed=headingSpeed, roll=roll, pitch=pitch, heading=heading, Q1=Q1, Q2=Q2, Q3=Q3, Q4=Q4, timeStamp=timeStamp))
-
-    def print(self):
-        with output(output_type='dict') as output_lines:
+            try:
+                readTime, bodies = self.queueAHRS.get(timeout=self.readTimeout)
+            except Empty:
+                continue
+            self.publishAHRS(bodies, readTime)
+
+    def publishIMU(self, bodies: list, readTime: float):
+        """
+        把一批 IMU 消息体一次解析为结构化数组并写入 imuData
+        :param bodies: 消息体列表
+        :param readTime: 读取到这批数据的时间(time.perf_counter)
+        """
+        if self.imuRecord is not None:
+            now = self.imuRecord.clock()
+            for data in bodies:
+                self.imuRecord.append(now, data)
+        data = b"".join(bodies)
+        self.imuData.extendBytes(data)
+        records = np.frombuffer(data, dtype=imuDtype)
+        self.imuFilter.update(records)
+        if self.attitudeEstimator is not None:
+            self.attitudeEstimator.update(records)
+        self.latency["imu"].add(time.perf_counter() - readTime, len(bodies))
+
+    def publishAHRS(self, bodies: list, readTime: float):
+        if self.ahrsRecord is not None:
+            now = self.ahrsRecord.clock()
+            for data in bodies:
+                self.ahrsRecord.append(now, data)
+        data = b"".join(bodies)
+        self.ahrsData.extendBytes(data)
+        records = np.frombuffer(data, dtype=ahrsDtype)
+        self.ahrsFilter.update(records)
+        if self.attitudeEstimator is not None:
+            self.attitudeEstimator.compare(records)
+        self.latency["ahrs"].add(time.perf_counter() - readTime, len(bodies))
+
+    def statistics(self) -> dict:
+        """
+        切帧与校验统计(包含每种数据帧的 CRC 失败次数)与数据延迟
+        """
+        return {"parser": self.frameParser.statistics(), "decoder": self.frameDecoder.statistics(),
+                "latency": {name: histogram.summary() for name, histogram in self.latency.items()}}
+
+    def print(self, interval=0.5, stream=None):
+        """
+        在终端中原位刷新显示 IMU / AHRS 数据
+
+        数据来自 imuFilter(低通滤波) 与 ahrsFilter(只抽取, 角度不做平均) 以 1 / interval Hz 输出的订阅,
+        使用 ANSI 控制序列把光标移回左上角覆盖上一帧, 不再每次调用 os.system 清屏
+        :param interval: 刷新间隔(秒)
+        :param stream: 输出流, 默认 sys.stdout
+        """
+        stream = sys.stdout if stream is None else stream
+        imuSubscription = self.imuFilter.subscribe(1 / interval)
+        ahrsSubscription = self.ahrsFilter.subscribe(1 / interval, kind=FilterKind.Decimate)
+        imuTable = pt.PrettyTable()
+        imuTable.field_names = ['X轴角速度', 'Y轴角速度', 'Z轴角速度', 'X轴加速度', 'Y轴加速度', 'Z轴加速度', 'X轴磁感应', 'Y轴磁感应', 'Z轴磁感应', '温度', '时间戳']
+        ahrsTable = pt.PrettyTable()
+        ahrsTable.field_names = ['翻滚角速度', '俯仰角速度', '航向角速度', '翻滚角', '俯仰角', '航向角', 'Q1', 'Q2', 'Q3', 'Q4', '时间戳']
+        # 隐藏光标, 清屏一次
+        stream.write("\x1b[?25l\x1b[2J")
+        try:
             while self.isRunning:
-                p = None
-                p2 = None
-                if len(self.imuData) > 0:
-                    tableHeader = ['X轴角速度', 'Y轴角速度', 'Z轴角速度', 'X轴加速度', 'Y轴加速度', 'Z轴加速度', 'X轴磁感应', 'Y轴磁感应', 'Z轴磁感应', '温度', '时间戳']
-                    imuData = self.imuData[-1]
+                lines = []
+                if imuSubscription.latest is not None:
+                    imuData = IMUData(*imuSubscription.latest)
                     tableData = [imuData.angularVelocityX, imuData.angularVelocityY, imuData.angularVelocityZ, imuData.accelerationX, imuData.accelerationY, imuData.accelerationZ,
                                  imuData.magneticInductionX, imuData.magneticInductionY, imuData.magneticInductionZ, imuData.IMUTemp, imuData.timeStamp]
-                    tableData = ['%.6f' % round(x, 6) for x in tableData]
-                    p = pt.PrettyTable()
-                    p.field_names = tableHeader
-                    p.add_row(tableData)
-
-                if len(self.ahrsData) > 0:
-                    tableHeader2 = ['翻滚角速度', '俯仰角速度', '航向角速度', '翻滚角', '俯仰角', '航向角', 'Q1', 'Q2', 'Q3', 'Q4', '时间戳']
-                    ahrsData = self.ahrsData[-1]
-                    tableData2 = [ahrsData.rollSpeed, ahrsData.pitchSpeed, ahrsData.headingSpeed, ahrsData.roll, ahrsData.pitch, ahrsData.heading, ahrsData.Q1, ahrsData.Q2, ahrsData.Q3, ahrsData.Q4,
-                                  ahrsData.timeStamp]
-
-                    tableData2 = ['%.6f' % round(x, 6) for x in tableData2]
-                    p2 = pt.PrettyTable()
-                    p2.field_names = tableHeader2
-                    p2.add_row(tableData2)
-                outputStr = ""
-                if p is not None:
-                    outputStr += f"{p}"
-
-                if p2 is not None:
-                    outputStr += f"\n{p2}"
-                os.system('cls')
-                print(outputStr)
-                time.sleep(0.5)
+                    imuTable.clear_rows()
+                    imuTable.add_row(['%.6f' % round(x, 6) for x in tableData])
+                    lines += imuTable.get_string().split("\n")
+                if ahrsSubscription.latest is not None:
+                    ahrsData = AHRSData(*ahrsSubscription.latest)
+                    tableData = [ahrsData.rollSpeed, ahrsData.pitchSpeed, ahrsData.headingSpeed, ahrsData.roll, ahrsData.pitch, ahrsData.heading, ahrsData.Q1, ahrsData.Q2, ahrsData.Q3, ahrsData.Q4,
+                                 ahrsData.timeStamp]
+                    ahrsTable.clear_rows()
+                    ahrsTable.add_row(['%.6f' % round(x, 6) for x in tableData])
+                    lines += ahrsTable.get_string().split("\n")
+                # 光标回到左上角, 每行末尾清除上一帧残留, 最后清除到屏幕末尾
+                stream.write("\x1b[H" + "\x1b[K\n".join(lines) + "\x1b[K\n\x1b[J")
+                stream.flush()
+                time.sleep(interval)
+        finally:
+            self.imuFilter.unsubscribe(imuSubscription)
+            self.ahrsFilter.unsubscribe(ahrsSubscription)
+            stream.write("\x1b[?25h")
+            stream.flush()
+
+
+class PipelineMode(Enum):
+    Single = "single"
+    Threaded = "threaded"
+
+
+class IMUFrameParser:
+    headerSize = 5
+    # 帧头 5 字节 + CRC16 2 字节 + 帧尾 1 字节
+    frameOverhead = 8
+
+    def __init__(self):
+        """
+        IMU 串口数据帧切分
+
+        数据帧结构: 帧头(0xFC) 类型 长度 序号 CRC8 | CRC16(2 字节) | 消息体(长度字节) | 帧尾(0xFD)
+
+        数据追加到缓冲区(bytearray), 一次扫描中移动读指针取出所有完整的帧: 用 find 查找帧头, 按帧头中的长度切出完整的帧后再检查帧尾,
+        消息体中出现 0xFD 不会截断数据帧; 帧尾不正确时从下一个字节重新查找帧头
+        """
+        self.buffer = bytearray()
+        self.frames = 0
+        self.discarded = 0
+        self.badEnd = 0
+
+    def feed(self, data) -> list:
+        """
+        追加数据并取出缓冲区中所有完整的数据帧
+        :param data: 串口读到的数据
+        :return: 数据帧列表(bytes, 包含帧头与帧尾)
+        """
+        buffer = self.buffer
+        buffer += data
+        frames = []
+        size = len(buffer)
+        index = 0
+        discarded = 0
+        while True:
+            start = buffer.find(IMU.frame_header, index)
+            if start < 0:
+                discarded += size - index
+                index = size
+                break
+            discarded += start - index
+            index = start
+            if size - start < IMUFrameParser.headerSize:
+                break
+            end = start + buffer[start + 2] + IMUFrameParser.frameOverhead
+            if end > size:
+                break
+            if buffer[end - 1] != IMU.frame_end:
+                # 不是真正的帧头(或数据帧已损坏), 从下一个字节继续查找
+                self.badEnd += 1
+                discarded += 1
+                index = start + 1
+                continue
+            frames.append(bytes(buffer[start:end]))
+            index = end
+        self.frames += len(frames)
+        self.discarded += discarded
+        # 移除已经处理的数据, 剩余部分最多为一个不完整的数据帧
+        del buffer[:index]
+        return frames
+
+    def statistics(self) -> dict:
+        return {"frames": self.frames, "discarded": self.discarded, "badEnd": self.badEnd, "buffered": len(self.buffer)}
+
+
+class IMUFrameDecoder:
+    def __init__(self, verifyCRC=True):
+        """
+        IMU 数据帧校验与分类
+
+        按类型检查长度, 校验帧头 CRC8 与消息体 CRC16, 任何一项不通过的数据帧都被丢弃, 并按数据帧类型分别计数
+        :param verifyCRC: 是否校验 CRC
+        """
+        self.verifyCRC = verifyCRC
+        self.counters = {IMU.type_imu: {"valid": 0, "length": 0, "headerCRC": 0, "bodyCRC": 0},
+                         IMU.type_ahrs: {"valid": 0, "length": 0, "headerCRC": 0, "bodyCRC": 0}}
+        self.unknownType = 0
+
+    def decode(self, frames) -> tuple:
+        """
+        批量校验数据帧
+        :param frames: IMUFrameParser 切出的数据帧
+        :return: (IMU 消息体列表, AHRS 消息体列表)
+        """
+        imuBodies = []
+        ahrsBodies = []
+        imuCounters = self.counters[IMU.type_imu]
+        ahrsCounters = self.counters[IMU.type_ahrs]
+        verifyCRC = self.verifyCRC
+        for frame in frames:
+            dataType = frame[1]
+            if dataType == IMU.type_imu:
+                bodies, counters, length = imuBodies, imuCounters, IMU.len_imu
+            elif dataType == IMU.type_ahrs:
+                bodies, counters, length = ahrsBodies, ahrsCounters, IMU.len_ahrs
+            else:
+                self.unknownType += 1
+                continue
+            if frame[2] != length or len(frame) != length + IMUFrameParser.frameOverhead:
+                counters["length"] += 1
+                continue
+            dataBody = frame[7:-1]
+            if verifyCRC:
+                if crc8(frame[:4]) != frame[4]:
+                    counters["headerCRC"] += 1
+                    continue
+                if crc16(dataBody) != frame[5] | frame[6] << 8:
+                    counters["bodyCRC"] += 1
+                    continue
+            counters["valid"] += 1
+            bodies.append(dataBody)
+        return imuBodies, ahrsBodies
+
+    def statistics(self) -> dict:
+        return {"imu": dict(self.counters[IMU.type_imu]), "ahrs": dict(self.counters[IMU.type_ahrs]), "unknownType": self.unknownType}
 
 
 class AttitudeData:
-    def __init__(self, **kwargs):
-        self.angularVelocityX = kwargs.get('angularVelocityX', 0)
-        self.angularVelocityY = kwargs.get('angularVelocityY', 0)
-        self.angularVelocityZ = kwargs.get('angularVelocityZ', 0)
-        self.accelerationX = kwargs.get('accelerationX', 0)
-        self.accelerationY = kwargs.get('accelerationY', 0)
-        self.accelerationZ = kwargs.get('accelerationZ', 0)
-        self.magneticInductionX = kwargs.get('magneticInductionX', 0)
-        self.magneticInductionY = kwargs.get('magneticInductionY', 0)
-        self.magneticInductionZ = kwargs.get('magneticInductionZ', 0)
-        self.IMUTemp = kwargs.get('IMUTemp', 0)
-        self.timeStamp = kwargs.get('timeStamp', 0)
+    """
+    姿态数据, 由 AttitudeEstimator 根据 IMU 数据计算: 发布时刻的 IMU 数据与估计的姿态角(弧度)、四元数(Q1 为实部)
+    """
+    __slots__ = ('angularVelocityX', 'angularVelocityY', 'angularVelocityZ', 'accelerationX', 'accelerationY', 'accelerationZ',
+                 'magneticInductionX', 'magneticInductionY', 'magneticInductionZ', 'IMUTemp', 'roll', 'pitch', 'heading', 'Q1', 'Q2', 'Q3', 'Q4', 'timeStamp')
+
+    def __init__(self, angularVelocityX=0, angularVelocityY=0, angularVelocityZ=0, accelerationX=0, accelerationY=0, accelerationZ=0,
+                 magneticInductionX=0, magneticInductionY=0, magneticInductionZ=0, IMUTemp=0, roll=0, pitch=0, heading=0, Q1=1, Q2=0, Q3=0, Q4=0, timeStamp=0):
+        self.angularVelocityX = angularVelocityX
+        self.angularVelocityY = angularVelocityY
+        self.angularVelocityZ = angularVelocityZ
+        self.accelerationX = accelerationX
+        self.accelerationY = accelerationY
+        self.accelerationZ = accelerationZ
+        self.magneticInductionX = magneticInductionX
+        self.magneticInductionY = magneticInductionY
+        self.magneticInductionZ = magneticInductionZ
+        self.IMUTemp = IMUTemp
+        self.roll = roll
+        self.pitch = pitch
+        self.heading = heading
+        self.Q1 = Q1
+        self.Q2 = Q2
+        self.Q3 = Q3
+        self.Q4 = Q4
+        self.timeStamp = timeStamp
 
 
 class IMUData:
-    def __init__(self, **kwargs):
-        self.angularVelocityX = kwargs.get('angularVelocityX', 0)
-        self.angularVelocityY = kwargs.get('angularVelocityY', 0)
-        self.angularVelocityZ = kwargs.get('angularVelocityZ', 0)
-        self.accelerationX = kwargs.get('accelerationX', 0)
-        self.accelerationY = kwargs.get('accelerationY', 0)
-        self.accelerationZ = kwargs.get('accelerationZ', 0)
-        self.magneticInductionX = kwargs.get('magneticInductionX', 0)
-        self.magneticInductionY = kwargs.get('magneticInductionY', 0)
-        self.magneticInductionZ = kwargs.get('magneticInductionZ', 0)
-        self.IMUTemp = kwargs.get('IMUTemp', 0)
-        self.timeStamp = kwargs.get('timeStamp', 0)
+    """
+    IMU 数据帧(0x40), 位置参数顺序与帧内字段顺序一致, 可直接 IMUData(*struct.unpack(...)) 构造
+    使用 __slots__ 省去每个采样的 __dict__
+    """
+    __slots__ = ('angularVelocityX', 'angularVelocityY', 'angularVelocityZ', 'accelerationX', 'accelerationY', 'accelerationZ',
+                 'magneticInductionX', 'magneticInductionY', 'magneticInductionZ', 'IMUTemp', 'Pressure', 'PressureTemp', 'timeStamp')
+
+    def __init__(self, angularVelocityX=0, angularVelocityY=0, angularVelocityZ=0, accelerationX=0, accelerationY=0, accelerationZ=0,
+                 magneticInductionX=0, magneticInductionY=0, magneticInductionZ=0, IMUTemp=0, Pressure=0, PressureTemp=0, timeStamp=0):
+        self.angularVelocityX = angularVelocityX
+        self.angularVelocityY = angularVelocityY
+        self.angularVelocityZ = angularVelocityZ
+        self.accelerationX = accelerationX
+        self.accelerationY = accelerationY
+        self.accelerationZ = accelerationZ
+        self.magneticInductionX = magneticInductionX
+        self.magneticInductionY = magneticInductionY
+        self.magneticInductionZ = magneticInductionZ
+        self.IMUTemp = IMUTemp
+        self.Pressure = Pressure
+        self.PressureTemp = PressureTemp
+        self.timeStamp = timeStamp
 
 
 class AHRSData:
-    def __init__(self, **kwargs):
-        self.rollSpeed = kwargs.get('rollSpeed', 0)
-        self.pitchSpeed = kwargs.get('pitchSpeed', 0)
-        self.headingSpeed = kwargs.get('headingSpeed', 0)
-        self.roll = kwargs.get('roll', 0)
-        self.pitch = kwargs.get('pitch', 0)
-        self.heading = kwargs.get('heading', 0)
-        self.Q1 = kwargs.get('Q1', 0)
-        self.Q2 = kwargs.get('Q2', 0)
-        self.Q3 = kwargs.get('Q3', 0)
-        self.Q4 = kwargs.get('Q4', 0)
-        self.timeStamp = kwargs.get('timeStamp', 0)
+    """
+    AHRS 数据帧(0x41), 位置参数顺序与帧内字段顺序一致, 可直接 AHRSData(*struct.unpack(...)) 构造
+    """
+    __slots__ = ('rollSpeed', 'pitchSpeed', 'headingSpeed', 'roll', 'pitch', 'heading', 'Q1', 'Q2', 'Q3', 'Q4', 'timeStamp')
+
+    def __init__(self, rollSpeed=0, pitchSpeed=0, headingSpeed=0, roll=0, pitch=0, heading=0, Q1=0, Q2=0, Q3=0, Q4=0, timeStamp=0):
+        self.rollSpeed = rollSpeed
+        self.pitchSpeed = pitchSpeed
+        self.headingSpeed = headingSpeed
+        self.roll = roll
+        self.pitch = pitch
+        self.heading = heading
+        self.Q1 = Q1
+        self.Q2 = Q2
+        self.Q3 = Q3
+        self.Q4 = Q4
+        self.timeStamp = timeStamp
+
+
+# 数据帧消息体的 numpy 布局, 字段名与 IMUData / AHRSData 一致
+imuDtype = np.dtype([(name, '<f4') for name in IMUData.__slots__[:-1]] + [('timeStamp', '<u8')])
+ahrsDtype = np.dtype([(name, '<f4') for name in AHRSData.__slots__[:-1]] + [('timeStamp', '<u8')])
@@ -0,0 +1,226 @@
+import math
+from enum import Enum
+
+import numpy as np
+
+
+class FilterKind(Enum):
+    FIR = "fir"
+    IIR = "iir"
+    Decimate = "decimate"
+
+
+def firstOrder(a: np.ndarray, b: np.ndarray, y0: np.ndarray, blockSize=256) -> np.ndarray:
+    """
+    向量化计算一阶递推 y[k] = a[k] * y[k - 1] + b[k]
+
+    y[k] = P[k] * (y0 + sum(b[j] / P[j], j <= k)), P 为 a 的累乘; 按 blockSize 分块避免 P 下溢
+    :param a: (n, m) 或 (n, 1) 递推系数, 取值 (0, 1]
+    :param b: (n, m)
+    :param y0: (m,) 初始状态
+    """
+    result = np.empty_like(b)
+    for start in range(0, len(b), blockSize):
+        end = start + blockSize
+        product = a[start:end].cumprod(axis=0)
+        result[start:end] = product * (y0 + (b[start:end] / product).cumsum(axis=0))
+        y0 = result[min(end, len(b)) - 1]
+    return result
+
+
+def concatenateRecords(arrays: list) -> np.ndarray:
+    """
+    拼接结构化数组; np.concatenate 对结构化类型每次都要做字段类型提升, 按字节拼接快得多
+    """
+    if len(arrays) == 1:
+        return arrays[0]
+    return np.frombuffer(b"".join([np.ascontiguousarray(array) for array in arrays]), dtype=arrays[0].dtype)
+
+
+def lowPassTaps(cutoff: float, sampleRate: float, taps: int) -> np.ndarray:
+    """
+    Hamming 窗加窗 sinc 低通 FIR 系数, 直流增益为 1
+    :param cutoff: 截止频率(Hz)
+    :param sampleRate: 输入采样率(Hz)
+    :param taps: 系数个数
+    """
+    n = np.arange(taps) - (taps - 1) / 2
+    coefficients = np.sinc(2 * cutoff / sampleRate * n) * np.hamming(taps)
+    return coefficients / coefficients.sum()
+
+
+class FilterSubscription:
+    def __init__(self, rate: float, callback, kind: FilterKind, cutoff: float, taps: int):
+        """
+        一个订阅者的滤波与抽取状态, 由 SensorFilter.subscribe 创建
+        """
+        self.rate = rate
+        self.callback = callback
+        self.kind = kind
+        self.cutoff = 0.4 * rate if cutoff is None else cutoff
+        self.taps = taps
+        self.coefficients = None
+        self.offsets = None
+        # FIR: 上一批最后 taps - 1 个输入; IIR: 上一个输出
+        self.history = None
+        self.state = None
+        self.lastSlot = None
+        self.latest = None
+        self.count = 0
+
+    def reset(self):
+        """
+        清除滤波状态与输出时段(时间戳回退后调用), 下一个输入重新开始
+        """
+        self.history = None
+        self.state = None
+        self.lastSlot = None
+
+    def nextTime(self) -> int:
+        """
+        :return: 下一个输出时段开始的时间戳(微秒), 时间戳不小于它的输入会产生输出
+        """
+        return 0 if self.lastSlot is None else math.ceil((self.lastSlot + 1) * 1000000 / self.rate)
+
+    def process(self, records: np.ndarray, values: np.ndarray, times: np.ndarray, fields: list, sampleRate: float):
+        """
+        处理一批输入, 在每个输出时段的第一个输入处输出
+        :param values: (n, m) 需要滤波的字段
+        :return: 输出的结构化数组, 没有输出时返回 None
+        """
+        if int(times[-1]) < self.nextTime():
+            indices = None
+        else:
+            slots = times * self.rate // 1000000
+            previous = np.empty_like(slots)
+            previous[0] = -1 if self.lastSlot is None else self.lastSlot
+            previous[1:] = slots[:-1]
+            indices = (slots > previous).nonzero()[0]
+            self.lastSlot = int(slots[-1])
+
+        if self.kind == FilterKind.FIR:
+            if self.coefficients is None:
+                self.coefficients = lowPassTaps(self.cutoff, sampleRate, self.taps)[::-1].copy()
+                self.offsets = np.arange(self.taps)
+            if self.history is None:
+                # 用第一个输入填充历史, 避免启动时从零开始的瞬态
+                self.history = np.repeat(values[:1], self.taps - 1, axis=0)
+            data = np.concatenate((self.history, values))
+            self.history = data[len(data) - (self.taps - 1):]
+            if indices is None:
+                return None
+            # 只在输出位置计算卷积: 第 i 个输入对应窗口 data[i:i + taps]
+            filtered = self.coefficients @ data[indices[:, None] + self.offsets]
+        elif self.kind == FilterKind.IIR:
+            if self.state is None:
+                self.state = values[0].copy()
+            a = np.full((len(values), 1), math.exp(-2 * math.pi * self.cutoff / sampleRate))
+            output = firstOrder(a, (1 - a) * values, self.state)
+            self.state = output[-1].copy()
+            if indices is None:
+                return None
+            filtered = output[indices]
+        else:
+            if indices is None:
+                return None
+            filtered = values[indices]
+        result = records[indices].copy()
+        for column, name in enumerate(fields):
+            result[name] = filtered[:, column]
+        self.latest = result[-1].item()
+        self.count += len(result)
+        if self.callback is not None:
+            self.callback(result)
+        return result
+
+
+class SensorFilter:
+    def __init__(self, dtype, fields=None, sampleRate=None, timeField="timeStamp"):
+        """
+        传感器数据流的滤波与抽取
+
+        每个订阅者以自己的输出频率接收低通滤波后的数据, 慢速的订阅者(遥测、日志、控制台)不再处理全速率数据:
+        FIR 只在输出位置计算卷积, 计算量与输出频率成正比; IIR(一阶)需要逐采样递推, 但整批向量化计算。
+        输入先缓存, 有订阅者到达输出时刻时才整批处理, 各订阅者的滤波状态在批次之间保留。
+        输出记录的时间戳为该输出位置最新输入的时间戳, FIR 的群延迟为 (taps - 1) / 2 个输入采样
+        :param dtype: 输入记录的 numpy 结构化类型(如 imuDtype)
+        :param fields: 需要滤波的字段, 默认为除时间字段外的所有浮点字段, 其他字段取输出位置的原始值
+        :param sampleRate: 输入采样率(Hz), None 时根据最先的至少 16 个输入的时间戳估计
+        :param timeField: 时间字段名, 单位微秒
+        """
+        self.dtype = np.dtype(dtype)
+        self.timeField = timeField
+        self.fields = fields if fields is not None else [name for name in self.dtype.names if name != timeField and self.dtype[name].kind == 'f']
+        self.sampleRate = sampleRate
+        self.subscriptions = []
+        self.pending = []
+        self.samples = 0
+        # 最近一个输入的时间戳, 用于发现时间戳回退(设备复位)
+        self.lastTime = None
+        self.resets = 0
+        # 所有订阅者中最早的下一个输出时刻(微秒), 之前的输入只缓存
+        self.dueTime = 0
+
+    def subscribe(self, rate: float, callback=None, kind=FilterKind.FIR, cutoff=None, taps=31) -> FilterSubscription:
+        """
+        :param rate: 输出频率(Hz)
+        :param callback: 输出回调, 参数为结构化数组(本次处理中的所有输出), 在调用 update 的线程中执行
+        :param kind: FilterKind, Decimate 只抽取不滤波(如角度等不能直接平均的数据)
+        :param cutoff: 低通截止频率(Hz), 默认为输出频率的 0.4 倍
+        :param taps: FIR 系数个数
+        :return: FilterSubscription, latest 为最近一次输出(tuple)
+        """
+        subscription = FilterSubscription(rate, callback, FilterKind(kind), cutoff, taps)
+        self.subscriptions = self.subscriptions + [subscription]
+        self.dueTime = 0
+        return subscription
+
+    def unsubscribe(self, subscription: FilterSubscription):
+        self.subscriptions = [item for item in self.subscriptions if item is not subscription]
+
+    def update(self, records: np.ndarray):
+        """
+        输入一批数据, 没有订阅者到达输出时刻时只缓存
+        """
+        subscriptions = self.subscriptions
+        if not subscriptions or len(records) == 0:
+            return
+        times = records[self.timeField]
+        if self.lastTime is not None and times[0].item() < self.lastTime:
+            # 时间戳回退: 缓存的输入与滤波状态都属于复位前, 丢弃后重新开始, 否则 dueTime 之前的输入会一直缓存
+            self.resets += 1
+            self.pending = []
+            self.dueTime = 0
+            for subscription in subscriptions:
+                subscription.reset()
+        self.lastTime = times[-1].item()
+        self.pending.append(records)
+        if self.lastTime < self.dueTime:
+            return
+        batch = concatenateRecords(self.pending)
+        # 采样率还无法估计时保留输入
+        self.pending = [] if self.process(batch, subscriptions) else [batch]
+
+    def process(self, records: np.ndarray, subscriptions=None) -> bool:
+        """
+        :return: 是否已处理, 采样率未知且无法从这批数据估计时返回 False
+        """
+        times = records[self.timeField].astype(np.int64)
+        if self.sampleRate is None:
+            # 至少 16 个采样再估计, 减小时间戳抖动的影响
+            if len(records) < 16 or times[-1] <= times[0]:
+                return False
+            self.sampleRate = (len(records) - 1) * 1e6 / int(times[-1] - times[0])
+        values = np.empty((len(records), len(self.fields)))
+        for column, name in enumerate(self.fields):
+            values[:, column] = records[name]
+        self.samples += len(records)
+        subscriptions = self.subscriptions if subscriptions is None else subscriptions
+        for subscription in subscriptions:
+            subscription.process(records, values, times, self.fields, self.sampleRate)
+        self.dueTime = min(subscription.nextTime() for subscription in subscriptions)
+        return True
+
+    def statistics(self) -> dict:
+        return {"samples": self.samples, "sampleRate": self.sampleRate, "resets": self.resets,
+                "subscriptions": [{"rate": item.rate, "kind": item.kind.value, "count": item.count} for item in self.subscriptions]}
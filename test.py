@@ -1,5 +1,3 @@
-import time
-
 from loguru import logger
 
 from Communication.RadioLayer import RadioConnector
@@ -12,13 +10,12 @@ def main():
     radio_connector.startRadioCommunication()
     radio_connector.enableMessageLog = True
     while True:
-        if len(radio_connector.recvBuffer) > 0:
-            message = radio_connector.recvBuffer.pop(0)
+        message = radio_connector.getMessage(timeout=0.25)
+        if message is not None:
             data: bytes = message["data"]
             # logger.debug(f"Received data(Raw): [{data}]")
             # logger.debug(f"Received data(Decoded): {data.decode('utf-8')}")
             # radio_connector.send(f'Successfully received data, size: [{len(data)}]'.encode("utf-8"))
-        time.sleep(0.25)
 
 
 if __name__ == "__main__":